@@ -24,6 +24,7 @@ const EmbedAllButton = ({ setMessages, isEmbedding, setIsEmbedding }) => {
       <select value={model} onChange={handleModelChange} style={{ marginRight: '10px' }}>
         <option value="use">Universal Sentence Encoder</option>
         <option value="ada">OpenAI Ada</option>
+        <option value="local">Local ONNX model</option>
       </select>
       <button onClick={handleEmbedAll} disabled={isEmbedding}>
         {isEmbedding ? 'Embedding...' : 'Embed All PDFs'}
@@ -1,5 +1,5 @@
 import React, { useState } from 'react';
-import { askQuestion } from '../services/api';
+import { askQuestionStream } from '../services/api';
 
 const QuestionForm = ({ setMessages, language, setLanguage, isAsking, setIsAsking }) => {
   const [input, setInput] = useState('');
@@ -16,11 +16,14 @@ const QuestionForm = ({ setMessages, language, setLanguage, isAsking, setIsAskin
     setInput('');
     setIsAsking(true);
 
+    // 답변 조각이 도착할 때마다 마지막 봇 메시지를 갱신
+    const updateAnswer = (text) => setMessages(prev => [...prev.slice(0, -1), { text, sender: 'bot' }]);
+    setMessages(prev => [...prev, { text: '...', sender: 'bot' }]);
+
     try {
-      const answer = await askQuestion(input, language);
-      setMessages(prev => [...prev, { text: answer, sender: 'bot' }]);
+      await askQuestionStream(input, language, { onToken: (_, answer) => updateAnswer(answer) });
     } catch (error) {
-      setMessages(prev => [...prev, { text: 'Error getting answer.', sender: 'bot' }]);
+      updateAnswer('Error getting answer.');
     }
     setIsAsking(false);
   };
@@ -1,11 +1,15 @@
 import axios from 'axios';
 
+// nginx의 /api/를 거쳐 업로드/임베딩은 인제스트 서버로, 질문은 서빙 워커로 보냄 (docker-compose.yaml)
+// 단일 서버(SERVER_ROLE=standalone)에 바로 붙이려면 REACT_APP_API_URL=http://localhost:8000 로 빌드/실행
+const API_URL = process.env.REACT_APP_API_URL || '/api';
+
 export const uploadPdf = async (file, model) => {
   const formData = new FormData();
   formData.append('file', file);
   formData.append('model', model);
 
-  const response = await axios.post('http://localhost:8000/upload_pdf', formData, {
+  const response = await axios.post(`${API_URL}/upload_pdf`, formData, {
     headers: {
       'Content-Type': 'multipart/form-data'
     }
@@ -14,23 +18,62 @@ export const uploadPdf = async (file, model) => {
 };
 
 export const uploadPdfUrl = async (url, model) => {
-  const response = await axios.post('http://localhost:8000/upload_pdf_url', null, {
+  const response = await axios.post(`${API_URL}/upload_pdf_url`, null, {
     params: { url, model }
   });
   return response.data;
 };
 
 export const embedAllPdfs = async (model) => {
-    const response = await axios.post('http://localhost:8000/embed_all_pdfs', null, {
+    const response = await axios.post(`${API_URL}/embed_all_pdfs`, null, {
       params: { model }
     });
     return response.data.message;
   };
 
 export const askQuestion = async (question, language) => {
-  const response = await axios.post('http://localhost:8000/ask_question', 
+  const response = await axios.post(`${API_URL}/ask_question`, 
     { question },
     { params: { language } }
   );
   return response.data.answer;
 };
+
+// 답변을 Server-Sent Events로 받아 조각이 올 때마다 onToken을 호출합니다.
+export const askQuestionStream = async (question, language, { onReferences, onToken } = {}) => {
+  const response = await fetch(
+    `${API_URL}/ask_question?${new URLSearchParams({ language, stream: true })}`,
+    {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ question })
+    }
+  );
+  if (!response.ok || !response.body) {
+    throw new Error(`Request failed with status ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let answer = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const events = buffer.split('\n\n');
+    buffer = events.pop();
+    for (const raw of events) {
+      const event = raw.match(/^event: (.*)$/m)?.[1];
+      const data = raw.match(/^data: (.*)$/m)?.[1];
+      if (!event || data === undefined) continue;
+      const payload = JSON.parse(data);
+      if (event === 'references') onReferences?.(payload);
+      else if (event === 'token') {
+        answer += payload;
+        onToken?.(payload, answer);
+      } else if (event === 'error') throw new Error(payload);
+    }
+  }
+  return answer;
+};
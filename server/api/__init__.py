@@ -1,3 +1,8 @@
 from .upload import upload_pdf, upload_pdf_url
-from .question import ask_question
+from .question import ask_question, ask_questions
 from .embed_all_pdfs import embed_all_pdfs
+from .jobs import get_job, list_jobs
+from .stats import get_stats
+from .health import health
+from .collections import list_collections, get_collection_info
+from .metrics import metrics
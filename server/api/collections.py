@@ -0,0 +1,30 @@
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from config.state import collections, get_collection
+from config.settings import SERVER_ROLE
+
+def resolve_collection(name, create=False, write=False):
+    """
+    요청에서 지정한 컬렉션을 반환합니다. 이름이 잘못되었으면 400, 없는 컬렉션이면 404를 반환합니다.
+    업로드/인제스트처럼 인덱스를 바꾸는 요청(write 또는 create)은 읽기 전용 서빙 워커에서 403을 반환합니다.
+    """
+    if (write or create) and SERVER_ROLE == "serve":
+        raise HTTPException(status_code=403, detail="This worker serves questions only (SERVER_ROLE=serve), "
+                                                    "send uploads and embedding requests to the ingest server")
+    try:
+        collection = get_collection(name, create=create)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if collection is None:
+        raise HTTPException(status_code=404, detail=f"Collection '{name}' not found")
+    return collection
+
+async def list_collections():
+    """
+    컬렉션별 파일/조각 수, 인덱싱된 모델과 메모리 사용량(바이트)을 반환합니다.
+    """
+    return JSONResponse(content={"collections": [collection.info() for collection in list(collections.values())]},
+                        status_code=200)
+
+async def get_collection_info(name: str):
+    return JSONResponse(content=resolve_collection(name).info(), status_code=200)
@@ -1,30 +1,63 @@
+import asyncio
 from fastapi import APIRouter, Query, HTTPException
 from fastapi.responses import JSONResponse
 import logging
-from config.state import uploaded_files, recommenders  # 전역 상태
-from utils.text_processing import text_to_chunks
-from models.semantic_search import SemanticSearch
-from utils.pdf_processing import pdf_to_text
+from config.state import DEFAULT_COLLECTION
+from models.embedding_model import EmbeddingModel
+from models.vector_store import persist_state
+from models.embedding_cache import embedding_cache
+from utils.ingestion import sync_index
+from utils.jobs import job_manager, JobQueueFull
+from api.collections import resolve_collection
 
 logger = logging.getLogger(__name__)
 
-async def embed_all_pdfs(model: str = Query("use")):
-    if not uploaded_files:
+def run_embedding_job(job, collection, model):
+    # 새로 업로드된 파일만 임베딩하고, 삭제/교체된 파일은 인덱스에서 제거
+    result = sync_index(collection, model, progress=job.report)
+
+    # 재시작 후에도 다시 임베딩하지 않도록 디스크에 저장
+    if result["updated_models"]:
+        persist_state(collection, result["updated_models"])
+
+    logger.info("All PDFs processed successfully and integrated into the model")
+    return {
+        "added_files": result["added"],
+        "removed_files": result["removed"],
+        "failed_files": result["failed"],
+        "total_chunks": result["total_chunks"],
+    }
+
+async def embed_all_pdfs(
+    model: EmbeddingModel = Query(EmbeddingModel.USE),
+    wait: bool = Query(default=True, description="False이면 작업 ID만 바로 반환하고 /jobs/{job_id}로 진행 상황을 조회"),
+    collection: str = Query(default=DEFAULT_COLLECTION, description="임베딩할 문서 컬렉션")
+):
+    target = resolve_collection(collection, write=True)
+    if not target.uploaded_files:
         raise HTTPException(status_code=400, detail="No PDF files have been uploaded yet.")
 
     try:
-        for index, file_path in enumerate(uploaded_files):
-            file_ref = f"Ref{index + 1}"  # 파일별 고유 참조 번호 생성
-            texts = pdf_to_text(file_path)
-            chunks = text_to_chunks(texts, file_ref)
-            recommenders.extend(chunks)
-        
-        # 모델 학습
-        recommender = SemanticSearch(model=model)
-        recommender.fit(recommenders)
-        
-        logger.info("All PDFs processed successfully and integrated into the model")
-        return JSONResponse(content={"message": "All PDFs processed successfully", "model_used": model}, status_code=200)
+        job = job_manager.submit("embed_all_pdfs", lambda job: run_embedding_job(job, target, model),
+                                 {"model": model.value, "collection": target.name})
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+    if not wait:
+        return JSONResponse(content={"message": "Embedding job submitted", "model_used": model, "collection": target.name,
+                                     "job_id": job.id}, status_code=202)
+
+    try:
+        # 작업은 워커 스레드에서 실행되므로 기다리는 동안에도 다른 요청은 처리됨
+        result = await asyncio.wrap_future(job.future)
+        return JSONResponse(content={
+            "message": "All PDFs processed successfully",
+            "model_used": model,
+            "collection": target.name,
+            "job_id": job.id,
+            **result,
+            "embedding_cache": embedding_cache.stats()
+        }, status_code=200)
     except Exception as e:
         logger.error(f"Error processing PDFs: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing PDFs: {str(e)}")
@@ -0,0 +1,8 @@
+from fastapi.responses import JSONResponse
+from models.embedding_model import use_status, local_status
+
+async def health():
+    """
+    서버가 요청을 받을 수 있으면 바로 응답합니다. 모델 예열 상태는 models에 함께 보고합니다.
+    """
+    return JSONResponse(content={"status": "ok", "models": {"use": dict(use_status), "local": dict(local_status)}}, status_code=200)
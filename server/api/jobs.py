@@ -0,0 +1,12 @@
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from utils.jobs import job_manager
+
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return JSONResponse(content=job.to_dict(), status_code=200)
+
+async def list_jobs():
+    return JSONResponse(content={"jobs": job_manager.list()}, status_code=200)
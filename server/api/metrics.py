@@ -0,0 +1,56 @@
+from fastapi.responses import PlainTextResponse
+from config.state import collections
+from models.answer_cache import answer_cache
+from models.embedding_cache import embedding_cache
+from models.embedding_model import use_status, local_status
+from utils.metrics import registry, render_sample
+from utils.openai_client import openai_client
+
+def _metric(lines, name, kind, documentation, samples):
+    lines.append(f"# HELP {name} {documentation}")
+    lines.append(f"# TYPE {name} {kind}")
+    lines.extend(render_sample(name, value, labels) for labels, value in samples)
+
+def _state_metrics():
+    """
+    인덱스 크기, 캐시, OpenAI 요청 수처럼 이미 다른 곳에서 세고 있는 값을 수집 시점에 읽어 옵니다.
+    """
+    lines = []
+    infos = [collection.info() for collection in list(collections.values())]
+    _metric(lines, "pdfgpt_index_files", "gauge", "Indexed PDF files per collection",
+            [([("collection", info["name"])], info["indexed_files"]) for info in infos])
+    _metric(lines, "pdfgpt_index_chunks", "gauge", "Text chunks per collection",
+            [([("collection", info["name"])], info["chunks"]) for info in infos])
+    _metric(lines, "pdfgpt_index_bytes", "gauge",
+            "Memory used by chunks, BM25 postings and vector indexes (mapped = shared memory-mapped files)",
+            [([("collection", info["name"]), ("kind", kind)], info["memory"]["total"][kind])
+             for info in infos for kind in ("heap", "mapped")])
+
+    answers = answer_cache.stats()
+    _metric(lines, "pdfgpt_answer_cache_entries", "gauge", "Cached answers", [([], answers["entries"])])
+    _metric(lines, "pdfgpt_answer_cache_requests_total", "counter", "Answer cache lookups by result",
+            [([("result", "hit")], answers["hits"]), ([("result", "similar_hit")], answers["similar_hits"]),
+             ([("result", "miss")], answers["misses"])])
+    _metric(lines, "pdfgpt_answer_cache_seconds_saved_total", "counter",
+            "Answer generation time saved by cache hits (the original answer's latency per hit)",
+            [([], answers["seconds_saved"])])
+    embeddings = embedding_cache.stats()
+    _metric(lines, "pdfgpt_embedding_cache_entries", "gauge", "Cached embeddings", [([], embeddings["entries"])])
+    _metric(lines, "pdfgpt_embedding_cache_requests_total", "counter", "Embedding cache lookups by result",
+            [([("result", "hit")], embeddings["hits"]), ([("result", "miss")], embeddings["misses"])])
+
+    openai_stats = dict(openai_client.stats)
+    _metric(lines, "pdfgpt_openai_requests_total", "counter", "OpenAI API requests by outcome",
+            [([("outcome", outcome)], count) for outcome, count in sorted(openai_stats.items())])
+    _metric(lines, "pdfgpt_use_model_loaded", "gauge", "1 if the Universal Sentence Encoder is loaded",
+            [([], int(use_status["state"] == "loaded"))])
+    _metric(lines, "pdfgpt_local_model_loaded", "gauge", "1 if the local ONNX embedding model is loaded",
+            [([], int(local_status["state"] == "loaded"))])
+    return "\n".join(lines) + "\n"
+
+async def metrics():
+    """
+    Prometheus 텍스트 형식(0.0.4)의 지표를 반환합니다. 단계별/요청별 지연 시간 히스토그램과
+    컬렉션별 인덱스 크기, 캐시 적중 수, OpenAI 요청 수를 포함합니다.
+    """
+    return PlainTextResponse(registry.render() + _state_metrics(), media_type="text/plain; version=0.0.4")
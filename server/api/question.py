@@ -1,43 +1,239 @@
 from fastapi import Query, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+import asyncio
+import json
 import logging
+import os
+import time
+from typing import List, Optional
 from pydantic import BaseModel
 from models.semantic_search import SemanticSearch
+from models.answer_cache import answer_cache
 from models.embedding_model import Language, EmbeddingModel
-from config.state import recommenders  # 전역 상태 임포트
-from config.settings import client  # OpenAI client 임포트
+from config.state import DEFAULT_COLLECTION, get_collection
+from utils.text_processing import format_reference
+from config.settings import MAX_BATCH_QUESTIONS, LLM_CONCURRENCY, CONTEXT_CANDIDATES, SERVER_ROLE, RERANKER
+from utils.openai_client import openai_client  # 공유 OpenAI 클라이언트
+from utils.context_builder import build_context
+from utils.metrics import stage, record
+from models.vector_store import persist_state
+from api.collections import resolve_collection
 
 logger = logging.getLogger(__name__)
 
 class Question(BaseModel):
     question: str
 
+class Questions(BaseModel):
+    questions: List[str]
+
 async def ask_question(
     question: Question,
     language: Language = Query(default=Language.ENGLISH),
-    model: EmbeddingModel = Query(default=EmbeddingModel.USE)  # 사용된 임베딩 모델을 받도록 수정
+    model: EmbeddingModel = Query(default=EmbeddingModel.USE),  # 사용된 임베딩 모델을 받도록 수정
+    files: Optional[List[str]] = Query(default=None, description="지정한 파일(이름)에서만 검색"),
+    stream: bool = Query(default=False, description="검색 결과와 답변을 Server-Sent Events로 스트리밍"),
+    collection: str = Query(default=DEFAULT_COLLECTION, description="검색할 문서 컬렉션")
 ):
-    if not recommenders:
-        raise HTTPException(status_code=400, detail="No PDF has been uploaded and processed yet")
+    target = resolve_collection(collection)
+    file_ids = resolve_file_ids(target, files)
 
-    # 선택된 모델을 기반으로 SemanticSearch 인스턴스를 생성
-    recommender = SemanticSearch(model=model)
-    recommender.fit(recommenders)
+    # 인덱스 준비는 블로킹 작업이므로 이벤트 루프 밖에서 실행
+    recommender = await run_in_threadpool(get_recommender, target, model)
 
-    answer = generate_answer(question.question, language, client, recommender)
+    if stream:
+        return await stream_answer(question.question, language, openai_client, recommender, file_ids, target)
+
+    answer, cached = await generate_answer(question.question, language, openai_client, recommender, file_ids, target)
     
     return JSONResponse(content={
         "answer": answer,
         "model_used": recommender.model,
-        "language": language
+        "language": language,
+        "collection": target.name,
+        "cached": cached
+    }, status_code=200)
+
+async def ask_questions(
+    questions: Questions,
+    language: Language = Query(default=Language.ENGLISH),
+    model: EmbeddingModel = Query(default=EmbeddingModel.USE),
+    files: Optional[List[str]] = Query(default=None, description="지정한 파일(이름)에서만 검색"),
+    collection: str = Query(default=DEFAULT_COLLECTION, description="검색할 문서 컬렉션")
+):
+    """
+    여러 질문을 한 번에 처리합니다. 질문 임베딩과 검색은 한 번의 행렬 연산으로 하고,
+    LLM 호출은 최대 LLM_CONCURRENCY개씩 동시에 보냅니다. 캐시된 답변과 요청 안에서 중복된 질문은 다시 생성하지 않습니다.
+    """
+    if not questions.questions:
+        raise HTTPException(status_code=400, detail="No questions given")
+    if len(questions.questions) > MAX_BATCH_QUESTIONS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_QUESTIONS} questions per request")
+
+    target = resolve_collection(collection)
+    file_ids = resolve_file_ids(target, files)
+    recommender = await run_in_threadpool(get_recommender, target, model)
+    started = time.perf_counter()
+    scope = answer_cache.scope(recommender, language, file_ids, target.name)
+    retrieved = await run_in_threadpool(retrieve, recommender, scope, questions.questions, file_ids)
+
+    semaphore = asyncio.Semaphore(LLM_CONCURRENCY)
+
+    async def answer(question, cached, chunks, embedding):
+        if cached:
+            return cached.answer
+        async with semaphore:
+            return await complete(openai_client, scope, question, language, chunks, embedding, started)
+
+    tasks = {}
+    for question, result in zip(questions.questions, retrieved):
+        key = answer_cache.normalize(question)
+        if key not in tasks:
+            tasks[key] = asyncio.ensure_future(answer(question, *result))
+    answers = await asyncio.gather(*(tasks[answer_cache.normalize(q)] for q in questions.questions))
+
+    return JSONResponse(content={
+        "answers": [{"question": q, "answer": a, "cached": r[0] is not None}
+                    for q, a, r in zip(questions.questions, answers, retrieved)],
+        "model_used": recommender.model,
+        "language": language,
+        "collection": target.name
     }, status_code=200)
 
-def generate_answer(question, language, openAI, recommender_instance):
+def resolve_file_ids(collection, files):
+    """
+    파일 이름 목록을 컬렉션 안의 파일 번호 목록으로 바꿉니다. 지정하지 않으면 None(컬렉션 전체 검색)을 반환합니다.
+    """
+    if not len(collection.chunk_table):
+        raise HTTPException(status_code=400, detail="No PDF has been uploaded and processed yet")
+
+    if not files:
+        return None
+    file_ids = [info["id"] for path, info in list(collection.indexed_files.items()) if os.path.basename(path) in files]
+    if not file_ids:
+        raise HTTPException(status_code=400, detail="None of the requested files have been processed yet")
+    return file_ids
+
+def get_recommender(collection, model):
+    """
+    컬렉션에서 선택된 모델의 인덱스를 반환합니다. 아직 해당 모델로 임베딩되지 않았다면 한 번만 학습하고 저장합니다.
+    """
+    recommender = collection.indexes.get(model)
+    if recommender is None or not recommender.fitted:
+        if SERVER_ROLE == "serve":
+            # 서빙 워커는 스냅샷을 읽기만 하므로 인덱스를 직접 만들지 않음
+            raise HTTPException(status_code=409, detail=f"The current snapshot has no {model.value} index yet, "
+                                                        "run /embed_all_pdfs with this model on the ingest server")
+        with collection.ingest_lock:
+            return _build_recommender(collection, model)
+    return recommender
+
+def _build_recommender(collection, model):
+    recommender = collection.indexes.get(model)
+    if recommender is None or not recommender.fitted:
+        logger.info(f"No index for model {model} in collection '{collection.name}' yet, building it once")
+        recommender = SemanticSearch(model=model)
+        recommender.fit(collection.chunk_table)
+        collection.indexes[model] = recommender
+        persist_state(collection, [model])
+    return recommender
+
+def retrieve(recommender_instance, scope, questions, file_ids=None):
+    """
+    질문마다 캐시된 답변을 찾고, 없는 질문만 한 번에 임베딩하고 검색합니다.
+    유사도 모드에서는 검색에 쓴 질문 임베딩으로 비슷한 질문의 답변도 찾습니다.
+    검색 결과는 CONTEXT_CANDIDATES개까지 가져와 RERANKER 설정에 따라 RERANK_TOP_K개로 재정렬한 뒤,
+    build_context로 토큰 예산에 맞게 중복 제거/병합합니다.
+
+    Returns:
+        list: 질문별 (CachedAnswer 또는 None, 프롬프트에 넣을 조각 리스트, 질문 임베딩 또는 None)
+    """
+    results = []
+    for question in questions:
+        cached = answer_cache.get(scope, question)
+        results.append((cached, cached.chunks if cached else None, None))
+
+    pending = [i for i, (cached, _, _) in enumerate(results) if cached is None]
+    if pending:
+        topn_chunks, embeddings = recommender_instance.query([questions[i] for i in pending], file_ids,
+                                                             k=CONTEXT_CANDIDATES, reranker=RERANKER)
+        for i, chunks, embedding in zip(pending, topn_chunks, embeddings):
+            cached = answer_cache.get_similar(scope, embedding)
+            if cached:
+                results[i] = (cached, cached.chunks, embedding)
+                continue
+            with stage("build_context"):
+                results[i] = (None, build_context(chunks), embedding)
+    return results
+
+async def generate_answer(question, language, openAI, recommender_instance, file_ids=None, collection=None):
+    """
+    Returns:
+        tuple: (답변, 답변 캐시 적중 여부)
+    """
     logger.info(f"Generating answer in {language} using model {recommender_instance.model}")
-    topn_chunks = recommender_instance(question)
+    started = time.perf_counter()
+    collection = collection or get_collection()
+    scope = answer_cache.scope(recommender_instance, language, file_ids, collection.name)
+    # 질문 임베딩은 블로킹 작업이므로 스레드풀에서, OpenAI 호출은 공유 비동기 클라이언트로 실행
+    [(cached, topn_chunks, embedding)] = await run_in_threadpool(retrieve, recommender_instance, scope, [question], file_ids)
+    if cached:
+        return cached.answer, True
+    return await complete(openAI, scope, question, language, topn_chunks, embedding, started), False
+
+async def stream_answer(question, language, openAI, recommender_instance, file_ids=None, collection=None):
+    """
+    검색이 끝나는 즉시 레퍼런스를 보내고, 답변은 생성되는 대로 Server-Sent Events로 보냅니다.
+
+    이벤트 순서: references(레퍼런스 목록) → token(답변 조각, 여러 번) → done, 실패하면 error
+    """
+    logger.info(f"Streaming answer in {language} using model {recommender_instance.model}")
+    started = time.perf_counter()
+    collection = collection or get_collection()
+    scope = answer_cache.scope(recommender_instance, language, file_ids, collection.name)
+    [(cached, topn_chunks, embedding)] = await run_in_threadpool(retrieve, recommender_instance, scope, [question], file_ids)
+    names = {info["id"]: os.path.basename(path) for path, info in list(collection.indexed_files.items())}
+
+    async def events():
+        yield _sse("references", [
+            {"ref": f"Ref{c.file_id}", "file": names.get(c.file_id), "page": c.page, "text": c.text}
+            for c in topn_chunks
+        ])
+        if cached:
+            yield _sse("token", cached.answer)
+            yield _sse("done", {"model_used": recommender_instance.model, "language": language, "cached": True})
+            return
+
+        tokens = []
+        completion_started = time.perf_counter()
+        try:
+            prompt = build_prompt(question, language, topn_chunks)
+            async for token in openAI.stream_chat_completion(**completion_args(prompt)):
+                tokens.append(token)
+                yield _sse("token", token)
+        except Exception as e:
+            logger.error(f"Error streaming answer: {str(e)}")
+            yield _sse("error", f"API Error: {str(e)}")
+            return
+        finally:
+            # 헤더는 이미 보냈으므로 히스토그램에만 남음 (클라이언트가 토큰을 읽는 시간 포함)
+            record("completion", time.perf_counter() - completion_started)
+        answer_cache.put(scope, question, "".join(tokens), topn_chunks, time.perf_counter() - started, embedding)
+        yield _sse("done", {"model_used": recommender_instance.model, "language": language, "cached": False})
+
+    # X-Accel-Buffering: nginx 프록시가 응답을 모아 두지 않고 바로 전달하도록 함
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def build_prompt(question, language, topn_chunks):
     prompt = "search results:\n\n"
     for c in topn_chunks:
-        prompt += c + '\n\n'
+        # 레퍼런스(파일 번호, 페이지)는 임베딩에 섞지 않고 프롬프트를 만들 때 붙임
+        prompt += format_reference(c.text, f"Ref{c.file_id}", c.page) + '\n\n'
 
     language_instruction = "Answer in English" if language == Language.ENGLISH else "답변은 한국어로 작성해주세요"
     
@@ -52,20 +248,31 @@ def generate_answer(question, language, openAI, recommender_instance):
         "answer should be short and concise. Answer step-by-step. \n\n"
         f"Query: {question}\nAnswer: "
     )
+    return prompt
+
+def completion_args(prompt):
+    return dict(
+        model="gpt-3.5-turbo",
+        messages=[{"role": "user", "content": prompt}],
+        #max_tokens=512,
+        n=1,
+        stop=None,
+        temperature=0.7
+    )
 
+async def complete(openAI, scope, question, language, topn_chunks, embedding=None, started=None):
+    """
+    답변을 생성하고, 성공하면 답변 캐시에 저장합니다. 실패하면 오류 메시지를 답변으로 반환합니다.
+    """
     try:
-        response = openAI.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            #max_tokens=512,
-            n=1,
-            stop=None,
-            temperature=0.7
-        )
+        with stage("completion"):
+            response = await openAI.create_chat_completion(**completion_args(build_prompt(question, language, topn_chunks)))
         answer = response.choices[0].message.content
         logger.info("Answer generated successfully")
     except Exception as e:
         logger.error(f"Error generating answer: {str(e)}")
-        answer = f'API Error: {str(e)}'
+        return f'API Error: {str(e)}'
 
+    cost = time.perf_counter() - started if started is not None else 0.0
+    answer_cache.put(scope, question, answer, topn_chunks, cost, embedding)
     return answer
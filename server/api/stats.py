@@ -0,0 +1,14 @@
+from fastapi.responses import JSONResponse
+from models.answer_cache import answer_cache
+from models.embedding_cache import embedding_cache
+from utils.openai_client import openai_client
+
+async def get_stats():
+    """
+    답변 캐시와 임베딩 캐시의 적중률, 절약한 시간, OpenAI 요청/재시도 수를 반환합니다.
+    """
+    return JSONResponse(content={
+        "answer_cache": answer_cache.stats(),
+        "embedding_cache": embedding_cache.stats(),
+        "openai": dict(openai_client.stats),
+    }, status_code=200)
@@ -1,60 +1,160 @@
+import hashlib
 import os
 import logging
-from fastapi import UploadFile, HTTPException, File
+import tempfile
+from fastapi import UploadFile, HTTPException, File, Query
 from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 from urllib.parse import urlparse
-from config.state import uploaded_files  # 전역 상태
-from utils.pdf_processing import download_pdf
+from config.state import DEFAULT_COLLECTION
+from config.settings import MAX_UPLOAD_MB, UPLOAD_CHUNK_BYTES
+from utils.pdf_processing import iter_download, FileTooLarge
+from models.vector_store import persist_uploads
+from api.collections import resolve_collection
 
 logger = logging.getLogger(__name__)
 
-def get_unique_filename(directory, filename):
+MAX_UPLOAD_BYTES = MAX_UPLOAD_MB << 20
+
+def get_unique_filename(directory, filename, sha256):
     """
-    디렉토리 내에서 고유한 파일명을 생성합니다.
+    디렉토리 내에서 고유한 파일명을 생성합니다. 이름이 겹치면 내용 해시 앞부분을 붙입니다.
+    같은 내용은 중복 업로드로 먼저 걸러지므로 번호를 하나씩 늘려 가며 확인할 필요가 없습니다.
     """
+    if not os.path.exists(os.path.join(directory, filename)):
+        return filename
     base, ext = os.path.splitext(filename)
-    counter = 1
-    new_filename = filename
+    candidate = f"{base}_{sha256[:12]}{ext}"
+    if not os.path.exists(os.path.join(directory, candidate)):
+        return candidate
+    return f"{base}_{sha256}{ext}"
+
+class UploadWriter:
+    """
+    업로드 디렉토리의 임시 파일에 청크 단위로 쓰면서 크기와 sha256을 계산합니다.
+    최종 경로와 같은 디렉토리에 쓰므로 완료 후 os.replace로 원자적으로 옮길 수 있습니다.
+    """
+
+    def __init__(self, directory, max_bytes=MAX_UPLOAD_BYTES):
+        os.makedirs(directory, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".part")
+        self.file = os.fdopen(fd, "wb")
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+        self.max_bytes = max_bytes
 
-    while os.path.exists(os.path.join(directory, new_filename)):
-        new_filename = f"{base}_{counter}{ext}"
-        counter += 1
+    def write(self, chunk):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise FileTooLarge(f"File is larger than {self.max_bytes} bytes")
+        self.sha256.update(chunk)
+        self.file.write(chunk)
 
-    return new_filename
+    def discard(self):
+        self.file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
 
-async def upload_pdf(file: UploadFile = File(...)):
+def _commit_upload(collection, writer, filename, replace):
+    """
+    임시 파일을 업로드 목록에 등록합니다. 같은 내용의 파일이 이미 있으면 임시 파일을 지우고 그 경로를 반환합니다.
+
+    Args:
+        replace (bool): True면 같은 이름의 파일을 덮어쓰고(내용이 바뀐 파일로 다시 인덱싱됨), False면 새 이름을 붙임
+
+    Returns:
+        tuple: (파일 경로, 중복 여부)
+    """
+    writer.file.close()
+    sha256 = writer.sha256.hexdigest()
+    # 같은 내용이 동시에 올라와도 하나만 저장되도록 확인과 등록을 한 잠금 안에서 함
+    with collection.lock:
+        existing = collection.find_content(sha256)
+        if existing is None:
+            if not replace:
+                filename = get_unique_filename(collection.upload_dir, filename, sha256)
+            file_path = os.path.join(collection.upload_dir, filename)
+            os.replace(writer.path, file_path)
+            stat = os.stat(file_path)
+            fingerprint = {"sha256": sha256, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if existing is not None:
+        writer.discard()
+        return existing, True
+    collection.add_upload(file_path, fingerprint)  # 파일 경로 저장
+    persist_uploads(collection)
+    return file_path, False
+
+async def _store(collection, chunks, filename, replace):
+    """
+    비동기 청크 이터레이터의 내용을 디스크에 스트리밍으로 저장합니다. 메모리에는 청크 하나만 올라옵니다.
+    """
+    # 디스크 쓰기와 해시 계산은 이벤트 루프를 막지 않도록 스레드 풀에서 실행
+    writer = await run_in_threadpool(UploadWriter, collection.upload_dir)
+    try:
+        async for chunk in chunks:
+            await run_in_threadpool(writer.write, chunk)
+        return await run_in_threadpool(_commit_upload, collection, writer, filename, replace)
+    except BaseException:
+        await run_in_threadpool(writer.discard)
+        raise
+
+async def _read_chunks(file):
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            return
+        yield chunk
+
+def _upload_response(message, file_path, collection, duplicate):
+    return JSONResponse(content={"message": message, "file_path": file_path, "collection": collection.name,
+                                 "duplicate": duplicate}, status_code=200)
+
+async def upload_pdf(
+    file: UploadFile = File(...),
+    collection: str = Query(default=DEFAULT_COLLECTION, description="업로드할 문서 컬렉션 (없으면 새로 만듦)")
+):
     if not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Invalid file format. Please upload a PDF.")
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"File is larger than {MAX_UPLOAD_MB} MB")
 
-    file_path = os.path.join('uploads', file.filename)
+    target = resolve_collection(collection, create=True)
     try:
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-        uploaded_files.append(file_path)  # 파일 경로 저장
-        logger.info(f"File uploaded successfully: {file_path}")
+        file_path, duplicate = await _store(target, _read_chunks(file), os.path.basename(file.filename), replace=True)
+    except FileTooLarge:
+        raise HTTPException(status_code=413, detail=f"File is larger than {MAX_UPLOAD_MB} MB")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error saving file: {str(e)}")
 
-    return JSONResponse(content={"message": f"PDF '{file.filename}' uploaded successfully", "file_path": file_path}, status_code=200)
+    if duplicate:
+        logger.info(f"Upload of {file.filename} has the same content as {file_path}, skipped")
+        return _upload_response(f"PDF '{file.filename}' is already uploaded", file_path, target, True)
+    logger.info(f"File uploaded successfully: {file_path}")
+    return _upload_response(f"PDF '{file.filename}' uploaded successfully", file_path, target, False)
 
 
 
-async def upload_pdf_url(url: str):
+async def upload_pdf_url(
+    url: str,
+    collection: str = Query(default=DEFAULT_COLLECTION, description="업로드할 문서 컬렉션 (없으면 새로 만듦)")
+):
     parsed_url = urlparse(url)
     filename = os.path.basename(parsed_url.path)
 
     if not filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="URL does not point to a PDF file.")
 
-    # 고유한 파일명을 생성
-    file_path = os.path.join('uploads', get_unique_filename('uploads', filename))
-
+    target = resolve_collection(collection, create=True)
     try:
-        download_pdf(url, file_path)
-        uploaded_files.append(file_path)  # 파일 경로 저장
-        logger.info(f"PDF downloaded and saved successfully: {file_path}")
+        # 이름이 겹치면 고유한 파일명을 생성
+        file_path, duplicate = await _store(target, iter_download(url, MAX_UPLOAD_BYTES), filename, replace=False)
+    except FileTooLarge:
+        raise HTTPException(status_code=413, detail=f"File is larger than {MAX_UPLOAD_MB} MB")
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error downloading PDF: {str(e)}")
 
-    return JSONResponse(content={"message": "PDF downloaded successfully", "file_path": file_path}, status_code=200)
+    if duplicate:
+        logger.info(f"PDF at {url} has the same content as {file_path}, skipped")
+        return _upload_response("PDF is already uploaded", file_path, target, True)
+    logger.info(f"PDF downloaded and saved successfully: {file_path}")
+    return _upload_response("PDF downloaded successfully", file_path, target, False)
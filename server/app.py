@@ -10,7 +10,6 @@ import logging
 
 import fitz
 import numpy as np
-import tensorflow_hub as hub
 from openai import OpenAI
 from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Query
 from fastapi.responses import JSONResponse
@@ -33,9 +32,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-logger.info("Loading Universal Sentence Encoder...")
-USE_MODEL = hub.load("https://tfhub.dev/google/universal-sentence-encoder/4")
-logger.info("Universal Sentence Encoder loaded successfully.")
+USE_MODEL = None
+
+def get_use_model():
+    # TensorFlow와 USE 모델은 처음 USE 임베딩을 만들 때 불러옴
+    global USE_MODEL
+    if USE_MODEL is None:
+        import tensorflow_hub as hub
+        logger.info("Loading Universal Sentence Encoder...")
+        USE_MODEL = hub.load(os.getenv("USE_MODEL_PATH", "https://tfhub.dev/google/universal-sentence-encoder/4"))
+        logger.info("Universal Sentence Encoder loaded successfully.")
+    return USE_MODEL
 
 client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
 logger.info("OpenAI client initialized.")
@@ -135,7 +142,7 @@ class SemanticSearch:
         embeddings = []
         for i in range(0, len(texts), batch):
             text_batch = texts[i : (i + batch)]
-            emb_batch = USE_MODEL(text_batch)
+            emb_batch = get_use_model()(text_batch)
             embeddings.append(emb_batch)
         return np.vstack(embeddings)
 
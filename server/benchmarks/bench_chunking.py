@@ -0,0 +1,96 @@
+"""
+text_to_chunks 처리량 벤치마크.
+
+합성 코퍼스(짧은 페이지가 많은 문서 포함)에서 이전 구현(단어 리스트 복사 방식)과
+현재 구현(바이트 오프셋 방식)의 처리량을 비교하고, 현재 구현이 ASCII 공백으로 단어를 나눈 기준 구현과
+같은 조각을 만드는지 확인합니다.
+
+    $ cd server && python -m benchmarks.bench_chunking --pages 20000
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")  # config.settings 임포트용 (API는 호출하지 않음)
+
+from utils.text_processing import preprocess, text_to_chunks
+
+def legacy_text_to_chunks(texts, file_ref, word_length=150, start_page=1):
+    # 비교 기준: 이전 utils/text_processing.text_to_chunks 구현
+    text_toks = [t.split(' ') for t in texts]
+    chunks = []
+
+    for idx, words in enumerate(text_toks):
+        for i in range(0, len(words), word_length):
+            chunk = words[i : i + word_length]
+            if (i + word_length) > len(words) and (len(chunk) < word_length) and (len(text_toks) != (idx + 1)):
+                text_toks[idx + 1] = chunk + text_toks[idx + 1]
+                continue
+            chunk = ' '.join(chunk).strip()
+            chunks.append(f'"{chunk}" Ref: {file_ref}, P: {idx+start_page}]')
+    return chunks
+
+def reference_text_to_chunks(texts, file_ref, word_length=150, start_page=1):
+    # 정답 기준: 이전 구현과 같은 단어 수 조각이지만 단어를 ASCII 공백(줄바꿈, 탭 포함)으로 나눔
+    text_toks = [[word.decode('utf-8') for word in t.encode('utf-8').split()] for t in texts]
+    chunks = []
+
+    for idx, words in enumerate(text_toks):
+        for i in range(0, len(words), word_length):
+            chunk = words[i : i + word_length]
+            if (i + word_length) > len(words) and (len(chunk) < word_length) and (len(text_toks) != (idx + 1)):
+                text_toks[idx + 1] = chunk + text_toks[idx + 1]
+                continue
+            chunks.append(f'"{" ".join(chunk)}" Ref: {file_ref}, P: {idx+start_page}]')
+    return chunks
+
+_SEPARATORS = [" "] * 12 + ["\n", " \n", "\t", "\r\n"]
+
+def make_corpus(pages, seed=0):
+    rng = random.Random(seed)
+    vocab = [f"word{i}" for i in range(5000)] + ["한국어", "문서", "검색", "E-1042", "part#77"]
+    corpus = []
+    for _ in range(pages):
+        # 대부분은 일반 페이지, 일부는 단어 몇 개짜리 짧은 페이지 (꼬리 이월이 반복되는 경우)
+        n = rng.randint(2, 20) if rng.random() < 0.3 else rng.randint(200, 600)
+        # fitz 페이지 텍스트처럼 단어 사이에 줄바꿈/탭도 섞음
+        corpus.append("".join(rng.choice(vocab) + rng.choice(_SEPARATORS) for _ in range(n)).strip())
+    return corpus
+
+def measure(fn, corpus, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = fn(list(corpus), "Ref1")
+        best = min(best, time.perf_counter() - start)
+    return best, len(chunks)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=20000)
+    parser.add_argument("--short-run", type=int, default=2000, help="짧은 페이지만 연속된 구간의 페이지 수")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.pages)
+    corpus += ["tiny page"] * args.short_run
+    words = sum(len(page.split()) for page in corpus)
+
+    results = {"pages": len(corpus), "words": words}
+    for name, fn in [
+        ("legacy", legacy_text_to_chunks),
+        ("offsets", text_to_chunks),
+        ("offsets_overlap", lambda texts, ref: text_to_chunks(texts, ref, overlap=30)),
+        ("offsets_tokens", lambda texts, ref: text_to_chunks(texts, ref, token_length=256)),
+    ]:
+        seconds, count = measure(fn, corpus, args.repeat)
+        results[name] = {"seconds": round(seconds, 4), "chunks": count, "words_per_s": round(words / seconds)}
+
+    # 조각 본문은 페이지의 공백을 그대로 두므로 공백을 하나로 합쳐 비교
+    assert reference_text_to_chunks(list(corpus), "Ref1") == [preprocess(c) for c in text_to_chunks(list(corpus), "Ref1")]
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
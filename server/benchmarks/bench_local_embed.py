@@ -0,0 +1,100 @@
+"""
+임베딩 모델별 CPU 처리량과 동시 질문 임베딩 지연 시간 벤치마크.
+
+모델마다 합성 조각을 인제스트 배치로 임베딩해 초당 텍스트 수와 CPU 1초(코어 하나)당 텍스트 수를 재고,
+여러 스레드가 동시에 질문 하나씩 임베딩할 때(동시 /ask_question 호출)의 지연 시간을 잽니다.
+"local-unbatched"는 마이크로 배처 없이 로컬 모델을 호출해 배처의 효과를 비교합니다.
+임베딩 캐시는 측정마다 비우고 텍스트도 매번 다르게 만들어 캐시 적중이 없도록 합니다.
+
+    $ cd server && python -m benchmarks.bench_local_embed --models use local local-unbatched --concurrency 16
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")  # config.settings 임포트용 (API는 호출하지 않음)
+
+from benchmarks.bench_suite import percentiles, rate
+from models import embedding_model
+from models.embedding_cache import embedding_cache
+from models.embedding_model import (get_use_embedding, get_local_embedding,
+                                    load_use_model, load_local_model)
+
+_MODELS = {
+    "use": (load_use_model, get_use_embedding),
+    "local": (load_local_model, get_local_embedding),
+    "local-unbatched": (load_local_model, get_local_embedding),
+}
+
+def make_texts(count, words, seed):
+    rng = random.Random(seed)
+    vocab = [f"term{i}" for i in range(5000)]
+    return [" ".join(rng.choice(vocab) for _ in range(rng.randint(words // 2, words))) for _ in range(count)]
+
+def measure_ingest(embed, texts):
+    embedding_cache.clear()
+    started, cpu_started = time.perf_counter(), time.process_time()
+    embed(texts, 1000)
+    elapsed, cpu = time.perf_counter() - started, time.process_time() - cpu_started
+    return {"texts": len(texts), "texts_per_second": rate(len(texts), elapsed), "texts_per_cpu_second": rate(len(texts), cpu)}
+
+def measure_queries(embed, concurrency, per_thread, seed):
+    embedding_cache.clear()
+    questions = make_texts(concurrency * per_thread, 12, seed)
+    latencies = [[] for _ in range(concurrency)]
+    barrier = threading.Barrier(concurrency)
+
+    def worker(i):
+        barrier.wait()
+        for question in questions[i::concurrency]:
+            started = time.perf_counter()
+            embed([question], 1000)
+            latencies[i].append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    flat = [seconds for thread_latencies in latencies for seconds in thread_latencies]
+    return {"concurrency": concurrency, "queries": len(flat), "queries_per_second": rate(len(flat), elapsed), **percentiles(flat)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", nargs="+", default=["local", "local-unbatched"], choices=sorted(_MODELS))
+    parser.add_argument("--chunks", type=int, default=2000, help="인제스트 측정에 쓸 조각 수")
+    parser.add_argument("--words", type=int, default=200, help="조각당 최대 단어 수")
+    parser.add_argument("--concurrency", type=int, default=16, help="동시에 질문을 임베딩할 스레드 수")
+    parser.add_argument("--queries", type=int, default=20, help="스레드당 질문 수")
+    args = parser.parse_args()
+
+    texts = make_texts(args.chunks, args.words, 0)
+    results = {"chunks": args.chunks, "cpus": os.cpu_count(), "models": {}}
+    batcher = embedding_model._local_batcher
+    for seed, name in enumerate(args.models, start=1):
+        load, embed = _MODELS[name]
+        try:
+            started = time.perf_counter()
+            load()
+            load_seconds = round(time.perf_counter() - started, 3)
+        except Exception as e:
+            results["models"][name] = {"error": str(e)}
+            continue
+        # 마이크로 배처 대신 모델을 바로 호출 (동시 호출은 onnxruntime 세션에서 각자 실행됨)
+        embedding_model._local_batcher = load_local_model() if name == "local-unbatched" else batcher
+        embed([texts[0]], 1000)  # 첫 호출의 그래프 초기화 시간은 제외
+        results["models"][name] = {
+            "load_seconds": load_seconds,
+            "ingest": measure_ingest(embed, texts),
+            "query": measure_queries(embed, args.concurrency, args.queries, seed * 1000),
+        }
+    embedding_model._local_batcher = batcher
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+공유 OpenAI 클라이언트 벤치마크.
+
+로컬 모의 서버(benchmarks/mock_openai.py)에 요청/토큰 한도와 오류를 걸어 두고,
+예전 방식(동기 클라이언트로 1,000개씩 차례로 요청)과 공유 비동기 클라이언트의 임베딩 처리량을 비교합니다.
+임베딩이 입력 순서와 일치하는지, 재시도 후에도 모든 결과가 맞는지 검사하고 답변 생성 동시 호출도 측정합니다.
+
+    $ cd server && python -m benchmarks.bench_openai --texts 20000 --latency 0.05 --rpm 200 --tpm 2000000
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import numpy as np
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")  # config.settings 임포트용 (모의 서버만 호출)
+
+from openai import OpenAI
+
+from benchmarks.mock_openai import MockOpenAIServer, expected_embedding
+from utils.openai_client import OpenAIClient
+
+MODEL = "text-embedding-ada-002"
+
+def make_texts(count, words=120, seed=0):
+    rng = np.random.default_rng(seed)
+    vocab = [f"w{i}" for i in range(5000)]
+    return [" ".join(rng.choice(vocab, words)) + f" #{i}" for i in range(count)]
+
+def check(embeddings, texts, dim):
+    expected = np.vstack([expected_embedding(text, dim) for text in texts])
+    assert embeddings.shape == expected.shape, (embeddings.shape, expected.shape)
+    assert np.allclose(embeddings, expected, atol=1e-6), "embeddings out of order or corrupted"
+
+def run_sequential(server, texts, batch=1000):
+    # 예전 models/embedding_model.py 방식: 동기 클라이언트, 1,000개 배치를 하나씩, SDK 기본 재시도
+    client = OpenAI(api_key="benchmark", base_url=server.base_url, max_retries=10)
+    rows = []
+    for start in range(0, len(texts), batch):
+        response = client.embeddings.create(input=texts[start : start + batch], model=MODEL)
+        rows.extend(item.embedding for item in sorted(response.data, key=lambda item: item.index))
+    return np.asarray(rows, dtype=np.float32)
+
+async def run_chat(client, count):
+    messages = [{"role": "user", "content": "search results: ... Query: what is it?\nAnswer: "}]
+    responses = await asyncio.gather(*(client.create_chat_completion(model="gpt-3.5-turbo", messages=messages)
+                                       for _ in range(count)))
+    assert all(r.choices[0].message.content.startswith("mock answer") for r in responses)
+
+def measure(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.05, help="모의 서버의 요청당 처리 시간(초)")
+    parser.add_argument("--rpm", type=int, default=200, help="window 초당 허용 요청 수 (0이면 무제한)")
+    parser.add_argument("--tpm", type=int, default=2000000, help="window 초당 허용 토큰 수 (0이면 무제한)")
+    parser.add_argument("--window", type=float, default=1.0)
+    parser.add_argument("--failure-rate", type=float, default=0.02)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--chat-requests", type=int, default=200)
+    parser.add_argument("--skip-sequential", action="store_true")
+    args = parser.parse_args()
+
+    texts = make_texts(args.texts)
+    results = {"texts": args.texts, "latency": args.latency, "rpm": args.rpm, "tpm": args.tpm,
+               "window": args.window, "failure_rate": args.failure_rate}
+
+    def server():
+        return MockOpenAIServer(latency=args.latency, rpm=args.rpm, tpm=args.tpm, window=args.window,
+                                failure_rate=args.failure_rate, dim=args.dim)
+
+    if not args.skip_sequential:
+        with server() as mock:
+            embeddings, elapsed = measure(lambda: run_sequential(mock, texts))
+            check(embeddings, texts, args.dim)
+            results["sequential"] = {"seconds": round(elapsed, 3), "texts_per_s": round(len(texts) / elapsed, 1),
+                                     "server": dict(mock.stats)}
+
+    with server() as mock:
+        client = OpenAIClient(api_key="benchmark", base_url=mock.base_url, max_concurrency=args.concurrency)
+        embeddings, elapsed = measure(lambda: client.embed(texts, MODEL))
+        check(embeddings, texts, args.dim)
+        results["shared_client"] = {"seconds": round(elapsed, 3), "texts_per_s": round(len(texts) / elapsed, 1),
+                                    "client": dict(client.stats), "server": dict(mock.stats)}
+
+        _, elapsed = measure(lambda: asyncio.run(run_chat(client, args.chat_requests)))
+        results["chat"] = {"requests": args.chat_requests, "seconds": round(elapsed, 3),
+                           "requests_per_s": round(args.chat_requests / elapsed, 1)}
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
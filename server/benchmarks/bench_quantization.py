@@ -0,0 +1,86 @@
+"""
+임베딩 압축(EMBEDDING_STORAGE) 벤치마크.
+
+군집 구조가 있는 합성 임베딩을 디스크에 float32 .npy로 저장하고 memmap으로 연 뒤(서버가 복원할 때와 같은 상태),
+float32/float16/int8 저장 방식마다 메모리에 남는 바이트(100만 조각 기준으로 환산), 질문당 지연 시간,
+float32 정확 검색 대비 recall@k를 측정합니다. int8/float16은 재정렬 후보 배수(--refine)별로 재정렬 없이(1) 쓴 경우와 비교합니다.
+
+    $ cd server && python -m benchmarks.bench_quantization --size 200000 --dim 1536 --refine 1 4 10
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")  # config.settings 임포트용 (API는 호출하지 않음)
+
+import models.search_backends as search_backends
+from models.search_backends import ExactDotBackend
+from benchmarks.bench_search import make_embeddings, make_queries, recall
+
+def heap_bytes(backend):
+    # memmap으로 연 원본 임베딩은 디스크 페이지를 공유하므로 백엔드가 메모리에 만든 배열만 셈
+    embeddings = 0 if isinstance(backend.embeddings, np.memmap) else backend.embeddings.nbytes
+    return int(backend.nbytes + embeddings)
+
+def measure(backend, queries, k):
+    latencies, found = [], []
+    for query in queries:
+        start = time.perf_counter()
+        found.extend(backend.search(query[None], k))
+        latencies.append(time.perf_counter() - start)
+    return found, latencies
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--storage", nargs="+", default=["float32", "float16", "int8"])
+    parser.add_argument("--refine", type=int, nargs="+", default=[1, 4, 10], help="재정렬 후보 배수 (ANN_REFINE)")
+    args = parser.parse_args()
+
+    embeddings = make_embeddings(args.size, args.dim)
+    queries = make_queries(embeddings, args.queries)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "embeddings.npy")
+        np.save(path, embeddings)
+        del embeddings
+        mapped = np.load(path, mmap_mode="r")
+
+        truth = ExactDotBackend("float32")
+        truth.build(mapped)
+        truth = truth.search(queries, args.k)
+
+        results = {"size": args.size, "dim": args.dim, "queries": args.queries, "k": args.k,
+                   "float32_bytes_per_million": 4 * args.dim * 1_000_000, "storage": {}}
+        for storage in args.storage:
+            backend = ExactDotBackend(storage)
+            start = time.perf_counter()
+            backend.build(mapped)
+            build_seconds = time.perf_counter() - start
+            entry = {
+                "build_s": round(build_seconds, 3),
+                "heap_bytes": heap_bytes(backend),
+                "heap_bytes_per_million": int(heap_bytes(backend) / args.size * 1_000_000),
+                "refine": {},
+            }
+            for refine in (args.refine if storage != "float32" else [None]):
+                if refine is not None:
+                    search_backends.ANN_REFINE = refine
+                found, latencies = measure(backend, queries, args.k)
+                entry["refine"][str(refine or "-")] = {
+                    "query_p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+                    "query_p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 3),
+                    f"recall@{args.k}": round(recall(found, truth, args.k), 4),
+                }
+            results["storage"][storage] = entry
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+검색 결과 재정렬(RERANKER) 벤치마크.
+
+같은 내용이 조금씩 바뀐 사본(중복 업로드, 겹치는 조각)이 여러 개 있는 합성 코퍼스에서, 재정렬 방식마다
+질문당 검색+재정렬 지연 시간, build_context를 거쳐 프롬프트에 들어가는 조각 수와 토큰 수, 그중 서로 다른 원본 구절 수,
+질문을 만든 구절이 프롬프트에 들어간 비율을 측정합니다.
+임베딩은 bench_suite의 결정적 스텁 인코더를 사용합니다. cross-encoder는 sentence-transformers가 설치되어 있을 때만 측정합니다.
+
+    $ cd server && python -m benchmarks.bench_rerank --passages 2000 --copies 3 --methods none mmr cross-encoder
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+import numpy as np
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")  # config.settings 임포트용 (API는 호출하지 않음)
+
+from benchmarks.bench_suite import StubEncoder, percentiles
+from config.settings import CONTEXT_CANDIDATES, RERANK_TOP_K
+from models import embedding_model
+from models.chunk_table import ChunkTable
+from models.embedding_model import EmbeddingModel
+from models.reranker import load_cross_encoder
+from models.semantic_search import SemanticSearch
+from utils.context_builder import build_context, passage_tokens
+
+def make_corpus(passages, copies, words, seed=0):
+    """
+    원본 구절마다 단어 몇 개만 바꾼 사본을 copies개씩 만듭니다. (본문 리스트, 조각별 원본 번호)를 반환합니다.
+    """
+    rng = random.Random(seed)
+    vocab = [f"word{i}" for i in range(20000)]
+    texts, sources = [], []
+    for source in range(passages):
+        base = [rng.choice(vocab) for _ in range(words)]
+        for _ in range(copies):
+            copy = list(base)
+            for i in rng.sample(range(words), max(1, words // 20)):
+                copy[i] = rng.choice(vocab)
+            texts.append(" ".join(copy))
+            sources.append(source)
+    return texts, np.asarray(sources)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--passages", type=int, default=2000, help="원본 구절 수")
+    parser.add_argument("--copies", type=int, default=3, help="구절마다 비슷한 사본 수")
+    parser.add_argument("--words", type=int, default=120, help="구절당 단어 수")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--candidates", type=int, default=CONTEXT_CANDIDATES, help="재정렬할 검색 후보 수")
+    parser.add_argument("--top-k", type=int, default=RERANK_TOP_K, help="재정렬 후 남길 조각 수")
+    parser.add_argument("--methods", nargs="+", default=["none", "mmr"])
+    args = parser.parse_args()
+
+    texts, sources = make_corpus(args.passages, args.copies, args.words)
+    encoder = StubEncoder(args.dim)
+    embedding_model._use_model = encoder
+    embedding_model.use_status.update(state="loaded")
+    table = ChunkTable()
+    # 페이지를 조각마다 다르게 두어 build_context가 사본끼리 합치지 않도록 함
+    table.extend(texts, np.ones(len(texts), dtype=np.int32), np.arange(1, len(texts) + 1))
+    recommender = SemanticSearch(model=EmbeddingModel.USE)
+    recommender.load(table, encoder(texts))
+
+    rng = random.Random(1)
+    targets = [rng.randrange(len(texts)) for _ in range(args.queries)]
+    questions = []
+    for row in targets:
+        words = texts[row].split()
+        start = rng.randrange(len(words) - 10)
+        questions.append(" ".join(words[start : start + 10]))
+
+    results = {"passages": args.passages, "copies": args.copies, "chunks": len(texts), "queries": args.queries,
+               "candidates": args.candidates, "top_k": args.top_k, "methods": {}}
+    for method in args.methods:
+        if method == "cross-encoder":
+            try:
+                load_cross_encoder()  # 모델 로드 시간은 제외
+            except Exception as e:
+                results["methods"][method] = {"error": str(e)}
+                continue
+        latencies, chunk_counts, tokens, distinct, found = [], [], [], [], 0
+        for row, question in zip(targets, questions):
+            started = time.perf_counter()
+            [chunks], _ = recommender.query([question], k=args.candidates, reranker=method, top_k=args.top_k)
+            latencies.append(time.perf_counter() - started)
+            context = build_context(chunks)
+            passages = {sources[chunk.row] for chunk in context if chunk.row is not None}  # 잘린 조각은 제외
+            chunk_counts.append(len(context))
+            tokens.append(sum(passage_tokens(chunk) for chunk in context))
+            distinct.append(len(passages))
+            found += sources[row] in passages
+        results["methods"][method] = {
+            "query": percentiles(latencies),
+            "context_chunks": round(float(np.mean(chunk_counts)), 2),
+            "distinct_passages": round(float(np.mean(distinct)), 2),
+            "context_tokens": round(float(np.mean(tokens)), 1),
+            "source_found": round(found / len(questions), 4),
+        }
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
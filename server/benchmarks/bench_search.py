@@ -0,0 +1,108 @@
+"""
+검색 백엔드 벤치마크.
+
+군집 구조가 있는 합성 임베딩에서 각 백엔드의 인덱스 생성 시간, 질문당 지연 시간, 정확 검색 대비 recall@k를 측정합니다.
+ivfpq는 --nprobe와 --refine의 조합마다 지연 시간과 recall을 따로 출력하므로, 같은 크기에서 정확 검색보다
+빠르면서 recall이 충분한 설정이 있는지(없으면 ivfpq를 쓰지 않는 편이 나음) 확인할 수 있습니다.
+--clusters 0은 군집이 없는 임베딩으로 최악의 경우를 봅니다.
+
+    $ cd server && python -m benchmarks.bench_search --size 200000 --dim 512 --backends exact ivfpq hnsw
+    $ cd server && python -m benchmarks.bench_search --size 50000 --backends exact ivfpq --nprobe 8 16 32 64 --refine 10 40
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")  # config.settings 임포트용 (API는 호출하지 않음)
+
+from models.search_backends import make_backend, IVFPQBackend, _normalize
+
+def make_embeddings(size, dim, clusters=256, seed=0):
+    # 문서 임베딩처럼 주제별 군집을 이루는 단위 벡터 (clusters=0이면 군집 없이 고르게 흩어진 벡터)
+    rng = np.random.default_rng(seed)
+    if clusters == 0:
+        return _normalize(rng.standard_normal((size, dim)).astype(np.float32))
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size)
+    noise = rng.standard_normal((size, dim)).astype(np.float32) * 0.6
+    return _normalize(centers[labels] + noise)
+
+def make_queries(embeddings, count, seed=1):
+    rng = np.random.default_rng(seed)
+    picks = embeddings[rng.choice(len(embeddings), count, replace=False)]
+    return _normalize(picks + rng.standard_normal(picks.shape).astype(np.float32) * 0.3)
+
+def recall(results, truth, k):
+    return float(np.mean([len(set(r[:k]) & set(t[:k])) / k for r, t in zip(results, truth)]))
+
+def index_bytes(backend):
+    if isinstance(backend, IVFPQBackend) and backend.trained:
+        return int(backend.nbytes - backend.exact.nbytes)
+    return None
+
+def measure(backend, queries, truth, k):
+    latencies = []
+    found = []
+    for query in queries:
+        start = time.perf_counter()
+        found.extend(backend.search(query[None], k))
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    backend.search(queries, k)
+    batch_seconds = time.perf_counter() - start
+    return {
+        "query_p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+        "query_p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 3),
+        "batch_qps": round(len(queries) / batch_seconds, 1),
+        f"recall@{k}": round(recall(found, truth, k), 4),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--clusters", type=int, default=256, help="합성 임베딩의 군집 수 (0이면 군집 없음)")
+    parser.add_argument("--backends", nargs="+", default=["exact", "sklearn", "ivfpq"])
+    parser.add_argument("--nprobe", type=int, nargs="+", help="ivfpq에서 측정할 IVF_NPROBE 값 (기본: 설정값)")
+    parser.add_argument("--refine", type=int, nargs="+", help="ivfpq에서 측정할 IVF_REFINE 값 (기본: 설정값)")
+    args = parser.parse_args()
+
+    embeddings = make_embeddings(args.size, args.dim, args.clusters)
+    queries = make_queries(embeddings, args.queries)
+
+    exact = make_backend("exact")
+    exact.build(embeddings)
+    truth = exact.search(queries, args.k)
+
+    results = {"size": args.size, "dim": args.dim, "clusters": args.clusters, "queries": args.queries, "k": args.k,
+               "backends": {}}
+    for name in args.backends:
+        try:
+            backend = make_backend(name)
+        except ImportError as e:
+            results["backends"][name] = {"skipped": str(e)}
+            continue
+        start = time.perf_counter()
+        backend.build(embeddings)
+        build_seconds = time.perf_counter() - start
+
+        results["backends"][name] = {"build_s": round(build_seconds, 3), **measure(backend, queries, truth, args.k),
+                                     "index_bytes": index_bytes(backend)}
+        if isinstance(backend, IVFPQBackend) and backend.trained and (args.nprobe or args.refine):
+            # 같은 인덱스로 프로브 수와 재정렬 후보 배수만 바꿔 가며 지연 시간/recall 절충을 측정
+            sweep = []
+            for nprobe in args.nprobe or [backend.nprobe]:
+                for refine in args.refine or [backend.refine]:
+                    backend.nprobe, backend.refine = nprobe, refine
+                    sweep.append({"nprobe": nprobe, "refine": refine, **measure(backend, queries, truth, args.k)})
+            results["backends"][name]["sweep"] = sweep
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+서버 시작 시간 벤치마크.
+
+새 프로세스에서 `python -X importtime -c "import main"` 을 실행해 모듈별 임포트 시간(누적)을 집계하고,
+uvicorn을 띄워 /health 가 응답할 때까지와 USE 모델 예열이 끝날 때까지의 시간을 잽니다.
+
+    $ cd server && python -m benchmarks.bench_startup --top 15
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_PACKAGES = ("main", "api", "models", "utils", "config")
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+def import_times(env):
+    """
+    Returns:
+        tuple: (import main 전체 시간(초), [(모듈, 자체 시간, 누적 시간, 깊이)] 리스트)
+    """
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                            cwd=SERVER_DIR, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            own, cumulative, indent, module = match.groups()
+            rows.append((module, int(own) / 1e6, int(cumulative) / 1e6, len(indent) // 2))
+    return elapsed, rows
+
+def summarize(rows, top):
+    # 외부 패키지는 최상위 패키지(점이 없는 이름)가 처음 임포트될 때의 누적 시간으로 집계
+    third_party = sorted((r for r in rows if "." not in r[0] and r[0] not in REPO_PACKAGES and r[3] > 0),
+                         key=lambda r: -r[2])[:top]
+    repo = sorted((r for r in rows if r[0].split(".")[0] in REPO_PACKAGES), key=lambda r: -r[2])[:top]
+    return {
+        "third_party": {module: round(cumulative, 4) for module, _, cumulative, _ in third_party},
+        "repo_modules": {module: {"self_s": round(own, 4), "cumulative_s": round(cumulative, 4)}
+                         for module, own, cumulative, _ in repo},
+    }
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def get_json(url):
+    with urllib.request.urlopen(url, timeout=1) as response:
+        return json.loads(response.read())
+
+def server_startup(env, timeout):
+    """
+    uvicorn 시작부터 /health 첫 응답, USE 모델 예열 완료(또는 실패)까지의 시간(초).
+    """
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+                               cwd=SERVER_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    result = {"health_s": None, "use_ready_s": None, "use_state": None}
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+            try:
+                health = get_json(f"http://127.0.0.1:{port}/health")
+            except OSError:
+                time.sleep(0.05)
+                continue
+            if result["health_s"] is None:
+                result["health_s"] = round(time.perf_counter() - started, 3)
+            result["use_state"] = health["models"]["use"]["state"]
+            if result["use_state"] in ("loaded", "failed", "not_loaded"):
+                result["use_ready_s"] = round(time.perf_counter() - started, 3)
+                break
+            time.sleep(0.05)
+    finally:
+        process.terminate()
+        process.wait()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--no-server", action="store_true", help="uvicorn 시작 시간은 재지 않음")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "benchmark")  # config.settings 임포트용 (API는 호출하지 않음)
+
+    elapsed, rows = import_times(env)
+    results = {"import_main_s": round(elapsed, 3), **summarize(rows, args.top)}
+    if not args.no_server:
+        results["server"] = server_startup(env, args.timeout)
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+인제스트, 검색, 질문 응답 전체 지연 시간 벤치마크 모음.
+
+네트워크 없이 재현할 수 있도록 합성 PDF를 만들고, 임베딩은 결정적인 스텁 인코더(단어 해싱) 또는
+모의 OpenAI 서버의 ADA 임베딩을, 답변 생성은 모의 OpenAI 서버(benchmarks/mock_openai.py)를 사용합니다.
+코퍼스 크기마다 새 프로세스에서 실행하므로 최대 RSS가 크기별로 따로 측정됩니다.
+
+측정 항목 (코퍼스 크기별):
+  - extract: PDF 페이지 추출 (pages/s)
+  - chunk: 조각 나누기 (chunks/s)
+  - embed: 조각 임베딩 (vectors/s, 임베딩 캐시를 비운 상태)
+  - ingest: sync_index 전체 파이프라인 (추출 -> 청킹 -> 임베딩 -> 인덱스/BM25)
+  - retrieval: 질문 하나의 검색 지연 p50/p95/p99 (ms)와 질문을 만든 조각이 결과에 있는 비율
+  - answer: generate_answer 전체 지연 p50/p95/p99 (ms, 모의 LLM 지연 포함, 답변 캐시 끔)
+  - peak_rss_mb: 측정 프로세스의 최대 RSS (PDF 추출 프로세스 풀은 제외)
+
+결과는 JSON으로 출력하며, --output으로 저장한 뒤 다른 커밋에서 --compare로 비교할 수 있습니다.
+
+    $ cd server && python -m benchmarks.bench_suite --docs 5 25 100 --output before.json
+    $ git checkout <다른 커밋> && python -m benchmarks.bench_suite --docs 5 25 100 --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+
+import numpy as np
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")  # config.settings 임포트용 (모의 서버만 호출)
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class StubEncoder:
+    """
+    USE 대신 쓰는 결정적 인코더. 단어의 crc32로 차원을 고르는 해싱 트릭이라 같은 단어를 공유하는 텍스트끼리 가깝습니다.
+    """
+
+    def __init__(self, dim=512):
+        self.dim = dim
+
+    def __call__(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            ids = [zlib.crc32(word.encode("utf-8")) % self.dim for word in text.lower().split()]
+            if ids:
+                vectors[i] = np.bincount(ids, minlength=self.dim)
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+def make_pdfs(directory, docs, pages, words, seed=0):
+    """
+    문서마다 주제 단어와 "ERR-<문서>-<번호>" 형식의 코드가 섞인 합성 PDF를 만듭니다.
+    """
+    import fitz
+
+    rng = random.Random(seed)
+    vocab = [f"word{i}" for i in range(5000)]
+    paths = []
+    for doc_id in range(docs):
+        topic = [f"topic{doc_id}x{i}" for i in range(50)]
+        pdf = fitz.open()
+        for _ in range(pages):
+            tokens = [rng.choice(topic) if rng.random() < 0.2 else rng.choice(vocab) for _ in range(words)]
+            tokens[rng.randrange(words)] = f"ERR-{doc_id}-{rng.randrange(1000)}"
+            lines = [" ".join(tokens[i : i + 10]) for i in range(0, words, 10)]
+            page = pdf.new_page()
+            for row, line in enumerate(lines):
+                page.insert_text((36, 36 + 12 * row), line, fontsize=8)
+        path = os.path.join(directory, f"doc{doc_id:05d}.pdf")
+        pdf.save(path)
+        pdf.close()
+        paths.append(path)
+    return paths
+
+def percentiles(seconds):
+    ms = np.asarray(seconds) * 1000
+    return {f"p{p}_ms": round(float(np.percentile(ms, p)), 3) for p in (50, 95, 99)}
+
+def peak_rss_mb():
+    # 리눅스는 KB, macOS는 바이트 단위
+    unit = 1 if sys.platform == "darwin" else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit / 2**20, 1)
+
+def rate(count, seconds):
+    return round(count / seconds, 1) if seconds else None
+
+def run_size(args):
+    """
+    코퍼스 크기 하나(args.docs[0]개 문서)를 측정합니다. 별도 프로세스에서 호출됩니다.
+    """
+    from benchmarks.mock_openai import MockOpenAIServer
+    from config.settings import CHUNK_WORD_LENGTH, CHUNK_OVERLAP, CHUNK_TOKEN_LENGTH
+    from config.state import Collection
+    from models import embedding_model
+    from models.answer_cache import answer_cache
+    from models.embedding_cache import embedding_cache
+    from models.embedding_model import EmbeddingModel, Language
+    from api.question import generate_answer
+    from utils.context_builder import load_encoding
+    from utils.ingestion import sync_index
+    from utils.openai_client import OpenAIClient
+    from utils.pdf_processing import iter_pdf_pages
+    from utils.text_processing import iter_chunks
+
+    docs = args.docs[0]
+    result = {"docs": docs, "pages": docs * args.pages}
+    answer_cache.max_entries = 0  # 같은 질문이 캐시에서 나오지 않도록
+    load_encoding()  # 서버처럼 시작할 때 tiktoken 인코딩을 불러옴
+
+    with tempfile.TemporaryDirectory() as directory, \
+            MockOpenAIServer(latency=args.llm_latency, dim=args.dim, token_latency=0) as mock:
+        client = OpenAIClient(api_key="benchmark", base_url=mock.base_url)
+        if args.embedder == "stub":
+            embedding_model._use_model = StubEncoder(args.dim)
+            embedding_model.use_status.update(state="loaded")
+            model = EmbeddingModel.USE
+        else:
+            embedding_model.openai_client = client
+            model = EmbeddingModel.ADA
+
+        paths = make_pdfs(directory, docs, args.pages, args.words)
+
+        started = time.perf_counter()
+        pages = [list(iter_pdf_pages(path)) for path in paths]
+        elapsed = time.perf_counter() - started
+        result["extract"] = {"seconds": round(elapsed, 3), "pages_per_s": rate(result["pages"], elapsed)}
+
+        started = time.perf_counter()
+        chunks = [text for doc in pages for _, text in iter_chunks(doc, word_length=CHUNK_WORD_LENGTH,
+                                                                    overlap=CHUNK_OVERLAP, token_length=CHUNK_TOKEN_LENGTH)]
+        elapsed = time.perf_counter() - started
+        result["chunk"] = {"chunks": len(chunks), "seconds": round(elapsed, 3), "chunks_per_s": rate(len(chunks), elapsed)}
+
+        embed = embedding_model.get_use_embedding if model == EmbeddingModel.USE else embedding_model.get_ada_embedding
+        embedding_cache.clear()
+        started = time.perf_counter()
+        embed(chunks)
+        elapsed = time.perf_counter() - started
+        result["embed"] = {"embedder": args.embedder, "seconds": round(elapsed, 3), "vectors_per_s": rate(len(chunks), elapsed)}
+
+        collection = Collection("benchmark")
+        collection.uploaded_files.extend(paths)
+        embedding_cache.clear()
+        started = time.perf_counter()
+        synced = sync_index(collection, model)
+        elapsed = time.perf_counter() - started
+        result["ingest"] = {"chunks": synced["total_chunks"], "seconds": round(elapsed, 3),
+                            "chunks_per_s": rate(synced["total_chunks"], elapsed)}
+
+        # 질문: 임의의 조각에서 연속된 단어 몇 개를 뽑음 (그 조각이 검색되어야 함)
+        recommender = collection.indexes[model]
+        table = collection.chunk_table
+        rng = random.Random(1)
+        sources = [rng.randrange(len(table)) for _ in range(args.queries)]
+        questions = []
+        for row in sources:
+            words = table.text(row).split()
+            start = rng.randrange(max(1, len(words) - 8))
+            questions.append(" ".join(words[start : start + 8]))
+
+        latencies, found = [], 0
+        for row, question in zip(sources, questions):
+            started = time.perf_counter()
+            neighbors, _ = recommender.neighbors([question])
+            latencies.append(time.perf_counter() - started)
+            found += row in set(neighbors[0].tolist())
+        result["retrieval"] = {"queries": len(questions), **percentiles(latencies),
+                               f"hit@{recommender.n_neighbors}": round(found / len(questions), 4)}
+
+        async def answer_all():
+            seconds = []
+            for question in questions[: args.answers]:
+                started = time.perf_counter()
+                answer, _ = await generate_answer(question, Language.ENGLISH, client, recommender, None, collection)
+                seconds.append(time.perf_counter() - started)
+                assert not answer.startswith("API Error"), answer
+            return seconds
+
+        latencies = asyncio.run(answer_all())
+        result["answer"] = {"questions": len(latencies), "llm_latency_ms": args.llm_latency * 1000, **percentiles(latencies)}
+
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+def git_revision():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SERVER_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=SERVER_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def child_args(args, docs):
+    return ["--docs", str(docs), "--pages", str(args.pages), "--words", str(args.words), "--queries", str(args.queries),
+            "--answers", str(args.answers), "--dim", str(args.dim), "--llm-latency", str(args.llm_latency),
+            "--embedder", args.embedder]
+
+def metrics(size):
+    # 비교할 값: (이름, 값, 클수록 좋은지)
+    yield "extract pages/s", size["extract"]["pages_per_s"], True
+    yield "chunk chunks/s", size["chunk"]["chunks_per_s"], True
+    yield "embed vectors/s", size["embed"]["vectors_per_s"], True
+    yield "ingest chunks/s", size["ingest"]["chunks_per_s"], True
+    for key in ("p50_ms", "p95_ms", "p99_ms"):
+        yield f"retrieval {key}", size["retrieval"][key], False
+    for key in ("p50_ms", "p95_ms", "p99_ms"):
+        yield f"answer {key}", size["answer"][key], False
+    yield "peak rss MB", size["peak_rss_mb"], False
+
+def compare(baseline, current):
+    """
+    같은 문서 수의 결과끼리 비교해 (현재 / 기준) 비율을 출력합니다. 나빠진 항목에는 '!'를 붙입니다.
+    """
+    before = {size["docs"]: size for size in baseline["sizes"]}
+    print(f"baseline {baseline.get('revision')} -> current {current.get('revision')}", file=sys.stderr)
+    for size in current["sizes"]:
+        if size["docs"] not in before:
+            continue
+        print(f"docs={size['docs']}", file=sys.stderr)
+        for (name, new, higher_better), (_, old, _) in zip(metrics(size), metrics(before[size["docs"]])):
+            if not old or new is None:
+                continue
+            ratio = new / old
+            worse = ratio < 0.9 if higher_better else ratio > 1.1
+            print(f"  {name:<22} {old:>12} -> {new:>12}  x{ratio:.2f}{' !' if worse else ''}", file=sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, nargs="+", default=[5, 25, 100], help="코퍼스 크기 (PDF 수)")
+    parser.add_argument("--pages", type=int, default=20, help="PDF당 페이지 수")
+    parser.add_argument("--words", type=int, default=400, help="페이지당 단어 수")
+    parser.add_argument("--queries", type=int, default=200, help="검색 지연을 잴 질문 수")
+    parser.add_argument("--answers", type=int, default=50, help="답변 전체 지연을 잴 질문 수")
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="모의 LLM의 답변당 지연(초)")
+    parser.add_argument("--embedder", choices=["stub", "mock-ada"], default="stub",
+                        help="stub: 결정적 해싱 인코더(USE 자리), mock-ada: 모의 서버의 ADA 임베딩")
+    parser.add_argument("--output", help="결과 JSON을 저장할 경로")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON 경로")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_size(args)))
+        return
+
+    results = {
+        "revision": git_revision(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare", "child")},
+        "sizes": [],
+    }
+    for docs in args.docs:
+        print(f"Running {docs} documents...", file=sys.stderr)
+        output = subprocess.run([sys.executable, "-m", "benchmarks.bench_suite", "--child", *child_args(args, docs)],
+                                cwd=SERVER_DIR, capture_output=True, text=True)
+        if output.returncode != 0:
+            raise RuntimeError(output.stderr[-2000:])
+        # 라이브러리 경고가 stdout에 섞일 수 있으므로 마지막 줄만 결과로 사용
+        results["sizes"].append(json.loads(output.stdout.strip().splitlines()[-1]))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), results)
+
+if __name__ == "__main__":
+    main()
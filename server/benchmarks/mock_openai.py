@@ -0,0 +1,198 @@
+"""
+벤치마크용 로컬 OpenAI 호환 서버.
+
+/v1/embeddings 와 /v1/chat/completions 를 흉내 내며, 요청별 지연, x-ratelimit-* 헤더,
+요청/토큰 한도 초과 시 429, 임의의 500 오류를 재현할 수 있습니다.
+임베딩은 텍스트의 sha256으로 정해지므로 순서가 뒤섞이면 expected_embedding()과 달라집니다.
+"""
+import hashlib
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+def expected_embedding(text, dim):
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+class MockOpenAIServer:
+    """
+    Args:
+        latency (float): 요청 하나당 처리 시간(초). 스트리밍 답변은 첫 조각까지의 시간
+        token_latency (float): 스트리밍 답변에서 조각 사이의 간격(초)
+        rpm, tpm (int): window 초 동안 허용할 요청 수와 (근사) 토큰 수. 0이면 제한 없음
+        window (float): 한도 기준 시간(초). 실제 API는 60초지만 벤치마크에서는 짧게 씀
+        failure_rate (float): 500 오류를 돌려줄 확률
+        dim (int): 임베딩 차원
+    """
+
+    def __init__(self, latency=0.05, rpm=0, tpm=0, window=1.0, failure_rate=0.0, dim=64, seed=0, token_latency=0.02):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window = window
+        self.failure_rate = failure_rate
+        self.dim = dim
+        self.random = random.Random(seed)
+        self.stats = {"requests": 0, "rate_limited": 0, "failed": 0, "in_flight": 0, "max_in_flight": 0}
+        self._updated_at = time.monotonic()
+        self._used_requests = 0.0
+        self._used_tokens = 0.0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _admit(self, tokens):
+        """
+        OpenAI처럼 한도가 window 초에 걸쳐 연속으로 다시 차는 버킷으로 판단합니다.
+        한도 안이면 (True, 헤더), 넘으면 (False, 헤더)를 반환합니다.
+        """
+        with self._lock:
+            now = time.monotonic()
+            elapsed, self._updated_at = now - self._updated_at, now
+            if self.rpm:
+                self._used_requests = max(0.0, self._used_requests - elapsed * self.rpm / self.window)
+            if self.tpm:
+                self._used_tokens = max(0.0, self._used_tokens - elapsed * self.tpm / self.window)
+            ok = (not self.rpm or self._used_requests + 1 <= self.rpm) and (not self.tpm or self._used_tokens + tokens <= self.tpm)
+            if ok:
+                self._used_requests += 1
+                self._used_tokens += tokens
+            headers = {}
+            waits = []
+            for kind, limit, used, need in (("requests", self.rpm, self._used_requests, 1),
+                                            ("tokens", self.tpm, self._used_tokens, tokens)):
+                if not limit:
+                    continue
+                # reset: 한도가 전부 다시 찰 때까지 걸리는 시간
+                headers[f"x-ratelimit-limit-{kind}"] = str(limit)
+                headers[f"x-ratelimit-remaining-{kind}"] = str(int(limit - used))
+                headers[f"x-ratelimit-reset-{kind}"] = f"{used * self.window / limit * 1000:.0f}ms"
+                waits.append(max(0.0, used + need - limit) * self.window / limit)
+            if not ok:
+                headers["retry-after-ms"] = f"{max(waits) * 1000:.0f}"
+            return ok, headers
+
+    def _handle(self, path, body):
+        if path.endswith("/embeddings"):
+            texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+            tokens = sum(max(1, len(text.encode("utf-8")) // 4) for text in texts)
+        elif path.endswith("/chat/completions"):
+            texts = None
+            tokens = sum(max(1, len(m["content"].encode("utf-8")) // 4) for m in body["messages"])
+        else:
+            return 404, {}, {"error": {"message": "not found"}}
+
+        with self._lock:
+            self.stats["requests"] += 1
+            fail = self.random.random() < self.failure_rate
+        ok, headers = self._admit(tokens)
+        if not ok:
+            with self._lock:
+                self.stats["rate_limited"] += 1
+            return 429, headers, {"error": {"message": "Rate limit reached", "type": "requests"}}
+
+        with self._lock:
+            self.stats["in_flight"] += 1
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.stats["in_flight"])
+        try:
+            time.sleep(self.latency)
+        finally:
+            with self._lock:
+                self.stats["in_flight"] -= 1
+        if fail:
+            with self._lock:
+                self.stats["failed"] += 1
+            return 500, headers, {"error": {"message": "Injected failure", "type": "server_error"}}
+
+        usage = {"prompt_tokens": tokens, "total_tokens": tokens}
+        if texts is not None:
+            data = [{"object": "embedding", "index": i, "embedding": expected_embedding(text, self.dim).tolist()}
+                    for i, text in enumerate(texts)]
+            # 클라이언트가 index로 정렬하는지 확인하기 위해 순서를 뒤집어 보냄
+            return 200, headers, {"object": "list", "data": data[::-1], "model": body["model"], "usage": usage}
+        content = f"mock answer ({tokens} prompt tokens)"
+        if body.get("stream"):
+            return 200, headers, self._stream_chunks(body["model"], content)
+        return 200, headers, {
+            "id": "chatcmpl-mock", "object": "chat.completion", "created": int(time.time()), "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {**usage, "completion_tokens": 4},
+        }
+
+    def _stream_chunks(self, model, content):
+        words = content.split(" ")
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.token_latency)
+            yield {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                   "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}]}
+        yield {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+               "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # 헤더와 본문을 따로 쓰므로 Nagle 알고리즘이 켜져 있으면 응답마다 지연 ACK(약 40ms)만큼 늦어짐
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))) or b"{}")
+                status, headers, payload = server._handle(self.path, body)
+                if not isinstance(payload, dict):
+                    return self._send_stream(status, headers, payload)
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(data)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_stream(self, status, headers, chunks):
+                # stream=True 답변: chunked 전송으로 SSE 이벤트를 하나씩 보냄
+                self.send_response(status)
+                self.send_header("content-type", "text/event-stream")
+                self.send_header("transfer-encoding", "chunked")
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                events = (f"data: {json.dumps(chunk)}\n\n" for chunk in chunks)
+                for event in itertools.chain(events, ["data: [DONE]\n\n"]):
+                    data = event.encode("utf-8")
+                    self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -1,7 +1,6 @@
 # config/settings.py
 import os
 from dotenv import load_dotenv
-from openai import OpenAI
 
 load_dotenv()
 
@@ -10,4 +9,120 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 if not OPENAI_API_KEY:
     raise ValueError("OpenAI API key not found in environment variables")
 
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+# 공유 OpenAI 클라이언트(utils/openai_client.py) 설정: 호환 서버 주소, 동시 요청 수, 재시도 횟수, 요청 시간 제한(초)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "16"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "6"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+# 임베딩 요청 하나에 담을 최대 근사 토큰 수와 텍스트 수
+OPENAI_EMBED_BATCH_TOKENS = int(os.getenv("OPENAI_EMBED_BATCH_TOKENS", "20000"))
+OPENAI_EMBED_BATCH_SIZE = int(os.getenv("OPENAI_EMBED_BATCH_SIZE", "2048"))
+
+# 업로드된 PDF와 임베딩 인덱스를 저장할 디렉토리
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+INDEX_DIR = os.getenv("INDEX_DIR", os.path.join(UPLOAD_DIR, "index"))
+# 배포 방식: "standalone"(한 프로세스가 업로드/인제스트와 질문을 모두 처리),
+# "ingest"(업로드/인제스트를 맡고 인덱스 스냅샷을 공개), "serve"(질문만 처리하는 읽기 전용 워커, uvicorn --workers로 여러 개 실행)
+SERVER_ROLE = os.getenv("SERVER_ROLE", "standalone")
+# 서빙 워커가 새 스냅샷을 확인하는 간격(초)과 인제스트 쪽에서 지우지 않고 남겨 둘 최근 스냅샷 수
+SNAPSHOT_POLL_SECONDS = float(os.getenv("SNAPSHOT_POLL_SECONDS", "2"))
+SNAPSHOT_KEEP = int(os.getenv("SNAPSHOT_KEEP", "3"))
+# 업로드/URL 다운로드: 파일 하나의 최대 크기(MB), 디스크에 나누어 쓰는 단위(바이트), 다운로드 연결/읽기 시간 제한(초)
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "1024"))
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1 << 20)))
+DOWNLOAD_TIMEOUT = float(os.getenv("DOWNLOAD_TIMEOUT", "60"))
+
+# (모델, 텍스트 해시) 임베딩 캐시에 보관할 최대 항목 수
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "50000"))
+
+# 백그라운드 인제스트 작업 워커 수와 대기열 크기
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+MAX_PENDING_JOBS = int(os.getenv("MAX_PENDING_JOBS", "100"))
+
+# PDF 텍스트 추출 프로세스 수와 병렬 추출을 시작할 최소 페이지 수
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(os.cpu_count() or 1)))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "64"))
+# 프로세스 하나가 한 번에 추출할 최대 페이지 수
+PDF_SHARD_PAGES = int(os.getenv("PDF_SHARD_PAGES", "32"))
+
+# 스트리밍 인제스트에서 한 번에 임베딩할 조각 수와 미리 준비해 둘 배치 수
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+EMBED_PREFETCH_BATCHES = int(os.getenv("EMBED_PREFETCH_BATCHES", "2"))
+
+# 텍스트 조각 크기(단어 수), 조각 간 겹침, 근사 토큰 수 기준 조각 크기(설정하면 단어 수 대신 사용)
+CHUNK_WORD_LENGTH = int(os.getenv("CHUNK_WORD_LENGTH", "150"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "0"))
+CHUNK_TOKEN_LENGTH = int(os.getenv("CHUNK_TOKEN_LENGTH", "0")) or None
+
+# 벡터 검색 백엔드: "exact"(정규화 내적), "sklearn"(NearestNeighbors), "ivfpq"(NumPy IVF-PQ), "hnsw"(hnswlib 필요)
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "exact")
+IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))  # 0이면 코퍼스 크기에 맞춰 자동 결정
+# ivfpq 기본값은 군집이 있는 5만 조각(512차원)에서 정확 검색보다 약 10배 빠르고 recall@5가 0.97 정도인 설정
+# (python -m benchmarks.bench_search --nprobe ... --refine ...로 확인). 군집 구조가 없는 임베딩에서는 recall이 크게 떨어짐
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "32"))
+IVF_MIN_SIZE = int(os.getenv("IVF_MIN_SIZE", "20000"))  # 이보다 작은 코퍼스는 정확 검색
+PQ_M = int(os.getenv("PQ_M", "64"))
+IVF_REFINE = int(os.getenv("IVF_REFINE", "40"))  # ivfpq에서 PQ 거리로 고른 뒤 정확히 재정렬할 후보 배수 (k * IVF_REFINE)
+ANN_REFINE = int(os.getenv("ANN_REFINE", "10"))  # 근사 검색 후 정확히 재정렬할 후보 배수 (k * ANN_REFINE)
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF = int(os.getenv("HNSW_EF", "128"))
+# 정확 검색("exact")에서 메모리에 둘 임베딩 형식: "float32"(원본 그대로), "float16", "int8"
+# 압축하면 압축된 벡터로 k * ANN_REFINE개의 후보를 고르고 원본(디스크의 memmap)으로 후보만 재정렬함
+EMBEDDING_STORAGE = os.getenv("EMBEDDING_STORAGE", "float32")
+
+# 배치 질문 엔드포인트: 요청당 최대 질문 수와 동시에 보낼 LLM 호출 수
+MAX_BATCH_QUESTIONS = int(os.getenv("MAX_BATCH_QUESTIONS", "1000"))
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
+
+# 답변 캐시: 최대 항목 수, 유효 시간(초, 0이면 무제한), 질문 임베딩 유사도 재사용 기준(0이면 정확히 같은 질문만)
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "10000"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "86400"))
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0"))
+
+# Universal Sentence Encoder 위치 (TF Hub 주소 또는 미리 내려받은 로컬 디렉토리)와 시작 후 백그라운드 예열 여부
+# ADA만 쓰는 배포에서는 USE_WARMUP=false로 두면 TensorFlow를 임포트하지 않음
+USE_MODEL_PATH = os.getenv("USE_MODEL_PATH", "https://tfhub.dev/google/universal-sentence-encoder/4")
+USE_WARMUP = os.getenv("USE_WARMUP", "true").lower() in ("1", "true", "yes")
+
+# 로컬 CPU 임베딩 모델("local"): ONNX로 내보낸 문장 임베딩 모델 디렉토리 (*.onnx와 tokenizer.json, onnxruntime/tokenizers 필요)
+# LOCAL_MODEL_FILE을 비워 두면 int8 양자화 파일(model_quantized.onnx, model_int8.onnx)을 먼저 찾고 없으면 model.onnx를 씀
+# LOCAL_QUANTIZE=true면 양자화 파일이 없을 때 model.onnx를 동적 int8 양자화해 model_int8.onnx로 한 번 저장함
+LOCAL_MODEL_PATH = os.getenv("LOCAL_MODEL_PATH", "models/all-MiniLM-L6-v2")
+LOCAL_MODEL_FILE = os.getenv("LOCAL_MODEL_FILE", "")
+LOCAL_QUANTIZE = os.getenv("LOCAL_QUANTIZE", "false").lower() in ("1", "true", "yes")
+# onnxruntime 연산 스레드 수(0이면 물리 코어 수), 텍스트당 최대 토큰 수, 모델에 한 번에 넣을 텍스트 수
+LOCAL_MODEL_THREADS = int(os.getenv("LOCAL_MODEL_THREADS", "0"))
+LOCAL_MAX_TOKENS = int(os.getenv("LOCAL_MAX_TOKENS", "256"))
+LOCAL_BATCH_SIZE = int(os.getenv("LOCAL_BATCH_SIZE", "32"))
+LOCAL_WARMUP = os.getenv("LOCAL_WARMUP", "false").lower() in ("1", "true", "yes")
+
+# 동시에 들어온 질문 임베딩을 모아 한 번에 인코딩하는 마이크로 배처: 최대 텍스트 수, 첫 요청 뒤 다른 요청을 기다리는 최대 시간(ms)
+# 이보다 큰 요청(인제스트 배치)은 배처를 거치지 않고 바로 인코딩함
+EMBED_MICROBATCH_SIZE = int(os.getenv("EMBED_MICROBATCH_SIZE", "32"))
+EMBED_MICROBATCH_WAIT_MS = float(os.getenv("EMBED_MICROBATCH_WAIT_MS", "5"))
+
+# 검색 방식: "hybrid"(BM25 + 벡터 검색을 RRF로 결합), "dense"(벡터 검색만), "lexical"(BM25만)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "50"))  # 결합 전에 각 검색에서 가져올 후보 수
+RRF_K = int(os.getenv("RRF_K", "60"))
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+# 프롬프트에 넣을 검색 결과: 검색할 최대 후보 수, 검색 결과에 쓸 토큰 예산,
+# 중복으로 볼 단어 3-gram 자카드 유사도, 예산이 모자랄 때 잘라서라도 넣을 최소 남은 토큰 수
+CONTEXT_CANDIDATES = int(os.getenv("CONTEXT_CANDIDATES", "20"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8"))
+CONTEXT_MIN_TRIM_TOKENS = int(os.getenv("CONTEXT_MIN_TRIM_TOKENS", "64"))
+
+# 검색 결과 재정렬: "none"(검색 순서 그대로), "mmr"(질문 관련도와 이미 고른 조각과의 유사도를 함께 보는 maximal marginal relevance),
+# "cross-encoder"(로컬 CPU 모델로 질문-조각 쌍을 점수화, sentence-transformers 필요). CONTEXT_CANDIDATES개 후보 중 RERANK_TOP_K개를 남김
+RERANKER = os.getenv("RERANKER", "none")
+RERANK_TOP_K = int(os.getenv("RERANK_TOP_K", "8"))
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))  # 1이면 관련도만, 0이면 다양성만 봄
+CROSS_ENCODER_MODEL = os.getenv("CROSS_ENCODER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+# 크로스 인코더가 질문 하나에 쓸 최대 시간(ms). 넘으면 남은 후보는 점수 없이 검색 순서대로 뒤에 둠
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "150"))
+
+# 응답에 요청별 단계 시간(임베딩, 검색, 프롬프트 구성, LLM 호출 등)을 Server-Timing 헤더로 붙일지 여부
+SERVER_TIMING = os.getenv("SERVER_TIMING", "false").lower() in ("1", "true", "yes")
@@ -1,5 +1,133 @@
 # 전역 상태 관리 모듈
+import os
+import re
+import threading
 
-# 여러 PDF의 텍스트 조각을 저장하는 리스트
-recommenders = []
-uploaded_files = []  # 업로드된 파일 경로를 저장하는 리스트
\ No newline at end of file
+from models.chunk_table import ChunkTable
+from config.settings import UPLOAD_DIR, INDEX_DIR
+
+DEFAULT_COLLECTION = "default"
+_COLLECTION_NAME = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+class Collection:
+    """
+    이름 있는 문서 모음 하나의 상태. 업로드 목록, 조각 테이블, 모델별 인덱스를 컬렉션마다 따로 가지므로
+    질문은 자기 컬렉션의 조각만 검색하고, 한 컬렉션의 인제스트가 다른 컬렉션의 요청을 막지 않습니다.
+
+    기본 컬렉션은 기존 경로(UPLOAD_DIR, INDEX_DIR)를 그대로 쓰고,
+    나머지는 UPLOAD_DIR/collections/<이름>, INDEX_DIR/collections/<이름> 에 저장됩니다.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        if name == DEFAULT_COLLECTION:
+            self.upload_dir, self.index_dir = UPLOAD_DIR, INDEX_DIR
+        else:
+            self.upload_dir = os.path.join(UPLOAD_DIR, "collections", name)
+            self.index_dir = os.path.join(INDEX_DIR, "collections", name)
+
+        self.uploaded_files = []  # 업로드된 파일 경로를 저장하는 리스트
+        # 업로드할 때 계산한 파일 경로 -> {"sha256", "size", "mtime_ns"} (중복 업로드 확인과 인제스트 때 재해시 생략용)
+        self.upload_hashes = {}
+        # 여러 PDF의 텍스트 조각 (본문 버퍼 + 파일 ID/페이지 번호 배열)
+        self.chunk_table = ChunkTable()
+        # 이미 인덱싱된 파일 경로 -> {"sha256", "size", "mtime_ns", "id"}
+        self.indexed_files = {}
+        # 임베딩 모델별로 학습된 SemanticSearch 인스턴스 (질문마다 다시 임베딩하지 않도록 재사용)
+        self.indexes = {}
+        # 마지막으로 저장하거나 불러온 인덱스 스냅샷 버전 (아직 없으면 None)
+        self.snapshot = None
+
+        # 인덱스를 변경하는 작업(인제스트와 그 결과 저장)은 컬렉션마다 한 번에 하나씩만 실행
+        self.ingest_lock = threading.RLock()
+        # 업로드 목록과 매니페스트처럼 짧게 바뀌는 상태용
+        self.lock = threading.Lock()
+
+    def add_upload(self, path, fingerprint=None):
+        with self.lock:
+            if path not in self.uploaded_files:
+                self.uploaded_files.append(path)
+            if fingerprint is not None:
+                self.upload_hashes[path] = fingerprint
+
+    def find_content(self, sha256):
+        """
+        내용 해시가 sha256인 업로드 파일 경로를 반환합니다. 없으면 None. collection.lock을 잡은 상태에서 호출합니다.
+
+        기록된 크기와 수정 시각이 지금 파일과 같을 때만 같은 내용으로 봅니다 (같은 이름으로 덮어쓴 파일 제외).
+        """
+        uploaded = set(self.uploaded_files)
+        for records in (self.upload_hashes, self.indexed_files):
+            for path, info in list(records.items()):
+                if info["sha256"] != sha256 or path not in uploaded:
+                    continue
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if stat.st_size == info["size"] and stat.st_mtime_ns == info["mtime_ns"]:
+                    return path
+        return None
+
+    def memory(self):
+        """
+        컬렉션이 차지하는 메모리(바이트). memmap으로 매핑된 배열은 디스크 페이지를 공유하므로 mapped로 따로 셉니다.
+        """
+        table = self.chunk_table
+        chunk_arrays = [table.buffer, table.offsets, table.file_ids, table.pages]
+        lexical = table.lexical
+        lexical_arrays = [lexical.term_ids, lexical.doc_ids, lexical.tfs, lexical.doc_len, lexical.indptr]
+        usage = {"chunks": _usage(chunk_arrays), "lexical": _usage(lexical_arrays), "indexes": {}}
+        for model, index in list(self.indexes.items()):
+            if not index.fitted:
+                continue
+            embeddings = _usage([index.embeddings])
+            backend = _usage(index.backend.arrays())
+            usage["indexes"][str(getattr(model, "value", model))] = {key: embeddings[key] + backend[key]
+                                                                     for key in ("heap", "mapped")}
+        parts = [usage["chunks"], usage["lexical"], *usage["indexes"].values()]
+        usage["total"] = {key: sum(part[key] for part in parts) for key in ("heap", "mapped")}
+        return usage
+
+    def info(self):
+        return {
+            "name": self.name,
+            "files": len(self.uploaded_files),
+            "indexed_files": len(self.indexed_files),
+            "chunks": len(self.chunk_table),
+            "snapshot": self.snapshot,
+            "models": [str(getattr(model, "value", model)) for model, index in self.indexes.items() if index.fitted],
+            "memory": self.memory(),
+        }
+
+def _usage(arrays):
+    usage = {"heap": 0, "mapped": 0}
+    for array in arrays:
+        # memmap을 복사해서 만든 배열(astype 등)도 np.memmap 타입이므로 실제로 매핑되어 있는지 확인
+        mapped = getattr(array, "_mmap", None) is not None
+        usage["mapped" if mapped else "heap"] += int(array.nbytes)
+    return usage
+
+def valid_collection_name(name):
+    return bool(_COLLECTION_NAME.match(name or ""))
+
+# 컬렉션 이름 -> Collection
+collections = {}
+collections_lock = threading.Lock()
+
+def get_collection(name=DEFAULT_COLLECTION, create=False):
+    """
+    이름에 해당하는 컬렉션을 반환합니다. 없으면 create가 True일 때만 만들고, 아니면 None을 반환합니다.
+    """
+    collection = collections.get(name)
+    if collection is None and create:
+        if not valid_collection_name(name):
+            raise ValueError(f"Invalid collection name '{name}' (use 1-64 letters, digits, '-' or '_')")
+        with collections_lock:
+            collection = collections.get(name)
+            if collection is None:
+                collection = collections[name] = Collection(name)
+    return collection
+
+# 컬렉션을 지정하지 않은 요청은 기본 컬렉션을 사용
+get_collection(DEFAULT_COLLECTION, create=True)
@@ -1,8 +1,14 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 import logging
+import time
 
 from api import *
+from models.vector_store import restore_state, watch_snapshots
+from models.embedding_model import warm_up_use_model, warm_up_local_model
+from utils.context_builder import load_encoding
+from config.settings import USE_WARMUP, LOCAL_WARMUP, SERVER_TIMING, SERVER_ROLE
+from utils.metrics import request_seconds, start_trace, server_timing
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
@@ -18,10 +24,47 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def measure_request(request: Request, call_next):
+    # 경로별 지연 시간을 기록하고, 요청 안에서 기록된 단계별 시간(임베딩, 검색, LLM 호출 등)을 헤더로 돌려줌
+    trace = start_trace()
+    started = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - started
+    route = request.scope.get("route")
+    request_seconds.observe(elapsed, method=request.method, route=getattr(route, "path", "unmatched"),
+                            status=response.status_code)
+    if SERVER_TIMING:
+        response.headers["Server-Timing"] = server_timing(trace, elapsed)
+    return response
+
+@app.on_event("startup")
+def load_persisted_state():
+    # 디스크에 저장된 컬렉션별 업로드 목록과 임베딩 인덱스 복원
+    restore_state()
+    # 읽기 전용 서빙 워커는 인제스트 프로세스가 공개하는 새 스냅샷으로 계속 갈아탐
+    if SERVER_ROLE == "serve":
+        watch_snapshots()
+    # 프롬프트 토큰 수를 셀 tiktoken 인코딩은 로컬 캐시에서만 불러옴 (요청 중에 내려받지 않음)
+    load_encoding()
+    # USE 모델은 요청을 받기 시작한 뒤 백그라운드에서 불러옴 (첫 USE 요청은 로딩이 끝날 때까지 기다림)
+    if USE_WARMUP:
+        warm_up_use_model()
+    if LOCAL_WARMUP:
+        warm_up_local_model()
+
 app.post("/upload_pdf")(upload_pdf)
 app.post("/upload_pdf_url")(upload_pdf_url)
 app.post("/ask_question")(ask_question)
+app.post("/ask_questions")(ask_questions)
 app.post("/embed_all_pdfs")(embed_all_pdfs)
+app.get("/jobs")(list_jobs)
+app.get("/jobs/{job_id}")(get_job)
+app.get("/stats")(get_stats)
+app.get("/health")(health)
+app.get("/collections")(list_collections)
+app.get("/collections/{name}")(get_collection_info)
+app.get("/metrics")(metrics)
 
 if __name__ == '__main__':
     import uvicorn
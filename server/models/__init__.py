@@ -1,2 +1,3 @@
-from .embedding_model import EmbeddingModel, get_use_embedding, get_ada_embedding, Language
+from .embedding_model import EmbeddingModel, get_use_embedding, get_ada_embedding, get_local_embedding, Language
 from .semantic_search import SemanticSearch
+from .chunk_table import ChunkTable, Chunk
@@ -0,0 +1,164 @@
+import logging
+import threading
+import time
+import unicodedata
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from config.settings import ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL, ANSWER_CACHE_SIMILARITY
+
+logger = logging.getLogger(__name__)
+
+CachedAnswer = namedtuple("CachedAnswer", ["answer", "chunks", "embedding", "cost", "created_at"])
+
+class AnswerCache:
+    """
+    (컬렉션, 코퍼스 버전, 언어, 정규화된 질문) 을 키로 하는 LRU + TTL 답변 캐시입니다.
+
+    코퍼스 버전은 SemanticSearch.version으로, 인덱스가 바뀔 때마다 새 값이 되므로
+    이전 인덱스로 만든 답변은 자동으로 쓰이지 않고, 새 버전을 처음 볼 때 정리됩니다.
+    similarity가 0보다 크면 질문 임베딩의 코사인 유사도가 그 이상인 캐시된 질문의 답변도 재사용합니다.
+    """
+
+    def __init__(self, max_entries=ANSWER_CACHE_SIZE, ttl=ANSWER_CACHE_TTL, similarity=ANSWER_CACHE_SIMILARITY):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        self._entries = OrderedDict()
+        self._scopes = {}  # scope -> {질문 키: 정규화된 질문 임베딩}
+        self._versions = {}  # (컬렉션, 모델) -> 마지막으로 본 인덱스 버전
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+
+    @staticmethod
+    def normalize(question):
+        text = " ".join(unicodedata.normalize("NFKC", question).casefold().split())
+        return text.rstrip("?!.。？！ ")
+
+    def scope(self, recommender, language, file_ids=None, collection="default"):
+        """
+        같은 답변을 재사용할 수 있는 범위: (컬렉션, 모델, 인덱스 버전, 언어, 검색 대상 파일).
+        """
+        index = (collection, str(getattr(recommender.model, "value", recommender.model)))
+        scope = index + (recommender.version, str(getattr(language, "value", language)),
+                         tuple(sorted(file_ids)) if file_ids else None)
+        with self._lock:
+            if self._versions.get(index, -1) < recommender.version:
+                self._versions[index] = recommender.version
+                self._drop(lambda key: key[0][:2] == index and key[0][2] < recommender.version)
+        return scope
+
+    def _drop(self, predicate):
+        stale = [key for key in self._entries if predicate(key)]
+        for key in stale:
+            self._remove(key)
+        if stale:
+            logger.info(f"Answer cache: dropped {len(stale)} entries for an outdated index")
+
+    def _remove(self, key):
+        self._entries.pop(key, None)
+        vectors = self._scopes.get(key[0])
+        if vectors is not None:
+            vectors.pop(key, None)
+            if not vectors:
+                del self._scopes[key[0]]
+
+    def _expired(self, entry, now):
+        return self.ttl > 0 and now - entry.created_at > self.ttl
+
+    def _hit(self, key, entry):
+        self._entries.move_to_end(key)
+        self.seconds_saved += entry.cost
+
+    def get(self, scope, question):
+        """
+        정규화된 질문이 같은 캐시된 답변을 반환합니다. 유사도 모드가 꺼져 있으면 여기서 miss를 셉니다.
+        """
+        key = (scope, self.normalize(question))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry, time.time()):
+                self._remove(key)
+                entry = None
+            if entry is not None:
+                self.hits += 1
+                self._hit(key, entry)
+            elif self.similarity <= 0:
+                self.misses += 1
+            return entry
+
+    def get_similar(self, scope, embedding):
+        """
+        같은 scope에서 질문 임베딩이 similarity 이상으로 가까운 캐시된 답변을 반환합니다.
+        """
+        if self.similarity <= 0:
+            return None
+        query = _unit(embedding)
+        with self._lock:
+            vectors = self._scopes.get(scope)
+            if vectors:
+                keys = list(vectors)
+                scores = np.vstack([vectors[key] for key in keys]) @ query
+                now = time.time()
+                for i in np.argsort(-scores):
+                    if scores[i] < self.similarity:
+                        break
+                    entry = self._entries[keys[i]]
+                    if self._expired(entry, now):
+                        continue
+                    self.similar_hits += 1
+                    self._hit(keys[i], entry)
+                    return entry
+            self.misses += 1
+            return None
+
+    def put(self, scope, question, answer, chunks, cost, embedding=None):
+        """
+        Args:
+            cost (float): 답변을 만드는 데 걸린 시간(초). 캐시 적중 시 절약한 시간으로 집계
+            embedding (np.ndarray): 질문 임베딩 (유사도 모드에서 사용)
+        """
+        if self.max_entries <= 0:
+            return
+        key = (scope, self.normalize(question))
+        with self._lock:
+            if scope[2] < self._versions.get(scope[:2], -1):
+                return  # 답변을 만드는 동안 인덱스가 바뀜
+            self._remove(key)
+            self._entries[key] = CachedAnswer(answer, list(chunks), embedding, cost, time.time())
+            if self.similarity > 0 and embedding is not None:
+                self._scopes.setdefault(scope, {})[key] = _unit(embedding)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._scopes.clear()
+
+    def stats(self):
+        with self._lock:
+            hits = self.hits + self.similar_hits
+            total = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "similarity": self.similarity,
+                "hits": self.hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "hit_rate": hits / total if total else 0.0,
+                "seconds_saved": round(self.seconds_saved, 3),
+            }
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype=np.float32).ravel()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+answer_cache = AnswerCache()
@@ -0,0 +1,100 @@
+from collections import namedtuple
+
+import numpy as np
+
+from models.lexical_index import LexicalIndex
+
+# row: 테이블에서의 조각 번호 (인접한 조각을 합칠 때 사용, 테이블 밖에서 만든 조각은 None)
+Chunk = namedtuple("Chunk", ["text", "file_id", "page", "row"], defaults=(None,))
+
+_EMPTY_BUFFER = np.zeros(0, dtype=np.uint8)
+
+class ChunkTable:
+    """
+    텍스트 조각을 열 단위로 저장하는 테이블입니다.
+
+    모든 조각의 본문은 하나의 UTF-8 버퍼(uint8 배열)에 이어 붙이고, 조각 i의 본문은
+    buffer[offsets[i]:offsets[i+1]] 입니다. 파일 ID와 페이지 번호는 NumPy 정수 배열로 보관하므로
+    문서별 필터링이 문자열을 다시 파싱하지 않고 벡터 연산으로 가능합니다.
+    같은 조각에 대한 BM25 역색인(lexical)도 함께 관리하므로 조각이 추가/제거될 때 항상 함께 갱신됩니다.
+
+    extend/select는 배열을 제자리에서 수정하지 않고 새 배열로 교체하므로, snapshot()으로 얻은
+    테이블(예: 검색 인덱스가 들고 있는 테이블)은 이후 변경의 영향을 받지 않습니다.
+    """
+
+    def __init__(self, buffer=None, offsets=None, file_ids=None, pages=None, lexical=None):
+        self.buffer = _EMPTY_BUFFER if buffer is None else buffer
+        self.offsets = np.zeros(1, dtype=np.int64) if offsets is None else offsets
+        self.file_ids = np.zeros(0, dtype=np.int32) if file_ids is None else file_ids
+        self.pages = np.zeros(0, dtype=np.int32) if pages is None else pages
+        self.lexical = LexicalIndex() if lexical is None else lexical
+
+    def __len__(self):
+        return len(self.file_ids)
+
+    def __getitem__(self, i):
+        return Chunk(self.text(i), int(self.file_ids[i]), int(self.pages[i]), int(i))
+
+    def text(self, i):
+        return self.buffer[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    def texts(self, indices=None):
+        indices = range(len(self)) if indices is None else indices
+        return [self.text(i) for i in indices]
+
+    @property
+    def nbytes(self):
+        return (self.buffer.nbytes + self.offsets.nbytes + self.file_ids.nbytes + self.pages.nbytes
+                + self.lexical.nbytes)
+
+    def snapshot(self):
+        return ChunkTable(self.buffer, self.offsets, self.file_ids, self.pages, self.lexical)
+
+    def extend(self, texts, file_ids, pages):
+        """
+        조각들을 테이블 끝에 추가합니다.
+
+        Args:
+            texts (list): 조각 본문 리스트
+            file_ids (array-like): 조각별 파일 ID
+            pages (array-like): 조각별 페이지 번호
+        """
+        encoded = [text.encode("utf-8") for text in texts]
+        lengths = np.fromiter((len(b) for b in encoded), dtype=np.int64, count=len(encoded))
+        new_buffer = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        self.buffer = np.concatenate([self.buffer, new_buffer])
+        self.offsets = np.concatenate([self.offsets, self.offsets[-1] + np.cumsum(lengths)])
+        self.file_ids = np.concatenate([self.file_ids, np.asarray(file_ids, dtype=np.int32)])
+        self.pages = np.concatenate([self.pages, np.asarray(pages, dtype=np.int32)])
+        self.lexical = self.lexical.extended(texts)
+
+    def select(self, keep):
+        """
+        keep 마스크가 True인 조각만 남깁니다. 남은 조각의 본문은 새 버퍼로 한 번에 복사됩니다.
+        """
+        keep = np.asarray(keep, dtype=bool)
+        starts = self.offsets[:-1][keep]
+        lengths = np.diff(self.offsets)[keep]
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        index = np.arange(offsets[-1]) + np.repeat(starts - offsets[:-1], lengths)
+        self.buffer = self.buffer[index]
+        self.offsets = offsets
+        self.file_ids = self.file_ids[keep]
+        self.pages = self.pages[keep]
+        self.lexical = self.lexical.subset(keep)
+
+    def mask(self, file_ids):
+        """
+        주어진 파일 ID들에 속한 조각의 bool 마스크를 반환합니다.
+        """
+        return np.isin(self.file_ids, np.asarray(list(file_ids), dtype=np.int32))
+
+    def assign(self, other):
+        """
+        다른 테이블(예: 디스크에서 로드한 테이블)의 내용으로 교체합니다.
+        """
+        self.buffer, self.offsets, self.file_ids, self.pages = other.buffer, other.offsets, other.file_ids, other.pages
+        self.lexical = other.lexical
+
+    def clear(self):
+        self.assign(ChunkTable())
@@ -0,0 +1,107 @@
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+from config.settings import EMBEDDING_CACHE_SIZE
+from utils.metrics import stage, embedding_batch_size, embedded_texts
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingCache:
+    """
+    (모델, 정규화된 텍스트의 sha256) 를 키로 하는 LRU 임베딩 캐시입니다.
+    같은 텍스트 조각을 다시 인코더나 OpenAI API로 보내지 않도록 합니다.
+    """
+
+    def __init__(self, max_entries=EMBEDDING_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model, text):
+        normalized = " ".join(unicodedata.normalize("NFC", text).split())
+        return (str(getattr(model, "value", model)), hashlib.sha256(normalized.encode("utf-8")).hexdigest())
+
+    def get(self, key):
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+    def put(self, key, embedding):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def embed(self, model, texts, encode, batch=1000):
+        """
+        캐시에 없는 텍스트만 batch 단위로 encode에 보내고, 입력 순서대로 임베딩 행렬을 반환합니다.
+
+        Args:
+            model: 임베딩 모델 (캐시 키의 일부)
+            texts (list): 임베딩할 텍스트 리스트
+            encode (callable): 텍스트 리스트를 받아 임베딩 행렬을 반환하는 함수
+            batch (int): encode 한 번에 보낼 최대 텍스트 수 (None이면 캐시에 없는 텍스트를 한 번에 보냄)
+        """
+        keys = [self.key(model, text) for text in texts]
+        results = [self.get(key) for key in keys]
+        hit_count = sum(embedding is not None for embedding in results)
+
+        # 같은 요청 안에서 중복된 텍스트는 한 번만 인코딩
+        missing = {}
+        for i, embedding in enumerate(results):
+            if embedding is None:
+                missing.setdefault(keys[i], []).append(i)
+
+        if missing:
+            miss_keys = list(missing)
+            miss_texts = [texts[missing[key][0]] for key in miss_keys]
+            batch = batch or len(miss_texts)
+            label = getattr(model, "value", model)
+            for start in range(0, len(miss_texts), batch):
+                text_batch = miss_texts[start : start + batch]
+                embedding_batch_size.observe(len(text_batch), model=label)
+                embedded_texts.inc(len(text_batch), model=label)
+                with stage("embed"):
+                    emb_batch = np.asarray(encode(text_batch), dtype=np.float32)
+                for key, embedding in zip(miss_keys[start : start + batch], emb_batch):
+                    self.put(key, embedding)
+                    for i in missing[key]:
+                        results[i] = embedding
+
+        logger.info(f"Embedding cache ({model}): {hit_count} hits, {len(missing)} texts encoded")
+        if not results:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.vstack(results)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+embedding_cache = EmbeddingCache()
@@ -1,42 +1,126 @@
 from enum import Enum
 import numpy as np
-import tensorflow_hub as hub
-from openai import OpenAI
 import logging
-import os
+import threading
+import time
+from config.settings import USE_MODEL_PATH, LOCAL_MODEL_PATH, EMBED_MICROBATCH_SIZE
+from models.embedding_cache import embedding_cache
+from utils.microbatch import MicroBatcher
+from utils.openai_client import openai_client
 
 logger = logging.getLogger(__name__)
 
 class EmbeddingModel(str, Enum):
     USE = "use"
     ADA = "ada"
+    LOCAL = "local"
 
 class Language(str, Enum):
     ENGLISH = "english"
     KOREAN = "korean"
 
-logger.info("Loading Universal Sentence Encoder...")
-USE_MODEL = hub.load("https://tfhub.dev/google/universal-sentence-encoder/4")
-logger.info("Universal Sentence Encoder loaded successfully.")
+# Universal Sentence Encoder는 처음 쓸 때(또는 시작 후 백그라운드 예열 때) 한 번만 불러옴
+_use_model = None
+_use_lock = threading.Lock()
+use_status = {"state": "not_loaded", "path": USE_MODEL_PATH, "load_seconds": None, "error": None}
 
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
-logger.info("OpenAI client initialized.")
+def load_use_model():
+    """
+    USE 모델을 반환합니다. 아직 불러오지 않았다면 TensorFlow를 임포트하고 USE_MODEL_PATH에서 불러옵니다.
+    USE_MODEL_PATH에 미리 내려받은 모델 디렉토리를 지정하면 네트워크 없이 불러옵니다.
+    """
+    global _use_model
+    if _use_model is None:
+        with _use_lock:
+            if _use_model is None:
+                use_status.update(state="loading", error=None)
+                logger.info(f"Loading Universal Sentence Encoder from {USE_MODEL_PATH}...")
+                started = time.perf_counter()
+                try:
+                    import tensorflow_hub as hub
+                    _use_model = hub.load(USE_MODEL_PATH)
+                except Exception as e:
+                    use_status.update(state="failed", error=str(e))
+                    raise
+                use_status.update(state="loaded", load_seconds=round(time.perf_counter() - started, 3))
+                logger.info("Universal Sentence Encoder loaded successfully.")
+    return _use_model
+
+def warm_up_use_model():
+    """
+    서버가 요청을 받기 시작한 뒤 USE 모델을 백그라운드 스레드에서 미리 불러옵니다.
+    """
+    def warm_up():
+        try:
+            load_use_model()
+        except Exception as e:
+            logger.error(f"Failed to load Universal Sentence Encoder: {str(e)}")
+
+    threading.Thread(target=warm_up, name="use-warmup", daemon=True).start()
+
+# 로컬 ONNX 모델(LOCAL_MODEL_PATH)도 처음 쓸 때 한 번만 불러옴
+_local_model = None
+_local_lock = threading.Lock()
+local_status = {"state": "not_loaded", "path": LOCAL_MODEL_PATH, "file": None, "load_seconds": None, "error": None}
+
+def load_local_model():
+    """
+    로컬 CPU 임베딩 모델(LocalEncoder)을 반환합니다. 아직 불러오지 않았다면 LOCAL_MODEL_PATH에서 불러옵니다.
+    """
+    global _local_model
+    if _local_model is None:
+        with _local_lock:
+            if _local_model is None:
+                local_status.update(state="loading", error=None)
+                logger.info(f"Loading local embedding model from {LOCAL_MODEL_PATH}...")
+                started = time.perf_counter()
+                try:
+                    from models.local_encoder import LocalEncoder
+                    _local_model = LocalEncoder()
+                except Exception as e:
+                    local_status.update(state="failed", error=str(e))
+                    raise
+                local_status.update(state="loaded", file=_local_model.model_file,
+                                    load_seconds=round(time.perf_counter() - started, 3))
+                logger.info(f"Local embedding model loaded from {_local_model.model_file}.")
+    return _local_model
+
+def warm_up_local_model():
+    """
+    서버가 요청을 받기 시작한 뒤 로컬 임베딩 모델을 백그라운드 스레드에서 미리 불러옵니다.
+    """
+    def warm_up():
+        try:
+            load_local_model()
+        except Exception as e:
+            logger.error(f"Failed to load local embedding model: {str(e)}")
+
+    threading.Thread(target=warm_up, name="local-warmup", daemon=True).start()
 
 def get_use_embedding(texts, batch=1000):
     logger.info("Getting USE embeddings")
-    embeddings = []
-    for i in range(0, len(texts), batch):
-        text_batch = texts[i : (i + batch)]
-        emb_batch = USE_MODEL(text_batch)
-        embeddings.append(emb_batch)
-    return np.vstack(embeddings)
-
-def get_ada_embedding(texts, batch=1000):
+    return embedding_cache.embed(EmbeddingModel.USE, texts, _encode_use, batch)
+
+def get_ada_embedding(texts, batch=None):
     logger.info("Getting ADA embeddings")
-    embeddings = []
-    for i in range(0, len(texts), batch):
-        text_batch = texts[i : (i + batch)]
-        response = client.embeddings.create(input=text_batch, model="text-embedding-ada-002")
-        emb_batch = [item.embedding for item in response.data]
-        embeddings.extend(emb_batch)
-    return np.array(embeddings)
+    # 캐시에 없는 텍스트를 한 번에 넘기면 클라이언트가 토큰 예산 단위 요청으로 나누어 동시에 보냄
+    return embedding_cache.embed(EmbeddingModel.ADA, texts, _encode_ada, batch)
+
+def get_local_embedding(texts, batch=1000):
+    logger.info("Getting local embeddings")
+    return embedding_cache.embed(EmbeddingModel.LOCAL, texts, _encode_local, batch)
+
+def _encode_use(text_batch):
+    return np.asarray(load_use_model()(text_batch))
+
+def _encode_ada(text_batch):
+    return openai_client.embed(text_batch, model="text-embedding-ada-002")
+
+# 동시에 들어온 질문 임베딩(작은 요청)은 마이크로 배처가 모아 모델을 한 번만 실행함
+_local_batcher = MicroBatcher(lambda texts: load_local_model()(texts), name=EmbeddingModel.LOCAL.value)
+
+def _encode_local(text_batch):
+    if len(text_batch) < EMBED_MICROBATCH_SIZE:
+        return _local_batcher(text_batch)
+    # 인제스트 배치는 이미 충분히 크므로 바로 인코딩 (질문 배치 뒤에 줄 세우지 않음)
+    return load_local_model()(text_batch)
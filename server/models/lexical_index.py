@@ -0,0 +1,173 @@
+import math
+import re
+import unicodedata
+from collections import Counter
+
+import numpy as np
+
+from config.settings import BM25_K1, BM25_B
+
+# 복합어(부품 번호/오류 코드/식별자)의 단어를 잇는 문자
+_JOINERS = "-_./:"
+
+def _compound_pattern(word):
+    return re.compile(rf"{word}+(?:[{_JOINERS}]{word}+)*")
+
+# 영문/숫자 단어와 "E-1234", "v1.2.3", "server_x" 같은 부품 번호/오류 코드를 한 덩어리로 찾음 (한글도 \w에 포함)
+_COMPOUND = _compound_pattern(r"[^\W_]")
+# 소문자로 바꾼 ASCII 텍스트용 빠른 경로. 같은 틀로 만들고 단어 문자도 ASCII에서 [^\W_]와 같으므로 결과가 같음
+_ASCII_COMPOUND = _compound_pattern("[a-z0-9]")
+# 덩어리 안에서 한글, 한자/가나, 그 밖의 문자(영문/숫자) 구간을 나눔
+_CJK = "ᄀ-ᇿㄱ-ㆎ가-힣぀-ヿ㐀-䶿一-鿿"
+_PART = re.compile(rf"[{_CJK}]+|[^\W_{_CJK}]+")
+_IS_CJK = re.compile(rf"[{_CJK}]")
+_SEPARATOR = re.compile(f"[{_JOINERS}]")
+
+def _compound_parts(compound):
+    # 여러 단어로 이루어진 ASCII 복합어("err-404", "server_x")의 각 부분. 단어 하나면 빈 리스트
+    return [] if compound.isalnum() else _SEPARATOR.split(compound)
+
+def tokenize(text):
+    """
+    BM25용 토큰 리스트를 반환합니다.
+
+    영문은 소문자 단어 단위로, 하이픈/점으로 이어진 코드("ERR-404")는 전체와 각 부분을 모두 토큰으로 만듭니다.
+    한국어는 조사가 붙어 단어가 달라지므로("서버에서", "서버가") 형태소 분석 대신 음절 바이그램을 사용합니다.
+    """
+    if text.isascii():
+        # 영문만 있는 조각은 정규화와 단어 단위 반복 없이 처리 (BM25에서는 토큰 순서가 필요 없음)
+        compounds = _ASCII_COMPOUND.findall(text.lower())
+        return compounds + [part for compound in compounds for part in _compound_parts(compound)]
+
+    tokens = []
+    for compound in _COMPOUND.findall(unicodedata.normalize("NFKC", text).casefold()):
+        if compound.isascii():
+            tokens.append(compound)
+            tokens.extend(_compound_parts(compound))
+            continue
+        parts = _PART.findall(compound)
+        if len(parts) > 1 and not _IS_CJK.search(compound):
+            tokens.append(compound)
+        for part in parts:
+            if _IS_CJK.match(part) and len(part) > 1:
+                tokens.extend(part[i : i + 2] for i in range(len(part) - 1))
+            else:
+                tokens.append(part)
+    return tokens
+
+class LexicalIndex:
+    """
+    조각 본문에 대한 BM25 역색인입니다.
+
+    포스팅은 (단어 ID, 조각 번호, 단어 빈도) 열을 단어 ID 순으로 정렬한 NumPy 배열이며,
+    단어 i의 포스팅은 indptr[i]:indptr[i+1] 구간입니다. ChunkTable과 마찬가지로 extended/subset은
+    새 인스턴스를 반환하므로 검색 중인 스냅샷은 영향을 받지 않습니다. 단어 사전은 인스턴스끼리 공유하며
+    새 단어만 뒤에 추가됩니다.
+    """
+
+    def __init__(self, vocab=None, terms=None, term_ids=None, doc_ids=None, tfs=None, doc_len=None):
+        self.vocab = {} if vocab is None else vocab  # 단어 -> 단어 ID
+        self.terms = [] if terms is None else terms  # 단어 ID -> 단어 (저장용)
+        self.term_ids = np.zeros(0, dtype=np.int32) if term_ids is None else term_ids
+        self.doc_ids = np.zeros(0, dtype=np.int32) if doc_ids is None else doc_ids
+        self.tfs = np.zeros(0, dtype=np.uint16) if tfs is None else tfs
+        self.doc_len = np.zeros(0, dtype=np.int32) if doc_len is None else doc_len
+        counts = np.bincount(self.term_ids, minlength=len(self.terms))
+        self.indptr = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        self._norm = None
+
+    def __len__(self):
+        return len(self.doc_len)
+
+    @property
+    def nbytes(self):
+        return self.term_ids.nbytes + self.doc_ids.nbytes + self.tfs.nbytes + self.doc_len.nbytes + self.indptr.nbytes
+
+    def extended(self, texts):
+        """
+        texts를 새 조각으로 뒤에 추가한 인덱스를 반환합니다. 새 조각만 토큰화합니다.
+        """
+        if not texts:
+            return self
+        start = len(self)
+        term_ids, tfs, counts, lengths = [], [], [], []
+        for text in texts:
+            frequencies = Counter(tokenize(text))
+            for term, tf in frequencies.items():
+                term_id = self.vocab.get(term)
+                if term_id is None:
+                    term_id = self.vocab[term] = len(self.terms)
+                    self.terms.append(term)
+                term_ids.append(term_id)
+                tfs.append(min(tf, 65535))
+            counts.append(len(frequencies))
+            lengths.append(sum(frequencies.values()))
+
+        doc_ids = np.repeat(np.arange(start, start + len(texts), dtype=np.int32), counts)
+        all_term_ids = np.concatenate([self.term_ids, np.asarray(term_ids, dtype=np.int32)])
+        # 기존 조각 번호가 항상 작으므로 안정 정렬이면 단어별로 조각 번호 순서가 유지됨
+        order = np.argsort(all_term_ids, kind="stable")
+        return LexicalIndex(
+            self.vocab, self.terms,
+            all_term_ids[order],
+            np.concatenate([self.doc_ids, doc_ids])[order],
+            np.concatenate([self.tfs, np.asarray(tfs, dtype=np.uint16)])[order],
+            np.concatenate([self.doc_len, np.asarray(lengths, dtype=np.int32)]),
+        )
+
+    def subset(self, keep):
+        """
+        keep 마스크가 True인 조각만 남기고 조각 번호를 다시 매긴 인덱스를 반환합니다.
+        """
+        keep = np.asarray(keep, dtype=bool)
+        postings = keep[self.doc_ids]
+        renumber = (np.cumsum(keep) - 1).astype(np.int32)
+        return LexicalIndex(self.vocab, self.terms, self.term_ids[postings], renumber[self.doc_ids[postings]],
+                            self.tfs[postings], self.doc_len[keep])
+
+    def search(self, text, k, rows=None):
+        """
+        질문과 BM25 점수가 높은 순서로 최대 k개의 조각 번호 배열을 반환합니다. 겹치는 단어가 없는 조각은 제외합니다.
+
+        Args:
+            rows (np.ndarray): 지정하면 True인 조각 중에서만 검색
+        """
+        n = len(self)
+        term_ids = {self.vocab.get(term) for term in tokenize(text)}
+        term_ids = [t for t in term_ids if t is not None and t < len(self.indptr) - 1]
+        if not n or not term_ids:
+            return np.zeros(0, dtype=np.int64)
+
+        if self._norm is None:
+            avgdl = max(float(self.doc_len.mean()), 1.0)
+            self._norm = (BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len / avgdl)).astype(np.float32)
+        scores = np.zeros(n, dtype=np.float32)
+        for term_id in term_ids:
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            if start == end:
+                continue
+            docs = self.doc_ids[start:end]
+            tf = self.tfs[start:end].astype(np.float32)
+            df = end - start
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            scores[docs] += idf * tf * (BM25_K1 + 1) / (tf + self._norm[docs])
+
+        if rows is not None:
+            scores[~rows] = 0
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+def reciprocal_rank_fusion(rankings, k, constant=60):
+    """
+    여러 순위 목록을 RRF 점수(Σ 1 / (constant + 순위))로 합쳐 상위 k개의 조각 번호를 반환합니다.
+    """
+    rankings = [np.asarray(r, dtype=np.int64) for r in rankings if len(r)]
+    if not rankings:
+        return np.zeros(0, dtype=np.int64)
+    ids = np.concatenate(rankings)
+    scores = np.concatenate([1.0 / (constant + np.arange(1, len(r) + 1)) for r in rankings])
+    unique, inverse = np.unique(ids, return_inverse=True)
+    totals = np.bincount(inverse, weights=scores)
+    return unique[np.argsort(-totals, kind="stable")[:k]]
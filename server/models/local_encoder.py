@@ -0,0 +1,101 @@
+import logging
+import os
+
+import numpy as np
+
+from config.settings import (LOCAL_MODEL_PATH, LOCAL_MODEL_FILE, LOCAL_QUANTIZE, LOCAL_MODEL_THREADS,
+                             LOCAL_MAX_TOKENS, LOCAL_BATCH_SIZE)
+
+logger = logging.getLogger(__name__)
+
+# LOCAL_MODEL_FILE이 비어 있을 때 찾는 순서: int8 양자화 모델을 먼저 씀
+# (Hugging Face optimum/transformers.js 내보내기는 onnx/ 하위 디렉토리에 둠)
+_MODEL_FILES = ("model_quantized.onnx", "model_int8.onnx", "model.onnx")
+_QUANTIZED_FILE = "model_int8.onnx"
+
+def _find_model_file(path, filename=LOCAL_MODEL_FILE, quantize=LOCAL_QUANTIZE):
+    if filename:
+        return os.path.join(path, filename)
+    for directory in (path, os.path.join(path, "onnx")):
+        for name in _MODEL_FILES:
+            candidate = os.path.join(directory, name)
+            if os.path.exists(candidate):
+                if name == "model.onnx" and quantize:
+                    return _quantize(candidate)
+                return candidate
+    raise FileNotFoundError(f"No ONNX model ({', '.join(_MODEL_FILES)}) found in {path}")
+
+def _quantize(model_file):
+    """
+    float32 ONNX 모델의 가중치를 동적 int8로 양자화해 같은 디렉토리에 저장하고 그 경로를 반환합니다.
+    """
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    target = os.path.join(os.path.dirname(model_file), _QUANTIZED_FILE)
+    logger.info(f"Quantizing {model_file} to int8...")
+    quantize_dynamic(model_file, target + ".part", weight_type=QuantType.QInt8)
+    os.replace(target + ".part", target)
+    return target
+
+class LocalEncoder:
+    """
+    ONNX로 내보낸 문장 임베딩 모델(예: all-MiniLM-L6-v2)을 onnxruntime으로 CPU에서 실행합니다.
+
+    토큰 길이가 비슷한 텍스트끼리 batch_size개씩 묶어 배치 안의 가장 긴 텍스트까지만 패딩하고,
+    마지막 은닉 상태를 attention mask로 평균 낸 뒤 L2 정규화합니다 (sentence-transformers의 mean pooling과 같음).
+    """
+
+    def __init__(self, path=LOCAL_MODEL_PATH, threads=LOCAL_MODEL_THREADS, max_tokens=LOCAL_MAX_TOKENS,
+                 batch_size=LOCAL_BATCH_SIZE):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError:
+            raise ImportError("The local embedding model requires the onnxruntime and tokenizers packages "
+                              "(pip install onnxruntime tokenizers)")
+        self.model_file = _find_model_file(path)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(self.model_file, options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(path, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_tokens)
+        self.tokenizer.no_padding()  # 배치마다 직접 패딩
+        self.batch_size = batch_size
+
+    def __call__(self, texts):
+        """
+        텍스트 리스트의 (텍스트 수, 차원) 정규화 임베딩 행렬을 반환합니다.
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        encodings = self.tokenizer.encode_batch(list(texts))
+        lengths = np.fromiter((len(encoding.ids) for encoding in encodings), dtype=np.int64, count=len(encodings))
+        order = np.argsort(lengths, kind="stable")
+        result = None
+        for start in range(0, len(order), self.batch_size):
+            rows = order[start : start + self.batch_size]
+            pooled = self._encode([encodings[row] for row in rows], int(lengths[rows].max()))
+            if result is None:
+                result = np.empty((len(texts), pooled.shape[1]), dtype=np.float32)
+            result[rows] = pooled
+        return result
+
+    def _encode(self, encodings, length):
+        input_ids = np.zeros((len(encodings), length), dtype=np.int64)
+        attention_mask = np.zeros((len(encodings), length), dtype=np.int64)
+        for i, encoding in enumerate(encodings):
+            input_ids[i, : len(encoding.ids)] = encoding.ids
+            attention_mask[i, : len(encoding.ids)] = 1
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        output = self.session.run(None, {name: feeds[name] for name in self.input_names})[0]
+        if output.ndim == 3:
+            # (배치, 토큰, 차원) 은닉 상태 -> 패딩을 뺀 평균
+            mask = attention_mask[:, :, None].astype(np.float32)
+            output = (output * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        output = output.astype(np.float32, copy=False)
+        return output / np.maximum(np.linalg.norm(output, axis=1, keepdims=True), 1e-12)
@@ -0,0 +1,122 @@
+import logging
+import threading
+import time
+
+import numpy as np
+
+from config.settings import RERANKER, RERANK_TOP_K, MMR_LAMBDA, CROSS_ENCODER_MODEL, RERANK_BUDGET_MS
+
+logger = logging.getLogger(__name__)
+
+# 크로스 인코더 한 번에 점수를 매길 (질문, 조각) 쌍 수. 작을수록 시간 예산을 촘촘하게 확인함
+_CROSS_ENCODER_BATCH = 8
+
+def _normalize(x):
+    return x / np.maximum(np.linalg.norm(x, axis=-1, keepdims=True), 1e-12)
+
+def mmr(query, candidates, k, diversity_lambda=MMR_LAMBDA):
+    """
+    maximal marginal relevance로 후보 k개를 고릅니다.
+
+    매 단계 λ·sim(질문, 후보) − (1−λ)·max sim(후보, 이미 고른 조각) 이 가장 큰 후보를 고르므로,
+    같은 페이지의 거의 같은 조각들 중 하나만 남고 다른 내용의 조각이 그 자리를 채웁니다.
+    후보끼리의 유사도 행렬을 한 번 계산하고 단계마다 벡터 연산만 합니다.
+
+    Args:
+        query (np.ndarray): (차원,) 질문 임베딩
+        candidates (np.ndarray): (후보 수, 차원) 후보 임베딩 (검색 순서)
+        k (int): 고를 후보 수
+
+    Returns:
+        np.ndarray: 고른 순서대로의 후보 위치 (candidates의 행 번호)
+    """
+    k = min(k, len(candidates))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    vectors = _normalize(np.asarray(candidates, dtype=np.float32))
+    relevance = vectors @ _normalize(np.asarray(query, dtype=np.float32))
+    similarity = vectors @ vectors.T
+
+    redundancy = np.zeros(len(vectors), dtype=np.float32)
+    available = np.ones(len(vectors), dtype=bool)
+    selected = np.empty(k, dtype=np.int64)
+    for step in range(k):
+        scores = diversity_lambda * relevance - (1 - diversity_lambda) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected[step] = best
+        available[best] = False
+        redundancy = similarity[best] if step == 0 else np.maximum(redundancy, similarity[best])
+    return selected
+
+_cross_encoder = None
+_cross_encoder_lock = threading.Lock()
+_cross_encoder_failed = False  # 패키지가 없거나 모델을 불러오지 못하면 한 번만 경고하고 이후로는 MMR로 대체
+
+def load_cross_encoder():
+    """
+    CROSS_ENCODER_MODEL(Hugging Face 이름 또는 로컬 디렉토리)을 CPU에서 한 번만 불러옵니다.
+    """
+    global _cross_encoder
+    if _cross_encoder is None:
+        with _cross_encoder_lock:
+            if _cross_encoder is None:
+                try:
+                    from sentence_transformers import CrossEncoder
+                except ImportError:
+                    raise ImportError("RERANKER=cross-encoder requires the sentence-transformers package "
+                                      "(pip install sentence-transformers)")
+                logger.info(f"Loading cross-encoder {CROSS_ENCODER_MODEL}...")
+                _cross_encoder = CrossEncoder(CROSS_ENCODER_MODEL, device="cpu")
+    return _cross_encoder
+
+def cross_encode(question, texts, k, budget_ms=RERANK_BUDGET_MS, model=None):
+    """
+    (질문, 조각) 쌍을 크로스 인코더로 점수화해 점수 순서로 k개의 위치를 반환합니다.
+
+    검색 순서대로 작은 배치씩 점수를 매기다가 budget_ms를 넘으면 멈추고, 점수를 매기지 못한 후보는
+    검색 순서 그대로 뒤에 붙입니다. 따라서 재정렬 시간은 대략 예산 + 배치 하나로 제한됩니다.
+    """
+    model = model or load_cross_encoder()
+    deadline = time.perf_counter() + budget_ms / 1000
+    scores = []
+    for start in range(0, len(texts), _CROSS_ENCODER_BATCH):
+        pairs = [(question, text) for text in texts[start : start + _CROSS_ENCODER_BATCH]]
+        scores.extend(np.asarray(model.predict(pairs), dtype=np.float32).reshape(-1).tolist())
+        if time.perf_counter() > deadline:
+            break
+    if len(scores) < len(texts):
+        logger.info(f"Cross-encoder budget of {budget_ms} ms spent after {len(scores)} of {len(texts)} candidates")
+    scored = np.argsort(-np.asarray(scores, dtype=np.float32), kind="stable")
+    return np.concatenate([scored, np.arange(len(scores), len(texts))])[:k].astype(np.int64)
+
+def rerank(question, query_embedding, rows, embeddings, data, k=RERANK_TOP_K, method=RERANKER):
+    """
+    검색 후보(조각 번호 배열)를 method에 따라 다시 골라 최대 k개의 조각 번호 배열을 반환합니다.
+
+    Args:
+        question (str): 질문 (크로스 인코더용)
+        query_embedding (np.ndarray): 질문 임베딩 (MMR용)
+        rows (np.ndarray): 검색 순서의 후보 조각 번호
+        embeddings (np.ndarray): 인덱스의 전체 임베딩 행렬 (memmap이면 후보 행만 읽음)
+        data (ChunkTable): 조각 본문을 읽을 테이블
+    """
+    global _cross_encoder_failed
+    rows = np.asarray(rows, dtype=np.int64)
+    if method in (None, "none") or len(rows) == 0:
+        return rows
+    if method == "cross-encoder" and not _cross_encoder_failed:
+        try:
+            model = load_cross_encoder()
+        except Exception as e:
+            # 패키지 누락, 잘못된 모델 경로, 다운로드 실패 등은 요청마다 다시 시도하지 않음
+            _cross_encoder_failed = True
+            logger.warning(f"Could not load the cross-encoder ({str(e)}), falling back to MMR")
+        else:
+            try:
+                return rows[cross_encode(question, data.texts(rows), k, model=model)]
+            except Exception as e:
+                logger.warning(f"Cross-encoder scoring failed ({str(e)}), using MMR for this question")
+    elif method not in ("mmr", "cross-encoder"):
+        raise ValueError(f"Unknown reranker '{method}' (use none, mmr or cross-encoder)")
+    return rows[mmr(query_embedding, embeddings[rows], k)]
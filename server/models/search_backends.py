@@ -0,0 +1,574 @@
+import copy
+import logging
+import os
+
+import numpy as np
+
+from config.settings import (
+    SEARCH_BACKEND, IVF_NLIST, IVF_NPROBE, IVF_MIN_SIZE, PQ_M, IVF_REFINE, ANN_REFINE, HNSW_M, HNSW_EF, EMBEDDING_STORAGE,
+)
+
+logger = logging.getLogger(__name__)
+
+# 한 번에 계산할 (질문 수 x 조각 수) 점수 행렬의 최대 원소 수 (약 256MB float32)
+_SCORE_BLOCK = 1 << 26
+# 인코딩/할당을 나누어 처리할 행 수
+_ROW_BLOCK = 1 << 16
+# 압축된 임베딩을 float32로 바꿔 점수를 계산할 블록의 원소 수 (캐시에 들어가는 약 8MB)
+_CAST_BLOCK = 1 << 21
+# 정확 검색에서 메모리에 둘 임베딩 사본의 형식
+_STORAGE_TYPES = {"float32": None, "float16": np.float16, "int8": np.int8}
+
+def _normalize(x):
+    x = np.asarray(x, dtype=np.float32)
+    return x / np.maximum(np.linalg.norm(x, axis=-1, keepdims=True), 1e-12)
+
+def _top_k(scores, k):
+    """
+    각 행에서 점수가 가장 큰 k개의 열 인덱스를 점수 내림차순으로 반환합니다.
+    """
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return np.zeros((scores.shape[0], 0), dtype=np.int64)
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+class SearchBackend:
+    """
+    검색 백엔드의 공통 인터페이스.
+
+    build()로 임베딩 행렬의 인덱스를 만들고, search()는 질문 임베딩 행렬의 각 행에 대해
+    가장 가까운 조각 인덱스를 가까운 순서로 반환합니다. extended()/subset()은 기존 인덱스를
+    그대로 둔 채 조각이 추가/제거된 새 백엔드를 반환합니다 (기본 구현은 다시 build).
+    """
+
+    name = None
+
+    def build(self, embeddings):
+        raise NotImplementedError
+
+    def remap(self, embeddings):
+        """
+        같은 내용의 임베딩 행렬(예: 디스크에 저장한 뒤 memmap으로 다시 연 행렬)을 참조하도록 바꿉니다.
+        """
+        for name, value in list(vars(self).items()):
+            if name == "embeddings":
+                self.embeddings = embeddings
+            elif isinstance(value, SearchBackend):
+                value.remap(embeddings)
+
+    def arrays(self):
+        # 임베딩 행렬은 SemanticSearch와 공유하므로 빼고, 백엔드가 따로 만든 배열만 반환
+        for name, value in vars(self).items():
+            if isinstance(value, np.ndarray) and name != "embeddings":
+                yield value
+            elif isinstance(value, SearchBackend):
+                yield from value.arrays()
+
+    @property
+    def nbytes(self):
+        return sum(int(array.nbytes) for array in self.arrays())
+
+    def save(self, prefix):
+        """
+        다시 만들기 비싼 구조(학습된 양자화기, 그래프)를 prefix로 시작하는 파일들에 저장합니다.
+        저장할 것이 없으면(임베딩만으로 바로 만들 수 있으면) False를 반환합니다.
+        """
+        return False
+
+    def load(self, embeddings, prefix):
+        """
+        save로 저장한 파일과 같은 임베딩 행렬로 build 없이 백엔드를 복원합니다. 파일이 없거나 맞지 않으면 False를 반환합니다.
+        """
+        return False
+
+    def search(self, queries, k, rows=None):
+        """
+        Args:
+            queries (np.ndarray): (질문 수, 차원) 질문 임베딩
+            k (int): 질문별로 반환할 조각 수
+            rows (np.ndarray): 검색 대상 조각의 bool 마스크 (None이면 전체)
+
+        Returns:
+            list: 질문별 조각 인덱스 배열 (가까운 순)
+        """
+        raise NotImplementedError
+
+    def extended(self, embeddings, start):
+        """
+        embeddings[start:]가 새로 추가된 전체 임베딩 행렬로 새 백엔드를 만듭니다.
+        """
+        backend = type(self)()
+        backend.build(embeddings)
+        return backend
+
+    def subset(self, embeddings, keep):
+        """
+        keep이 적용된 임베딩 행렬(embeddings)로 새 백엔드를 만듭니다.
+        """
+        backend = type(self)()
+        backend.build(embeddings)
+        return backend
+
+class ExactDotBackend(SearchBackend):
+    """
+    정규화된 내적(코사인 유사도)으로 모든 조각을 정확히 비교합니다.
+    행렬곱 한 번으로 여러 질문을 처리하며, 임베딩 행렬(memmap 포함)은 복사하지 않고 노름만 따로 보관합니다.
+
+    storage가 "float16" 또는 "int8"이면 정규화된 임베딩을 그 형식으로 압축한 사본을 메모리에 두고,
+    먼저 압축된 벡터로 k * ANN_REFINE개의 후보를 고른 뒤 원래 임베딩(보통 디스크의 memmap)으로 후보만 정확히 재정렬합니다.
+    """
+
+    name = "exact"
+
+    def __init__(self, storage=None):
+        self.storage = storage or EMBEDDING_STORAGE
+        if self.storage not in _STORAGE_TYPES:
+            raise ValueError(f"Unknown embedding storage '{self.storage}', choose one of {sorted(_STORAGE_TYPES)}")
+
+    def build(self, embeddings, inv_norms=None, codes=None, scale=None):
+        self.embeddings = embeddings
+        if inv_norms is None:
+            inv_norms = self._inv_norms(embeddings)
+        self.inv_norms = inv_norms
+        self.codes, self.scale = codes, scale
+        if self.storage != "float32" and codes is None:
+            self.codes, self.scale = self._quantize(embeddings, inv_norms)
+
+    @staticmethod
+    def _inv_norms(embeddings):
+        norms = np.sqrt(np.einsum("ij,ij->i", embeddings, embeddings, dtype=np.float32))
+        return (1.0 / np.maximum(norms, 1e-12)).astype(np.float32)
+
+    def _quantize(self, embeddings, inv_norms, scale=None):
+        """
+        정규화된 임베딩을 storage 형식으로 압축합니다. int8은 차원별 대칭 스케일(최댓값 / 127)을 쓰며,
+        scale을 넘기면(조각 추가 시) 기존 스케일로 양자화합니다.
+
+        Returns:
+            tuple: (압축된 행렬, int8의 차원별 스케일 또는 None)
+        """
+        dtype = _STORAGE_TYPES[self.storage]
+        codes = np.empty(embeddings.shape, dtype=dtype)
+        if self.storage == "int8" and scale is None:
+            peak = np.zeros(embeddings.shape[1], dtype=np.float32)
+            for start in range(0, len(embeddings), _ROW_BLOCK):
+                block = np.asarray(embeddings[start : start + _ROW_BLOCK], dtype=np.float32)
+                peak = np.maximum(peak, np.abs(block * inv_norms[start : start + len(block), None]).max(axis=0, initial=0))
+            scale = np.maximum(peak, 1e-12) / 127
+        for start in range(0, len(embeddings), _ROW_BLOCK):
+            block = np.asarray(embeddings[start : start + _ROW_BLOCK], dtype=np.float32)
+            block = block * inv_norms[start : start + len(block), None]
+            if scale is not None:
+                block = np.clip(np.rint(block / scale), -127, 127)
+            codes[start : start + len(block)] = block
+        return codes, scale
+
+    def scores(self, queries, candidates):
+        return (np.asarray(self.embeddings[candidates]) @ _normalize(queries).T).T * self.inv_norms[candidates]
+
+    def _coarse_scores(self, queries, candidates):
+        # 압축된 행렬은 작은 행 블록 단위로만 float32로 바꿔 임시 메모리를 제한 (int8 스케일은 질문 쪽에 곱함)
+        queries = _normalize(queries)
+        if self.scale is not None:
+            queries = queries * self.scale
+        count = len(self.codes) if candidates is None else len(candidates)
+        step = max(1, _CAST_BLOCK // self.codes.shape[1])
+        scores = np.empty((len(queries), count), dtype=np.float32)
+        for start in range(0, count, step):
+            rows = slice(start, start + step) if candidates is None else candidates[start : start + step]
+            block = self.codes[rows].astype(np.float32)
+            scores[:, start : start + len(block)] = (block @ queries.T).T
+        return scores
+
+    def search(self, queries, k, rows=None):
+        candidates = None if rows is None else np.flatnonzero(rows)
+        count = len(self.embeddings) if candidates is None else len(candidates)
+        step = max(1, _SCORE_BLOCK // max(count, 1))
+        results = []
+        for start in range(0, len(queries), step):
+            block = queries[start : start + step]
+            if self.codes is not None:
+                results.extend(self._rerank(block, candidates, k))
+            elif candidates is None:
+                scores = (self.embeddings @ _normalize(block).T).T * self.inv_norms
+                results.extend(_top_k(scores, k))
+            else:
+                scores = self.scores(block, candidates)
+                results.extend(candidates[top] for top in _top_k(scores, k))
+        return results
+
+    def _rerank(self, queries, candidates, k):
+        shortlists = _top_k(self._coarse_scores(queries, candidates), k * ANN_REFINE)
+        results = []
+        for query, shortlist in zip(queries, shortlists):
+            shortlist = np.sort(shortlist if candidates is None else candidates[shortlist])  # memmap을 순서대로 읽도록 정렬
+            results.append(shortlist[_top_k(self.scores(query[None], shortlist), k)[0]])
+        return results
+
+    def extended(self, embeddings, start):
+        backend = ExactDotBackend(self.storage)
+        inv_norms = np.concatenate([self.inv_norms, self._inv_norms(embeddings[start:])])
+        codes = None
+        if self.codes is not None:
+            new_codes, _ = self._quantize(embeddings[start:], inv_norms[start:], self.scale)
+            codes = np.concatenate([self.codes, new_codes])
+        backend.build(embeddings, inv_norms, codes, self.scale)
+        return backend
+
+    def subset(self, embeddings, keep):
+        backend = ExactDotBackend(self.storage)
+        backend.build(embeddings, self.inv_norms[keep], None if self.codes is None else self.codes[keep], self.scale)
+        return backend
+
+class SklearnBackend(SearchBackend):
+    """
+    sklearn NearestNeighbors(brute, 유클리드 거리). 이전 버전과 같은 순위를 원할 때 사용합니다.
+    """
+
+    name = "sklearn"
+
+    def build(self, embeddings):
+        from sklearn.neighbors import NearestNeighbors  # 임포트 비용이 커서 이 백엔드를 쓸 때만 불러옴
+
+        self.embeddings = embeddings
+        self.nn = NearestNeighbors(algorithm="brute")
+        self.nn.fit(embeddings)
+
+    def search(self, queries, k, rows=None):
+        if rows is None:
+            return list(self.nn.kneighbors(queries, n_neighbors=min(k, len(self.embeddings)), return_distance=False))
+        candidates = np.flatnonzero(rows)
+        results = []
+        for query in np.asarray(queries):
+            distances = np.linalg.norm(np.asarray(self.embeddings[candidates]) - query, axis=1)
+            results.append(candidates[_top_k(-distances[None, :], k)[0]])
+        return results
+
+def _assign(x, centroids, centroid_norms):
+    """
+    각 행에 가장 가까운(유클리드) 중심의 번호를 반환합니다.
+    """
+    assign = np.empty(len(x), dtype=np.int32)
+    for start in range(0, len(x), _ROW_BLOCK):
+        block = x[start : start + _ROW_BLOCK]
+        assign[start : start + len(block)] = np.argmin(centroid_norms - 2 * block @ centroids.T, axis=1)
+    return assign
+
+def _kmeans(x, k, iters=10, seed=0):
+    """
+    NumPy로 구현한 Lloyd k-means. 빈 클러스터는 임의의 점으로 다시 초기화합니다.
+    """
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), k, replace=False)].copy()
+    for _ in range(iters):
+        assign = _assign(x, centroids, (centroids ** 2).sum(axis=1))
+        counts = np.bincount(assign, minlength=k)
+        sums = np.stack([np.bincount(assign, weights=x[:, j], minlength=k) for j in range(x.shape[1])], axis=1)
+        empty = counts == 0
+        centroids = (sums / np.maximum(counts, 1)[:, None]).astype(np.float32)
+        centroids[empty] = x[rng.choice(len(x), int(empty.sum()))]
+    return centroids
+
+class IVFPQBackend(SearchBackend):
+    """
+    역파일(IVF) + 곱 양자화(PQ) 근사 검색. 외부 라이브러리 없이 NumPy로 구현되어 있습니다.
+
+    정규화된 벡터를 nlist개의 거친 클러스터로 나누고, 중심과의 잔차를 PQ_M개의 부분 공간마다
+    256개 코드워드로 양자화하여 조각당 PQ_M 바이트만 사용합니다. 검색 시 가까운 nprobe개 클러스터의
+    조각만 비대칭 거리(ADC)로 비교하고, 상위 k * IVF_REFINE개 후보를 원래 임베딩으로 정확히 재정렬합니다.
+    파일 필터(rows)로 허용된 조각이 적거나 프로브한 클러스터에 k * IVF_REFINE개보다 적게 남으면 정확 검색으로 대체합니다.
+    조각 수가 IVF_MIN_SIZE보다 작으면 정확 검색을 사용합니다.
+    """
+
+    name = "ivfpq"
+
+    def __init__(self, nlist=IVF_NLIST, nprobe=IVF_NPROBE, m=PQ_M, refine=IVF_REFINE,
+                 min_size=IVF_MIN_SIZE, train_size=100000, seed=0):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.m = m
+        self.refine = refine
+        self.min_size = min_size
+        self.train_size = train_size
+        self.seed = seed
+        self.trained = False
+
+    def _config(self):
+        return dict(nlist=self.nlist, nprobe=self.nprobe, m=self.m, refine=self.refine,
+                    min_size=self.min_size, train_size=self.train_size, seed=self.seed)
+
+    def build(self, embeddings):
+        self.exact = ExactDotBackend("float32")  # 재정렬/대체용이므로 별도로 압축하지 않음
+        self.exact.build(embeddings)
+        n, d = embeddings.shape
+        if n < self.min_size:
+            self.trained = False
+            return
+
+        rng = np.random.default_rng(self.seed)
+        sample = _normalize(embeddings[np.sort(rng.choice(n, min(n, self.train_size), replace=False))])
+        nlist = self.nlist or max(1, int(min(4 * np.sqrt(n), len(sample) // 39)))
+        m = max(divisor for divisor in range(1, min(self.m, d) + 1) if d % divisor == 0)
+        self.dsub = d // m
+        ksub = min(256, len(sample))
+
+        logger.info(f"Training IVF-PQ index: {n} vectors, nlist={nlist}, m={m}")
+        self.centroids = _kmeans(sample, nlist, seed=self.seed)
+        self.centroid_norms = (self.centroids ** 2).sum(axis=1)
+        # 코드북은 부분 공간마다 256개 중심만 학습하면 되므로 더 작은 표본으로 충분
+        pq_sample = sample[: max(ksub * 64, 1)]
+        residuals = pq_sample - self.centroids[_assign(pq_sample, self.centroids, self.centroid_norms)]
+        self.codebooks = np.stack([
+            _kmeans(np.ascontiguousarray(residuals[:, j * self.dsub:(j + 1) * self.dsub]), ksub, seed=self.seed + j)
+            for j in range(m)
+        ])  # (m, ksub, dsub)
+        self.trained = True
+
+        self.assign, self.codes, self.terms = self._encode(embeddings)
+        self._build_lists()
+
+    def _encode(self, embeddings):
+        """
+        Returns:
+            tuple: (조각별 클러스터 번호, (조각 수, m) PQ 코드, 조각별 거리 보정항)
+        """
+        m = len(self.codebooks)
+        assign = np.empty(len(embeddings), dtype=np.int32)
+        codes = np.empty((len(embeddings), m), dtype=np.uint8)
+        terms = np.empty(len(embeddings), dtype=np.float32)
+        codebook_norms = (self.codebooks ** 2).sum(axis=2)
+        # 블록마다 (m, 행 수, ksub) 거리 텐서가 만들어지므로 그 크기로 블록을 나눔
+        step = max(1, (_SCORE_BLOCK >> 2) // (m * self.codebooks.shape[1]))
+        for start in range(0, len(embeddings), step):
+            block = _normalize(embeddings[start : start + step])
+            block_assign = _assign(block, self.centroids, self.centroid_norms)
+            residuals = (block - self.centroids[block_assign]).reshape(len(block), m, self.dsub)
+            # 부분 공간별 행렬곱 (m, n, dsub) @ (m, dsub, ksub)
+            products = np.matmul(residuals.transpose(1, 0, 2), self.codebooks.transpose(0, 2, 1))
+            distances = codebook_norms[:, None, :] - 2 * products
+            block_codes = np.argmin(distances, axis=2).T
+            assign[start : start + len(block)] = block_assign
+            codes[start : start + len(block)] = block_codes
+            # ||q - c - r||^2 = ||q - c||^2 - 2<q, r> + (||r||^2 + 2<c, r>) 에서 질문과 무관한 괄호 부분 (r은 복원된 잔차)
+            restored = self.codebooks[np.arange(m), block_codes]  # (n, m, dsub)
+            centroids = self.centroids[block_assign].reshape(len(block), m, self.dsub)
+            terms[start : start + len(block)] = np.einsum("nmd,nmd->n", restored, restored + 2 * centroids)
+        return assign, codes, terms
+
+    def _build_lists(self):
+        # 클러스터 번호 순으로 정렬한 조각 인덱스와 클러스터별 시작 위치
+        self.order = np.argsort(self.assign, kind="stable")
+        self.list_offsets = np.searchsorted(self.assign[self.order], np.arange(len(self.centroids) + 1))
+        # 검색은 프로브한 클러스터의 연속 구간만 읽도록 코드와 보정항을 클러스터 순서로 둠
+        self.list_codes = self.codes[self.order]
+        self.list_terms = self.terms[self.order]
+
+    # 저장하는 배열: 학습된 양자화기와 조각별 코드, 클러스터 순서로 정렬한 검색용 사본
+    _SAVED = ("centroids", "codebooks", "assign", "codes", "terms", "order", "list_offsets", "list_codes", "list_terms")
+
+    def save(self, prefix):
+        if not self.trained:
+            return False
+        for name in self._SAVED:
+            np.save(f"{prefix}{name}.npy", getattr(self, name))
+        return True
+
+    def load(self, embeddings, prefix):
+        paths = {name: f"{prefix}{name}.npy" for name in self._SAVED}
+        if not all(os.path.exists(path) for path in paths.values()):
+            return False
+        # 조각 수에 비례하는 배열은 memmap으로 매핑해 서빙 워커끼리 공유 (다시 학습하거나 인코딩하지 않음)
+        arrays = {name: np.load(path, mmap_mode="r") for name, path in paths.items()}
+        if len(arrays["codes"]) != len(embeddings):
+            return False
+        self.exact = ExactDotBackend("float32")
+        self.exact.build(embeddings)
+        self.__dict__.update(arrays)
+        self.centroids = np.asarray(self.centroids)
+        self.codebooks = np.asarray(self.codebooks)
+        self.centroid_norms = (self.centroids ** 2).sum(axis=1)
+        self.dsub = embeddings.shape[1] // len(self.codebooks)
+        self.trained = True
+        return True
+
+    def search(self, queries, k, rows=None):
+        if not self.trained:
+            return self.exact.search(queries, k, rows)
+        m, ksub = self.codebooks.shape[:2]
+        nlist = len(self.centroids)
+        nprobe = min(self.nprobe, nlist)
+        # 허용된 조각이 프로브할 클러스터의 평균 크기보다 적으면 정확 검색이 더 싸고 결과도 다 채움
+        if rows is not None and int(rows.sum()) * nlist <= len(self.assign) * nprobe:
+            return self.exact.search(queries, k, rows)
+        queries = _normalize(queries)
+        # 모든 질문의 중심 거리(||q - c||^2 - ||q||^2)와 프로브할 클러스터를 한 번에 계산
+        coarse = self.centroid_norms - 2 * queries @ self.centroids.T
+        probes = np.argpartition(coarse, nprobe - 1, axis=1)[:, :nprobe] if nprobe < nlist else \
+            np.broadcast_to(np.arange(nlist), coarse.shape)
+        # 질문별 내적표 tables[i, j * ksub + c] = <q_j, codebook_j[c]>. 보정항 덕분에 클러스터마다 표를 만들지 않음
+        tables = np.matmul(queries.reshape(len(queries), m, self.dsub).transpose(1, 0, 2),
+                           self.codebooks.transpose(0, 2, 1)).transpose(1, 0, 2).reshape(len(queries), m * ksub)
+        code_offsets = np.arange(m, dtype=np.intp) * ksub
+        results = []
+        fallback = []  # 프로브한 클러스터에 필터를 통과한 후보가 부족한 질문
+        for query, distances, probe, table in zip(queries, coarse, probes, tables):
+            starts = self.list_offsets[probe]
+            lengths = self.list_offsets[probe + 1] - starts
+            positions = np.arange(lengths.sum()) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+            list_distances = np.repeat(distances[probe], lengths)
+            if rows is not None:
+                allowed = rows[self.order[positions]]
+                positions, list_distances = positions[allowed], list_distances[allowed]
+                if len(positions) < k * self.refine:
+                    fallback.append(len(results))
+                    results.append(None)
+                    continue
+            if len(positions) == 0:
+                results.append(np.zeros(0, dtype=np.int64))
+                continue
+            approx = (list_distances + self.list_terms[positions]
+                      - 2 * table[self.list_codes[positions] + code_offsets].sum(axis=1))
+            shortlist = np.sort(self.order[positions[_top_k(-approx[None], k * self.refine)[0]]])
+            exact = self.exact.scores(query[None], shortlist)[0]
+            results.append(shortlist[_top_k(exact[None], k)[0]])
+        if fallback:
+            for i, result in zip(fallback, self.exact.search(queries[fallback], k, rows)):
+                results[i] = result
+        return results
+
+    def extended(self, embeddings, start):
+        backend = IVFPQBackend(**self._config())
+        if not self.trained:
+            backend.build(embeddings)
+            return backend
+        # 이미 학습된 양자화기로 새 조각만 인코딩
+        backend.__dict__.update({key: value for key, value in self.__dict__.items()})
+        backend.exact = self.exact.extended(embeddings, start)
+        assign, codes, terms = self._encode(embeddings[start:])
+        backend.assign = np.concatenate([self.assign, assign])
+        backend.codes = np.concatenate([self.codes, codes])
+        backend.terms = np.concatenate([self.terms, terms])
+        backend._build_lists()
+        return backend
+
+    def subset(self, embeddings, keep):
+        backend = IVFPQBackend(**self._config())
+        if not self.trained or len(embeddings) < self.min_size:
+            backend.build(embeddings)
+            return backend
+        backend.__dict__.update({key: value for key, value in self.__dict__.items()})
+        backend.exact = self.exact.subset(embeddings, keep)
+        backend.assign = self.assign[keep]
+        backend.codes = self.codes[keep]
+        backend.terms = self.terms[keep]
+        backend._build_lists()
+        return backend
+
+class HNSWBackend(SearchBackend):
+    """
+    hnswlib의 HNSW 그래프 근사 검색 (코사인). hnswlib가 설치되어 있어야 합니다 (pip install hnswlib).
+
+    조각이 추가/제거되면 그래프를 복사해(거리 계산 없이 메모리 복사만) 새 조각만 삽입하고 제거된 조각은
+    삭제 표시하므로, 검색 중인 기존 백엔드는 그대로 남습니다. 그래프 노드 번호(label)는 label_rows로
+    현재 조각 인덱스에 대응하며(삭제된 노드는 -1), 삭제된 노드가 절반을 넘으면 그래프를 다시 만듭니다.
+    """
+
+    name = "hnsw"
+
+    def __init__(self, m=HNSW_M, ef=HNSW_EF):
+        try:
+            import hnswlib
+        except ImportError:
+            raise ImportError("SEARCH_BACKEND=hnsw requires the hnswlib package (pip install hnswlib)")
+        self.hnswlib = hnswlib
+        self.m = m
+        self.ef = ef
+
+    def build(self, embeddings):
+        self.exact = ExactDotBackend("float32")  # 재정렬/대체용이므로 별도로 압축하지 않음
+        self.exact.build(embeddings)
+        self.index = self.hnswlib.Index(space="cosine", dim=embeddings.shape[1])
+        self.index.init_index(max_elements=max(1, len(embeddings)), ef_construction=max(self.ef, 100), M=self.m)
+        self._add_items(embeddings, 0)
+        self.label_rows = np.arange(len(embeddings), dtype=np.int64)
+
+    def _add_items(self, embeddings, first_label):
+        for start in range(0, len(embeddings), _ROW_BLOCK):
+            block = np.asarray(embeddings[start : start + _ROW_BLOCK], dtype=np.float32)
+            self.index.add_items(block, np.arange(first_label + start, first_label + start + len(block)))
+
+    def save(self, prefix):
+        self.index.save_index(f"{prefix}graph.bin")
+        np.save(f"{prefix}label_rows.npy", self.label_rows)
+        return True
+
+    def load(self, embeddings, prefix):
+        path = f"{prefix}graph.bin"
+        if not os.path.exists(path):
+            return False
+        # 그래프를 다시 만들지 않고 파일에서 읽음 (hnswlib는 메모리로 읽어 들이므로 매핑되지는 않음)
+        index = self.hnswlib.Index(space="cosine", dim=embeddings.shape[1])
+        index.load_index(path)
+        labels_path = f"{prefix}label_rows.npy"
+        # 노드 번호 대응표가 없는 예전 스냅샷은 삭제된 노드가 없는 그래프
+        label_rows = np.load(labels_path) if os.path.exists(labels_path) else \
+            np.arange(index.get_current_count(), dtype=np.int64)
+        if len(label_rows) != index.get_current_count() or int((label_rows >= 0).sum()) != len(embeddings):
+            return False
+        self.exact = ExactDotBackend("float32")
+        self.exact.build(embeddings)
+        self.index = index
+        self.label_rows = label_rows
+        return True
+
+    def search(self, queries, k, rows=None):
+        k = min(k, len(self.exact.embeddings) if rows is None else int(rows.sum()))
+        if k == 0:
+            return [np.zeros(0, dtype=np.int64) for _ in queries]
+        self.index.set_ef(max(self.ef, k))
+        label_rows = self.label_rows
+        try:
+            labels, _ = self.index.knn_query(np.asarray(queries, dtype=np.float32), k=k,
+                                             filter=None if rows is None else (lambda i: bool(rows[label_rows[i]])))
+        except RuntimeError:
+            # 필터에 맞는 조각이 너무 적으면 그래프 탐색이 k개를 채우지 못하므로 정확 검색으로 대체
+            return self.exact.search(queries, k, rows)
+        return [label_rows[label] for label in labels]
+
+    def _copy(self, exact, label_rows):
+        backend = HNSWBackend(self.m, self.ef)
+        backend.exact = exact
+        backend.index = copy.copy(self.index)
+        backend.label_rows = label_rows
+        return backend
+
+    def extended(self, embeddings, start):
+        first_label = len(self.label_rows)
+        label_rows = np.concatenate([self.label_rows, np.arange(start, len(embeddings), dtype=np.int64)])
+        backend = self._copy(self.exact.extended(embeddings, start), label_rows)
+        backend.index.resize_index(max(1, len(label_rows)))
+        backend._add_items(embeddings[start:], first_label)
+        return backend
+
+    def subset(self, embeddings, keep):
+        live = self.label_rows >= 0
+        new_rows = np.where(keep, np.cumsum(keep) - 1, -1)
+        label_rows = np.where(live, new_rows[np.maximum(self.label_rows, 0)], -1)
+        if int((label_rows < 0).sum()) * 2 > len(label_rows):
+            backend = HNSWBackend(self.m, self.ef)
+            backend.build(embeddings)
+            return backend
+        backend = self._copy(self.exact.subset(embeddings, keep), label_rows)
+        for label in np.flatnonzero(live & (label_rows < 0)):
+            backend.index.mark_deleted(int(label))
+        return backend
+
+_BACKENDS = {backend.name: backend for backend in (ExactDotBackend, SklearnBackend, IVFPQBackend, HNSWBackend)}
+
+def make_backend(name=None):
+    name = name or SEARCH_BACKEND
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown search backend '{name}', choose one of {sorted(_BACKENDS)}")
+    return _BACKENDS[name]()
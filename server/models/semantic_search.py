@@ -1,38 +1,178 @@
-from sklearn.neighbors import NearestNeighbors
-from models.embedding_model import get_use_embedding, get_ada_embedding, EmbeddingModel
+import itertools
+import numpy as np
+from models.embedding_model import get_use_embedding, get_ada_embedding, get_local_embedding, EmbeddingModel
+from models.search_backends import make_backend
+from models.lexical_index import reciprocal_rank_fusion
+from models.reranker import rerank
+from config.settings import RETRIEVAL_MODE, HYBRID_CANDIDATES, RRF_K, RERANK_TOP_K
+from utils.metrics import stage
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 인덱스가 바뀔 때마다 새 버전을 부여 (답변 캐시 무효화에 사용)
+_versions = itertools.count(1)
+
 class SemanticSearch:
     def __init__(self, model: EmbeddingModel = EmbeddingModel.USE):
         self.model = model
         self.fitted = False
+        self.version = 0
         logger.info(f"SemanticSearch initialized with model: {model}")
 
     def fit(self, data, batch=1000, n_neighbors=5):
+        """
+        ChunkTable의 모든 조각 본문을 임베딩하여 인덱스를 구성합니다.
+        """
         logger.info("Fitting SemanticSearch model")
-        self.data = data
-        self.embeddings = self.get_text_embedding(data, batch=batch)
-        n_neighbors = min(n_neighbors, len(self.embeddings))
-        self.nn = NearestNeighbors(n_neighbors=n_neighbors)
-        self.nn.fit(self.embeddings)
-        self.fitted = True
+        embeddings = self.get_text_embedding(data.texts(), batch=batch)
+        self.load(data, embeddings, n_neighbors=n_neighbors)
         logger.info("SemanticSearch model fitted successfully")
 
-    def __call__(self, text, return_data=True):
+    def load(self, data, embeddings, n_neighbors=5, backend=None):
+        """
+        미리 계산된 임베딩(예: 디스크에서 memmap으로 읽은 행렬)으로 인덱스를 구성합니다.
+        data는 embeddings와 같은 순서의 ChunkTable이며, 이후 변경의 영향을 받지 않도록 스냅샷을 보관합니다.
+        검색 백엔드는 SEARCH_BACKEND 설정으로 선택되며, backend를 넘기면 이미 만들어진 것을 사용합니다.
+        """
+        self.data = data.snapshot()
+        self.embeddings = embeddings
+        self.n_neighbors = n_neighbors
+        self.version = next(_versions)
+        if len(self.embeddings) == 0:
+            self.fitted = False
+            return
+        if backend is None:
+            backend = make_backend()
+            backend.build(self.embeddings)
+        self.backend = backend
+        self.fitted = True
+
+    def add(self, data, embeddings):
+        """
+        새 조각의 임베딩을 기존 인덱스 뒤에 추가한 새 인스턴스를 반환합니다.
+        기존 조각은 다시 임베딩하지 않으며, 검색 중인 요청은 기존 인스턴스를 그대로 사용합니다.
+
+        Args:
+            data (ChunkTable): 새 조각까지 포함된 전체 조각 테이블
+            embeddings (np.ndarray): 새로 추가된 조각들의 임베딩
+        """
+        updated = SemanticSearch(model=self.model)
+        if not self.fitted:
+            updated.load(data, embeddings, n_neighbors=getattr(self, "n_neighbors", 5))
+        else:
+            combined = np.concatenate([self.embeddings, embeddings])
+            updated.load(data, combined, n_neighbors=self.n_neighbors,
+                         backend=self.backend.extended(combined, len(self.embeddings)))
+        return updated
+
+    def remove(self, keep, data):
+        """
+        keep 마스크가 False인 조각을 제외한 새 인스턴스를 반환합니다.
+
+        Args:
+            keep (np.ndarray): 남길 조각의 bool 마스크
+            data (ChunkTable): keep이 이미 적용된 조각 테이블
+        """
+        keep = np.asarray(keep, dtype=bool)
+        remaining = self.embeddings[keep]
+        updated = SemanticSearch(model=self.model)
+        updated.load(data, remaining, n_neighbors=self.n_neighbors,
+                     backend=self.backend.subset(remaining, keep) if len(remaining) else None)
+        return updated
+
+    def remap(self, embeddings):
+        """
+        인덱스를 디스크에 저장한 뒤, 메모리에 있던 임베딩 행렬 대신 같은 내용의 memmap을 쓰도록 바꿉니다.
+        원본 임베딩은 디스크 페이지로만 남으므로 EMBEDDING_STORAGE로 압축한 사본만 메모리를 차지합니다.
+        """
+        if embeddings is None or embeddings.shape != self.embeddings.shape:
+            return
+        self.embeddings = embeddings
+        self.backend.remap(embeddings)
+
+    def search(self, query_embeddings, k=None, file_ids=None):
+        """
+        질문 임베딩 행렬의 각 행에 대해 가장 가까운 조각 인덱스 배열을 반환합니다.
+
+        Args:
+            query_embeddings (np.ndarray): (질문 수, 차원) 질문 임베딩
+            k (int): 질문별 조각 수 (None이면 n_neighbors)
+            file_ids (iterable): 지정하면 해당 파일의 조각 중에서만 검색
+        """
+        rows = None if file_ids is None else self.data.mask(file_ids)
+        return self.backend.search(np.asarray(query_embeddings, dtype=np.float32), k or self.n_neighbors, rows)
+
+    def __call__(self, text, return_data=True, file_ids=None):
+        """
+        질문과 가장 가까운 조각을 찾습니다.
+
+        Args:
+            text (str): 질문
+            return_data (bool): True이면 Chunk(text, file_id, page) 리스트, False이면 조각 인덱스 배열을 반환
+            file_ids (iterable): 지정하면 해당 파일의 조각 중에서만 검색
+        """
         logger.info("Performing semantic search")
-        inp_emb = self.get_text_embedding([text])[0]
-        neighbors = self.nn.kneighbors([inp_emb], return_distance=False)[0]
+        neighbors = self.neighbors([text], file_ids=file_ids)[0][0]
 
         if return_data:
             return [self.data[i] for i in neighbors]
         else:
             return neighbors
 
+    def query(self, texts, file_ids=None, k=None, reranker=None, top_k=RERANK_TOP_K):
+        """
+        여러 질문을 한 번의 임베딩 호출과 한 번의 행렬 검색으로 처리합니다.
+
+        Args:
+            texts (list): 질문 목록
+            file_ids (iterable): 지정하면 해당 파일의 조각 중에서만 검색
+            k (int): 질문별 조각 수 (None이면 n_neighbors). reranker를 쓰면 재정렬할 후보 수
+            reranker (str): "mmr" 또는 "cross-encoder"이면 k개의 후보를 재정렬해 top_k개만 남김 (None/"none"이면 그대로)
+
+        Returns:
+            tuple: (질문별 Chunk(text, file_id, page) 리스트, 질문 임베딩 행렬)
+        """
+        logger.info(f"Performing semantic search for {len(texts)} questions")
+        texts = list(texts)
+        neighbors, inp_emb = self.neighbors(texts, file_ids=file_ids, k=k)
+        if reranker not in (None, "none"):
+            with stage("rerank"):
+                neighbors = [rerank(text, embedding, rows, self.embeddings, self.data, top_k, reranker)
+                             for text, embedding, rows in zip(texts, inp_emb, neighbors)]
+        return [[self.data[i] for i in rows] for rows in neighbors], inp_emb
+
+    def neighbors(self, texts, file_ids=None, mode=None, k=None):
+        """
+        질문별로 가까운 순서의 조각 인덱스 배열(최대 k개, 기본값 n_neighbors)과 질문 임베딩 행렬을 반환합니다.
+
+        mode(기본값 RETRIEVAL_MODE)가 "hybrid"이면 벡터 검색과 BM25에서 각각 HYBRID_CANDIDATES개씩 후보를 뽑아
+        reciprocal rank fusion으로 합치고, "dense"/"lexical"이면 한쪽 결과만 사용합니다.
+        """
+        # 질문 임베딩은 "embed" 단계로 따로 기록되므로 search에는 검색 자체의 시간만 남음
+        with stage("search"):
+            return self._neighbors(list(texts), file_ids, mode, k)
+
+    def _neighbors(self, texts, file_ids, mode, k):
+        mode = mode or RETRIEVAL_MODE
+        k = k or self.n_neighbors
+        inp_emb = self.get_text_embedding(texts)
+        rows = None if file_ids is None else self.data.mask(file_ids)
+        if mode == "dense":
+            return self.backend.search(inp_emb, k, rows), inp_emb
+
+        candidates = max(k, HYBRID_CANDIDATES)
+        lexical = [self.data.lexical.search(text, candidates, rows) for text in texts]
+        if mode == "lexical":
+            return [ranked[:k] for ranked in lexical], inp_emb
+        dense = self.backend.search(inp_emb, candidates, rows)
+        return [reciprocal_rank_fusion([d, l], k, RRF_K) for d, l in zip(dense, lexical)], inp_emb
+
     def get_text_embedding(self, texts, batch=1000):
         logger.info(f"Getting text embeddings using {self.model} model")
         if self.model == EmbeddingModel.USE:
             return get_use_embedding(texts, batch)
         elif self.model == EmbeddingModel.ADA:
-            return get_ada_embedding(texts, batch)
+            return get_ada_embedding(texts)
+        elif self.model == EmbeddingModel.LOCAL:
+            return get_local_embedding(texts, batch)
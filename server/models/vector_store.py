@@ -0,0 +1,383 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+from config.settings import INDEX_DIR, SNAPSHOT_KEEP, SNAPSHOT_POLL_SECONDS, SEARCH_BACKEND
+from config.state import DEFAULT_COLLECTION, get_collection, valid_collection_name
+from models.chunk_table import ChunkTable
+from models.lexical_index import LexicalIndex
+from models.embedding_model import EmbeddingModel
+from models.semantic_search import SemanticSearch
+from models.search_backends import make_backend
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+SNAPSHOT_DIR = "snapshots"
+CURRENT_FILE = "CURRENT"
+CHUNK_COLUMNS = ("buffer", "offsets", "file_ids", "pages")
+LEXICAL_COLUMNS = ("term_ids", "doc_ids", "tfs", "doc_len")
+
+class VectorStore:
+    """
+    컬렉션 하나의 업로드된 파일 목록, 텍스트 조각 테이블과 모델별 임베딩 행렬을 디스크에 저장합니다.
+
+    임베딩은 모델별로 연속된 float32 행렬(.npy)로 저장되며, 로드할 때는 numpy.memmap으로
+    매핑되므로 재시작 시간이 코퍼스 크기에 좌우되지 않고 여러 uvicorn 워커가 같은 페이지를 공유합니다.
+    근사 검색 백엔드(ivfpq, hnsw)의 학습된 구조도 ann_<모델>_* 파일로 함께 저장해 로드할 때 다시 만들지 않습니다.
+    """
+
+    def __init__(self, directory=INDEX_DIR):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _embedding_path(self, model):
+        return self._path(f"embeddings_{EmbeddingModel(model).value}.npy")
+
+    def _backend_prefix(self, model):
+        return f"ann_{EmbeddingModel(model).value}_"
+
+    def _atomic_write(self, path, write):
+        # 임시 파일에 쓴 뒤 교체하여 읽는 쪽이 반쯤 쓰인 파일을 보지 않도록 함
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+
+    def save_manifest(self, manifest):
+        self._atomic_write(
+            self._path(MANIFEST_FILE),
+            lambda f: f.write(json.dumps(manifest, ensure_ascii=False).encode("utf-8")),
+        )
+
+    def load_manifest(self):
+        path = self._path(MANIFEST_FILE)
+        manifest = {"uploaded_files": [], "upload_hashes": {}, "indexed_files": {}, "models": {}}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                manifest.update(json.load(f))
+        return manifest
+
+    def save_chunks(self, table):
+        for column in CHUNK_COLUMNS:
+            self._atomic_write(self._path(f"chunks_{column}.npy"), lambda f: np.save(f, getattr(table, column)))
+        # BM25 역색인: 단어 사전은 줄바꿈으로 이은 UTF-8 버퍼로, 포스팅은 열별 .npy로 저장
+        lexical = table.lexical
+        vocab = np.frombuffer("\n".join(lexical.terms).encode("utf-8"), dtype=np.uint8)
+        self._atomic_write(self._path("lexical_vocab.npy"), lambda f: np.save(f, vocab))
+        for column in LEXICAL_COLUMNS:
+            self._atomic_write(self._path(f"lexical_{column}.npy"), lambda f: np.save(f, getattr(lexical, column)))
+
+    def load_chunks(self):
+        """
+        저장된 조각 테이블을 memmap으로 로드합니다. 저장된 테이블이 없으면 None을 반환합니다.
+        """
+        paths = [self._path(f"chunks_{column}.npy") for column in CHUNK_COLUMNS]
+        if not all(os.path.exists(path) for path in paths):
+            return None
+        table = ChunkTable(*[np.load(path, mmap_mode="r") for path in paths])
+        table.lexical = self._load_lexical(len(table))
+        if table.lexical is None:
+            logger.info(f"Building the BM25 index for {len(table)} stored chunks")
+            table.lexical = LexicalIndex().extended(table.texts())
+        return table
+
+    def _load_lexical(self, size):
+        paths = [self._path(f"lexical_{column}.npy") for column in ("vocab",) + LEXICAL_COLUMNS]
+        if not all(os.path.exists(path) for path in paths):
+            return None
+        vocab, *columns = [np.load(path, mmap_mode="r") for path in paths]
+        terms = bytes(vocab).decode("utf-8").split("\n") if len(vocab) else []
+        lexical = LexicalIndex({term: i for i, term in enumerate(terms)}, terms, *columns)
+        return lexical if len(lexical) == size else None
+
+    def save_embeddings(self, model, embeddings):
+        matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+        self._atomic_write(self._embedding_path(model), lambda f: np.save(f, matrix))
+        logger.info(f"Saved {matrix.shape[0]} {model} embeddings to {self.directory}")
+        return {"count": int(matrix.shape[0]), "dim": int(matrix.shape[1])}
+
+    def load_embeddings(self, model):
+        path = self._embedding_path(model)
+        if not os.path.exists(path):
+            return None
+        return np.load(path, mmap_mode="r")
+
+    def save_backend(self, model, backend):
+        """
+        검색 백엔드의 학습된 구조를 저장하고 백엔드 이름을 반환합니다. 저장할 것이 없으면 None을 반환합니다.
+        """
+        if not backend.save(self._path(self._backend_prefix(model))):
+            return None
+        logger.info(f"Saved the {backend.name} index of {model} embeddings to {self.directory}")
+        return backend.name
+
+    def load_backend(self, model, name, embeddings):
+        """
+        저장된 검색 백엔드를 embeddings로 복원합니다. 저장된 것이 없거나 SEARCH_BACKEND와 다르면 None을 반환합니다
+        (그러면 SemanticSearch.load가 새로 만듦).
+        """
+        if name is None or name != SEARCH_BACKEND:
+            return None
+        try:
+            backend = make_backend(name)
+            if backend.load(embeddings, self._path(self._backend_prefix(model))):
+                return backend
+        except Exception as e:
+            logger.warning(f"Could not load the stored {name} index of {model} embeddings: {str(e)}")
+        return None
+
+    def link_model(self, model, target):
+        """
+        이 저장소의 model 임베딩과 검색 백엔드 파일을 target 저장소에 하드 링크합니다 (같은 내용을 다시 쓰지 않음).
+        링크할 수 없는 파일 시스템이면 복사합니다. 임베딩 파일이 없으면 False를 반환합니다.
+        """
+        if not os.path.exists(self._embedding_path(model)):
+            return False
+        prefix = self._backend_prefix(model)
+        names = [os.path.basename(self._embedding_path(model))]
+        names += [name for name in os.listdir(self.directory) if name.startswith(prefix)]
+        for name in names:
+            try:
+                os.link(self._path(name), target._path(name))
+            except OSError:
+                shutil.copyfile(self._path(name), target._path(name))
+        return True
+
+    def remove_index_files(self):
+        # 스냅샷 형식으로 옮긴 뒤 남은 이전 형식의 인덱스 파일 정리 (매핑 중인 파일은 매핑이 해제될 때까지 유지됨)
+        for name in os.listdir(self.directory):
+            if name.endswith(".npy") and name.startswith(("chunks_", "lexical_", "embeddings_", "ann_")):
+                os.remove(self._path(name))
+
+class SnapshotStore:
+    """
+    컬렉션 인덱스의 버전별 스냅샷을 관리합니다.
+
+    스냅샷마다 index_dir/snapshots/<버전>/ 에 조각 테이블, BM25 색인, 모델별 임베딩과 검색 백엔드, manifest.json(인덱싱된 파일,
+    모델)을 모두 쓴 뒤 index_dir/CURRENT를 원자적으로 바꿔 공개합니다. 한 번 쓴 스냅샷은 바뀌지 않으므로
+    여러 프로세스가 같은 파일을 읽기 전용 memmap으로 공유하고, 읽는 쪽은 반쯤 쓰인 인덱스를 보지 않습니다.
+    자주 바뀌는 업로드 목록은 스냅샷 밖의 index_dir/manifest.json에 저장합니다.
+    CURRENT가 없으면 index_dir에 바로 저장하던 이전 형식으로 읽습니다.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.uploads = VectorStore(directory)
+
+    def current(self):
+        try:
+            with open(os.path.join(self.directory, CURRENT_FILE), "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def versions(self):
+        root = os.path.join(self.directory, SNAPSHOT_DIR)
+        if not os.path.isdir(root):
+            return []
+        return sorted(name for name in os.listdir(root) if name.isdigit())
+
+    def open(self, version=None):
+        """
+        version(없으면 이전 형식) 스냅샷의 VectorStore를 반환합니다. 정리되어 없으면 FileNotFoundError.
+        """
+        if version is None:
+            return self.uploads
+        directory = os.path.join(self.directory, SNAPSHOT_DIR, version)
+        if not os.path.isdir(directory):
+            raise FileNotFoundError(f"Snapshot {version} of {self.directory} no longer exists")
+        return VectorStore(directory)
+
+    def create(self):
+        """
+        다음 버전의 빈 스냅샷 디렉토리를 만들고 (버전, VectorStore)를 반환합니다.
+        """
+        root = os.path.join(self.directory, SNAPSHOT_DIR)
+        os.makedirs(root, exist_ok=True)
+        versions = self.versions()
+        number = int(versions[-1]) + 1 if versions else 1
+        while True:
+            version = f"{number:010d}"
+            try:
+                os.mkdir(os.path.join(root, version))
+                return version, VectorStore(os.path.join(root, version))
+            except FileExistsError:
+                number += 1
+
+    def publish(self, version, keep=SNAPSHOT_KEEP):
+        """
+        CURRENT가 version을 가리키도록 바꾸고 최근 keep개를 제외한 이전 스냅샷을 지웁니다.
+        지운 스냅샷을 아직 매핑하고 있는 워커는 매핑을 해제할 때까지 그대로 읽을 수 있습니다.
+        """
+        legacy = self.current() is None
+        self.uploads._atomic_write(os.path.join(self.directory, CURRENT_FILE), lambda f: f.write(version.encode("utf-8")))
+        if legacy:
+            self.uploads.remove_index_files()
+        for old in self.versions()[:-max(1, keep)]:
+            if old != version:
+                shutil.rmtree(os.path.join(self.directory, SNAPSHOT_DIR, old), ignore_errors=True)
+
+_stores = {}
+
+def get_store(collection):
+    store = _stores.get(collection.index_dir)
+    if store is None:
+        store = _stores[collection.index_dir] = SnapshotStore(collection.index_dir)
+    return store
+
+def persist_state(collection, models=()):
+    """
+    컬렉션의 현재 인덱스를 새 버전의 스냅샷으로 저장하고 공개합니다.
+
+    models에 포함된 모델(또는 이전 스냅샷에 없는 모델)의 임베딩은 새로 쓰고, 나머지는 이전 스냅샷의 파일을
+    하드 링크합니다. indexes에 남아 있지 않은(무효화된) 모델은 새 스냅샷에 포함되지 않습니다.
+    """
+    snapshots = get_store(collection)
+    indexes = collection.indexes
+    with collection.ingest_lock:
+        previous = snapshots.open(snapshots.current())
+        stored_models = previous.load_manifest()["models"]
+        version, store = snapshots.create()
+        saved = {}
+        for model in EmbeddingModel:
+            index = indexes.get(model)
+            if index is None or not index.fitted:
+                continue
+            if model in models or model.value not in stored_models or not previous.link_model(model, store):
+                saved[model.value] = store.save_embeddings(model, index.embeddings)
+                backend = store.save_backend(model, index.backend)
+            else:
+                saved[model.value] = dict(stored_models[model.value])
+                # 검색 백엔드를 저장하기 전에 만든 스냅샷이면 이번에 함께 저장
+                backend = saved[model.value].get("backend") or store.save_backend(model, index.backend)
+            if backend is not None:
+                saved[model.value]["backend"] = backend
+            else:
+                saved[model.value].pop("backend", None)
+            # 이전 스냅샷은 곧 정리될 수 있으므로 새 스냅샷의 파일을 매핑
+            index.remap(store.load_embeddings(model))
+        store.save_chunks(collection.chunk_table)
+        store.save_manifest({"version": version, "indexed_files": dict(collection.indexed_files), "models": saved})
+        snapshots.publish(version)
+        # 공개한 뒤에는 업로드 매니페스트에 남아 있던 이전 형식의 인덱스 정보가 필요 없음
+        persist_uploads(collection, legacy=False)
+        collection.snapshot = version
+        logger.info(f"Published snapshot {version} of collection '{collection.name}'")
+
+def persist_uploads(collection, legacy=None):
+    # 업로드는 인제스트 중에도 일어나므로 인제스트 잠금 대신 짧은 잠금으로 매니페스트 갱신을 직렬화
+    snapshots = get_store(collection)
+    legacy = snapshots.current() is None if legacy is None else legacy
+    with collection.lock:
+        # 아직 스냅샷이 없으면 같은 파일에 있는 이전 형식의 인덱스 정보(indexed_files, models)를 보존
+        manifest = snapshots.uploads.load_manifest() if legacy else {}
+        manifest.update(uploaded_files=list(collection.uploaded_files), upload_hashes=dict(collection.upload_hashes))
+        snapshots.uploads.save_manifest(manifest)
+
+def _collection_names():
+    names = [DEFAULT_COLLECTION]
+    directory = os.path.join(INDEX_DIR, "collections")
+    if os.path.isdir(directory):
+        names += [name for name in sorted(os.listdir(directory))
+                  if valid_collection_name(name) and name != DEFAULT_COLLECTION]
+    return names
+
+def restore_state():
+    """
+    서버 시작 시 기본 컬렉션과 INDEX_DIR/collections 아래에 저장된 컬렉션들을 복원합니다.
+    """
+    for name in _collection_names():
+        restore_collection(get_collection(name, create=True))
+
+def _load_snapshot(collection, store):
+    """
+    스냅샷 하나를 새 객체들로 읽어 (조각 테이블, 인덱싱된 파일, 모델별 인덱스)를 반환합니다.
+    조각 테이블, 임베딩과 저장된 검색 백엔드는 memmap으로 로드하므로 다시 계산하지 않습니다.
+    """
+    manifest = store.load_manifest()
+    chunk_table, indexed_files, indexes = ChunkTable(), dict(manifest["indexed_files"]), {}
+    stored = store.load_chunks()
+    if stored is None or "chunks" in manifest:
+        # 조각 테이블이 없거나 문자열 조각을 저장하던 이전 형식 - 다음 임베딩 때 전체를 다시 인덱싱
+        if indexed_files:
+            logger.warning(f"Stored index of collection '{collection.name}' has no chunk table, files will be re-indexed")
+        return chunk_table, {}, indexes
+    chunk_table.assign(stored)
+
+    for name, info in manifest["models"].items():
+        embeddings = store.load_embeddings(name)
+        if embeddings is None or embeddings.shape[0] != len(chunk_table):
+            logger.warning(f"Stored {name} embeddings do not match the stored chunks, skipping")
+            continue
+        model = EmbeddingModel(name)
+        recommender = SemanticSearch(model=model)
+        # 저장된 근사 검색 구조가 있으면 k-means/그래프를 다시 만들지 않고 그대로 매핑
+        recommender.load(chunk_table, embeddings, backend=store.load_backend(model, info.get("backend"), embeddings))
+        indexes[model] = recommender
+    return chunk_table, indexed_files, indexes
+
+def _load_uploads(collection, snapshots):
+    manifest = snapshots.uploads.load_manifest()
+    with collection.lock:
+        collection.uploaded_files[:] = [path for path in manifest["uploaded_files"] if os.path.exists(path)]
+        uploaded = set(collection.uploaded_files)
+        collection.upload_hashes = {path: info for path, info in manifest["upload_hashes"].items() if path in uploaded}
+
+def _swap(collection, version, chunk_table, indexed_files, indexes):
+    # 속성을 새 객체로 바꿔 끼우므로, 진행 중인 검색은 이전 인덱스(와 그 조각 테이블 스냅샷)로 끝까지 실행됨
+    with collection.lock:
+        collection.indexes = indexes
+        collection.indexed_files = indexed_files
+        collection.chunk_table = chunk_table
+        collection.snapshot = version
+
+def restore_collection(collection):
+    """
+    디스크에 저장된 컬렉션 상태(업로드 목록과 최신 스냅샷)를 복원합니다.
+    """
+    snapshots = get_store(collection)
+    _load_uploads(collection, snapshots)
+    version = snapshots.current()
+    _swap(collection, version, *_load_snapshot(collection, snapshots.open(version)))
+    logger.info(f"Restored collection '{collection.name}' (snapshot {version}): {len(collection.uploaded_files)} files, "
+                f"{len(collection.chunk_table)} chunks and indexes for {[m.value for m in collection.indexes]}")
+
+def refresh_collection(collection):
+    """
+    인제스트 프로세스가 새 스냅샷을 공개했으면 읽어서 바꿔 끼웁니다. 바꿨으면 True를 반환합니다.
+    """
+    snapshots = get_store(collection)
+    version = snapshots.current()
+    if version is None or version == collection.snapshot:
+        return False
+    loaded = _load_snapshot(collection, snapshots.open(version))
+    _load_uploads(collection, snapshots)
+    _swap(collection, version, *loaded)
+    logger.info(f"Switched collection '{collection.name}' to snapshot {version} ({len(collection.chunk_table)} chunks)")
+    return True
+
+def watch_snapshots(interval=SNAPSHOT_POLL_SECONDS):
+    """
+    읽기 전용 서빙 워커(SERVER_ROLE=serve)에서 interval초마다 컬렉션별 최신 스냅샷을 확인하는 백그라운드 스레드를 시작합니다.
+    인제스트 프로세스가 새로 만든 컬렉션도 찾아서 불러옵니다.
+    """
+    def watch():
+        while True:
+            time.sleep(interval)
+            for name in _collection_names():
+                try:
+                    refresh_collection(get_collection(name, create=True))
+                except Exception as e:
+                    # 읽는 중에 스냅샷이 정리된 경우 등 - 다음 확인 때 최신 버전으로 다시 시도
+                    logger.warning(f"Could not load the latest snapshot of collection '{name}': {str(e)}")
+
+    threading.Thread(target=watch, name="snapshot-watcher", daemon=True).start()
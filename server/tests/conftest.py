@@ -0,0 +1,6 @@
+import os
+import sys
+
+# 테스트는 server 디렉토리를 기준으로 모듈을 임포트함 (config.settings 임포트에 키가 필요하지만 API는 호출하지 않음)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "test")
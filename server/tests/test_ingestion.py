@@ -0,0 +1,70 @@
+import zlib
+
+import fitz
+import numpy as np
+import pytest
+
+from config.state import Collection
+from models.embedding_model import EmbeddingModel
+from models.semantic_search import SemanticSearch
+from utils.ingestion import sync_index
+
+def _encode(self, texts, batch=1000):
+    # 단어 해시로 만드는 결정적 임베딩 (모델/네트워크 없이 인덱싱 흐름만 확인)
+    vectors = np.zeros((len(texts), 64), dtype=np.float32)
+    for i, text in enumerate(texts):
+        for word in text.split():
+            vectors[i, zlib.crc32(word.encode("utf-8")) % 64] += 1
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+def _write_pdf(path, text):
+    document = fitz.open()
+    document.new_page().insert_text((72, 72), text)
+    document.save(str(path))
+    document.close()
+
+@pytest.fixture(autouse=True)
+def stub_embedding(monkeypatch):
+    monkeypatch.setattr(SemanticSearch, "get_text_embedding", _encode)
+
+def test_failed_file_is_not_marked_indexed(tmp_path):
+    good, bad = tmp_path / "a.pdf", tmp_path / "bad.pdf"
+    _write_pdf(good, "alpha beta gamma delta")
+    bad.write_bytes(b"not a pdf")
+    collection = Collection("test")
+    collection.add_upload(str(good))
+    collection.add_upload(str(bad))
+
+    result = sync_index(collection, EmbeddingModel.ADA)
+    assert result["added"] == [str(good)]
+    assert result["failed"] == [str(bad)]
+    assert list(collection.indexed_files) == [str(good)]
+    assert len(collection.chunk_table) == result["total_chunks"] > 0
+
+    # 실패한 파일을 지운 뒤 다시 동기화해도 이미 인덱싱된 파일의 조각은 그대로 남음
+    bad.unlink()
+    result = sync_index(collection, EmbeddingModel.ADA)
+    assert result["added"] == [] and result["failed"] == []
+    assert len(collection.chunk_table) > 0
+    assert collection.indexes[EmbeddingModel.ADA].fitted
+
+def test_embedding_failure_leaves_state_unchanged(tmp_path, monkeypatch):
+    path = tmp_path / "a.pdf"
+    _write_pdf(path, "alpha beta gamma delta")
+    collection = Collection("test")
+    collection.add_upload(str(path))
+
+    def fail(self, texts, batch=1000):
+        raise RuntimeError("embedding service unavailable")
+
+    monkeypatch.setattr(SemanticSearch, "get_text_embedding", fail)
+    with pytest.raises(RuntimeError):
+        sync_index(collection, EmbeddingModel.ADA)
+    assert collection.indexed_files == {}
+    assert len(collection.chunk_table) == 0
+
+    # 임베딩이 다시 되면 같은 파일을 다시 시도해 인덱싱함
+    monkeypatch.setattr(SemanticSearch, "get_text_embedding", _encode)
+    result = sync_index(collection, EmbeddingModel.ADA)
+    assert result["added"] == [str(path)]
+    assert len(collection.chunk_table) > 0
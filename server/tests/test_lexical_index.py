@@ -0,0 +1,14 @@
+from collections import Counter
+
+from models.lexical_index import tokenize
+
+def test_ascii_fast_path_matches_unicode_path():
+    # 같은 ASCII 텍스트는 다른 곳에 ASCII가 아닌 문자가 있어도 같은 토큰이 되어야 함
+    for text in ["server_x ERR-404 v1.2.3", "__init__ foo__bar a:b", "Server_X path/to/file.pdf"]:
+        unicode_tokens = Counter(tokenize(text + " é"))
+        unicode_tokens["é"] -= 1
+        assert Counter(tokenize(text)) == +unicode_tokens
+
+def test_compounds_are_kept_with_their_parts():
+    assert sorted(tokenize("server_x")) == ["server", "server_x", "x"]
+    assert sorted(tokenize("서버 server_x")) == sorted(tokenize("server_x") + ["서버"])
@@ -0,0 +1,8 @@
+from api.metrics import _state_metrics
+from models.answer_cache import answer_cache
+
+def test_answer_cache_seconds_saved_is_exported(monkeypatch):
+    monkeypatch.setattr(answer_cache, "seconds_saved", 12.5)
+    lines = _state_metrics().splitlines()
+    assert "# TYPE pdfgpt_answer_cache_seconds_saved_total counter" in lines
+    assert "pdfgpt_answer_cache_seconds_saved_total 12.5" in lines
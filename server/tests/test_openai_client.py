@@ -0,0 +1,130 @@
+import asyncio
+import functools
+import time
+
+import numpy as np
+import pytest
+
+from benchmarks.mock_openai import MockOpenAIServer, expected_embedding
+from utils import openai_client
+from utils.openai_client import OpenAIClient, RateLimiter, pack_batches, parse_duration, retry_after
+
+MODEL = "text-embedding-ada-002"
+DIM = 16
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    # 실패한 요청을 짧게 기다렸다가 다시 보내도록 함 (기본 0.5초부터 두 배씩)
+    monkeypatch.setattr(openai_client, "BACKOFF_BASE", 0.01)
+
+@pytest.fixture
+def small_batches(monkeypatch):
+    # 작은 입력으로도 여러 요청으로 나뉘도록 배치 한도를 줄임
+    monkeypatch.setattr(openai_client, "pack_batches", functools.partial(pack_batches, max_tokens=1000, max_items=4))
+
+def _texts(count):
+    return [f"text {i} " + "word " * (i % 7) for i in range(count)]
+
+def _expected(texts):
+    return np.vstack([expected_embedding(text, DIM) for text in texts])
+
+def _client(server, **kwargs):
+    return OpenAIClient(api_key="test", base_url=server.base_url, **kwargs)
+
+def test_pack_batches_respects_token_and_item_limits():
+    texts = ["a" * 40] * 10  # 텍스트당 근사 10토큰
+    batches = pack_batches(texts, max_tokens=35, max_items=100)
+    assert [len(batch) for _, batch, _ in batches] == [3, 3, 3, 1]
+    assert all(tokens <= 35 for _, _, tokens in batches)
+    assert [start for start, _, _ in batches] == [0, 3, 6, 9]
+
+    batches = pack_batches(texts, max_tokens=1000, max_items=4)
+    assert [len(batch) for _, batch, _ in batches] == [4, 4, 2]
+    assert [text for _, batch, _ in batches for text in batch] == texts
+
+    # 한도보다 큰 텍스트 하나는 따로 한 요청으로 보냄
+    batches = pack_batches(["a" * 400, "b"], max_tokens=35, max_items=100)
+    assert [batch for _, batch, _ in batches] == [["a" * 400], ["b"]]
+    assert pack_batches([]) == []
+
+def test_embeddings_keep_input_order_across_batches(small_batches):
+    # 모의 서버는 배치 안의 순서를 뒤집어 보내고, 배치들은 동시에 끝나는 순서가 제각각임
+    texts = _texts(37)
+    with MockOpenAIServer(latency=0.01, dim=DIM) as server:
+        client = _client(server)
+        embeddings = client.embed(texts, MODEL)
+        assert server.stats["requests"] == 10
+    np.testing.assert_allclose(embeddings, _expected(texts), atol=1e-6)
+
+def test_server_errors_are_retried(small_batches):
+    texts = _texts(40)
+    with MockOpenAIServer(latency=0.0, failure_rate=0.3, dim=DIM, seed=1) as server:
+        client = _client(server, max_retries=10)
+        embeddings = client.embed(texts, MODEL)
+        assert server.stats["failed"] > 0
+        assert client.stats["retries"] == server.stats["failed"]
+    np.testing.assert_allclose(embeddings, _expected(texts), atol=1e-6)
+
+def test_server_errors_are_raised_after_max_retries():
+    with MockOpenAIServer(latency=0.0, failure_rate=1.0, dim=DIM) as server:
+        client = _client(server, max_retries=2)
+        with pytest.raises(openai_client.openai.InternalServerError):
+            client.embed(["text"], MODEL)
+        assert server.stats["requests"] == 3
+        assert client.stats["errors"] == 1
+
+def test_rate_limited_requests_wait_for_retry_after(small_batches):
+    # 처음 동시에 나가는 요청들은 한도(0.5초에 2개)를 넘으므로 429와 retry-after-ms를 받음
+    texts = _texts(24)
+    with MockOpenAIServer(latency=0.0, rpm=2, window=0.5, dim=DIM) as server:
+        client = _client(server)
+        started = time.monotonic()
+        embeddings = client.embed(texts, MODEL)
+        elapsed = time.monotonic() - started
+        assert server.stats["rate_limited"] > 0
+        assert client.stats["rate_limited"] == server.stats["rate_limited"]
+    np.testing.assert_allclose(embeddings, _expected(texts), atol=1e-6)
+    # 6개 요청 중 처음 2개를 뺀 4개는 0.25초마다 하나씩만 허용됨
+    assert elapsed >= 0.9
+
+def test_retry_after_headers():
+    assert retry_after({"retry-after-ms": "250"}) == 0.25
+    assert retry_after({"retry-after": "2"}) == 2.0
+    assert retry_after({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}) is None
+    assert retry_after({}) is None
+    assert parse_duration("6m0s") == 360.0
+    assert parse_duration("20ms") == 0.02
+    assert parse_duration("1.5s") == 1.5
+
+def test_rate_limit_headers_pace_requests():
+    limiter = RateLimiter()
+    assert asyncio.run(_timed_acquire(limiter, 100)) < 0.05  # 헤더를 받기 전에는 기다리지 않음
+
+    # 남은 요청이 없고 1초 뒤에 10개가 모두 다시 차면 요청 하나는 약 0.1초 뒤에 보낼 수 있음
+    limiter.update({"x-ratelimit-limit-requests": "10", "x-ratelimit-remaining-requests": "0",
+                    "x-ratelimit-reset-requests": "1s"})
+    assert 0.08 <= asyncio.run(_timed_acquire(limiter, 100)) < 0.3
+
+    # 토큰 한도도 같은 방식: 1,000토큰이 0.5초에 다시 차므로 200토큰을 쓰려면 약 0.1초를 기다림
+    limiter = RateLimiter()
+    limiter.update({"x-ratelimit-limit-tokens": "1000", "x-ratelimit-remaining-tokens": "0",
+                    "x-ratelimit-reset-tokens": "500ms"})
+    assert 0.08 <= asyncio.run(_timed_acquire(limiter, 200)) < 0.3
+
+def test_client_paces_itself_from_headers(small_batches):
+    # 한도를 헤더로 알게 된 뒤에는 429를 받지 않도록 스스로 요청 간격을 벌림
+    with MockOpenAIServer(latency=0.0, rpm=4, window=0.4, dim=DIM) as server:
+        client = _client(server)
+        client.embed(_texts(1), MODEL)
+        started = time.monotonic()
+        texts = _texts(32)
+        embeddings = client.embed(texts, MODEL)
+        elapsed = time.monotonic() - started
+        assert server.stats["rate_limited"] == 0
+    np.testing.assert_allclose(embeddings, _expected(texts), atol=1e-6)
+    assert elapsed >= 0.3
+
+async def _timed_acquire(limiter, tokens):
+    started = time.monotonic()
+    await limiter.acquire(tokens)
+    return time.monotonic() - started
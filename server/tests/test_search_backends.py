@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from models.search_backends import ExactDotBackend, IVFPQBackend
+
+def _clustered(n, d, clusters, seed):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, d)).astype(np.float32)
+    labels = rng.integers(clusters, size=n)
+    return (centers[labels] + 0.3 * rng.standard_normal((n, d))).astype(np.float32)
+
+@pytest.fixture(scope="module")
+def backends():
+    embeddings = _clustered(6000, 32, 40, 0)
+    exact = ExactDotBackend("float32")
+    exact.build(embeddings)
+    ivfpq = IVFPQBackend(nlist=60, nprobe=2, m=8, refine=10, min_size=1000)
+    ivfpq.build(embeddings)
+    assert ivfpq.trained
+    return embeddings, exact, ivfpq
+
+def _recall(found, expected):
+    return np.mean([len(set(f) & set(e)) / len(e) for f, e in zip(found, expected)])
+
+def test_filtered_search_returns_full_results(backends):
+    embeddings, exact, ivfpq = backends
+    rng = np.random.default_rng(1)
+    queries = _clustered(50, 32, 40, 2)
+    # 작은 파일 필터(선택적)와, 질문과 먼 클러스터에만 있는 큰 필터(프로브한 클러스터에 후보가 거의 없음)
+    selective = np.zeros(len(embeddings), dtype=bool)
+    selective[rng.choice(len(embeddings), 100, replace=False)] = True
+    far = np.isin(ivfpq.assign, np.argsort(-(queries.mean(axis=0) @ ivfpq.centroids.T))[-15:])
+    for rows in (selective, far):
+        found = ivfpq.search(queries, 5, rows)
+        assert all(len(result) == 5 and rows[result].all() for result in found)
+        assert _recall(found, exact.search(queries, 5, rows)) >= 0.9
+
+def test_unfiltered_recall(backends):
+    embeddings, exact, ivfpq = backends
+    queries = _clustered(50, 32, 40, 3)
+    assert _recall(ivfpq.search(queries, 5), exact.search(queries, 5)) >= 0.8
+
+def test_hnsw_extended_and_subset_match_exact(backends):
+    pytest.importorskip("hnswlib")
+    from models.search_backends import HNSWBackend
+
+    embeddings, _, _ = backends
+    hnsw = HNSWBackend()
+    hnsw.build(embeddings[:4000])
+    graph = hnsw.index
+    # 조각 추가는 기존 그래프를 다시 만들지 않고 새 조각만 삽입하며, 기존 백엔드는 그대로 남음
+    extended = hnsw.extended(embeddings, 4000)
+    assert hnsw.index is graph and hnsw.index.get_current_count() == 4000
+    keep = np.ones(len(embeddings), dtype=bool)
+    keep[::3] = False
+    subset = extended.subset(embeddings[keep], keep)
+
+    queries = _clustered(50, 32, 40, 4)
+    for backend, vectors in ((extended, embeddings), (subset, embeddings[keep])):
+        exact = ExactDotBackend("float32")
+        exact.build(vectors)
+        assert _recall(backend.search(queries, 5), exact.search(queries, 5)) >= 0.95
+        rows = np.zeros(len(vectors), dtype=bool)
+        rows[len(vectors) // 2:] = True
+        found = backend.search(queries, 5, rows)
+        assert all(len(result) == 5 and rows[result].all() for result in found)
+        assert _recall(found, exact.search(queries, 5, rows)) >= 0.95
@@ -0,0 +1,22 @@
+import pytest
+
+from benchmarks.bench_chunking import make_corpus, reference_text_to_chunks
+from utils.text_processing import iter_chunks, preprocess, text_to_chunks
+
+def test_newlines_and_tabs_separate_words():
+    # fitz 페이지 텍스트처럼 줄 끝에 공백이 없어도 줄바꿈마다 단어가 나뉨
+    pages = ["one two\nthree\tfour\r\nfive", "six\n\nseven"]
+    chunks = list(iter_chunks(pages, word_length=2))
+    assert [(page, preprocess(text)) for page, text in chunks] == [
+        (1, "one two"), (1, "three four"), (2, "five six"), (2, "seven")]
+
+@pytest.mark.parametrize("word_length", [5, 150])
+def test_matches_reference_word_chunks(word_length):
+    corpus = make_corpus(300, seed=1) + ["tiny page"] * 20 + ["", "  \n "]
+    chunks = text_to_chunks(list(corpus), "Ref1", word_length=word_length)
+    assert [preprocess(chunk) for chunk in chunks] == reference_text_to_chunks(list(corpus), "Ref1", word_length)
+
+def test_overlap_repeats_words_across_whitespace():
+    pages = ["a\nb\nc\nd\ne\nf\ng"]
+    chunks = [preprocess(text).split() for _, text in iter_chunks(pages, word_length=3, overlap=1)]
+    assert chunks == [["a", "b", "c"], ["c", "d", "e"], ["e", "f", "g"]]
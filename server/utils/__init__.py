@@ -1,2 +1,2 @@
-from .pdf_processing import pdf_to_text, download_pdf
-from .text_processing import preprocess, text_to_chunks
+from .pdf_processing import pdf_to_text, iter_pdf_pages, iter_download
+from .text_processing import preprocess, text_to_chunks, iter_chunks, format_reference
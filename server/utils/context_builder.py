@@ -0,0 +1,158 @@
+import hashlib
+import logging
+import os
+import tempfile
+
+from config.settings import CONTEXT_TOKEN_BUDGET, CONTEXT_DEDUP_THRESHOLD, CONTEXT_MIN_TRIM_TOKENS, CHUNK_OVERLAP
+from utils.openai_client import estimate_tokens
+from utils.text_processing import format_reference
+
+logger = logging.getLogger(__name__)
+
+# gpt-3.5-turbo의 토크나이저 파일. tiktoken은 이 URL의 sha1을 파일 이름으로 TIKTOKEN_CACHE_DIR에 캐시함
+_ENCODING_URL = "https://openaipublic.blob.core.windows.net/encodings/cl100k_base.tiktoken"
+
+_encoding = None
+
+def _encoding_cached():
+    # tiktoken.load.read_file_cached와 같은 순서로 캐시 디렉토리를 고름
+    cache_dir = os.environ.get("TIKTOKEN_CACHE_DIR",
+                               os.environ.get("DATA_GYM_CACHE_DIR", os.path.join(tempfile.gettempdir(), "data-gym-cache")))
+    return bool(cache_dir) and os.path.exists(os.path.join(cache_dir, hashlib.sha1(_ENCODING_URL.encode()).hexdigest()))
+
+def load_encoding():
+    """
+    서버 시작 시 gpt-3.5-turbo의 토크나이저(cl100k_base)를 로컬 캐시(TIKTOKEN_CACHE_DIR)에서 불러옵니다.
+    tiktoken이 없거나 캐시에 인코딩 파일이 없으면 내려받지 않고 근사 토큰 수를 사용합니다.
+    """
+    global _encoding
+    if _encoding is not None:
+        return _encoding
+    try:
+        import tiktoken
+        if not _encoding_cached():
+            raise FileNotFoundError("cl100k_base is not in TIKTOKEN_CACHE_DIR")
+        _encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
+        logger.info("Loaded cl100k_base token encoding")
+    except Exception as e:
+        logger.warning(f"tiktoken unavailable ({e}), approximating token counts from UTF-8 length")
+        _encoding = False
+    return _encoding
+
+def count_tokens(text):
+    # 요청 처리 중에는 인코딩을 불러오지 않음 (load_encoding을 부르기 전이면 근사값)
+    if _encoding:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return estimate_tokens(text)
+
+def passage_tokens(chunk):
+    # 프롬프트에 들어가는 형태(레퍼런스 포함)와 구분용 빈 줄까지 셈
+    return count_tokens(format_reference(chunk.text, f"Ref{chunk.file_id}", chunk.page)) + 1
+
+def _shingles(text, n=3):
+    words = text.casefold().split()
+    if len(words) < n:
+        return {tuple(words)}
+    return {tuple(words[i : i + n]) for i in range(len(words) - n + 1)}
+
+def _jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+def _join(a, b):
+    """
+    연속된 두 조각의 본문을 잇습니다. 조각끼리 겹치는 단어(CHUNK_OVERLAP)는 한 번만 넣습니다.
+    """
+    if not CHUNK_OVERLAP:
+        return a + " " + b
+    left, right = a.split(" "), b.split(" ")
+    for size in range(min(len(left), len(right)) - 1, 0, -1):
+        if left[-size:] == right[:size]:
+            return " ".join(left + right[size:])
+    return a + " " + b
+
+def merge_adjacent(chunks):
+    """
+    같은 파일, 같은 페이지에서 번호가 연속된 조각을 하나로 합칩니다. 레퍼런스가 한 번만 붙으므로 토큰이 줄고
+    문맥이 끊기지 않습니다. 합친 조각은 그중 가장 관련도가 높은 조각의 자리에 놓입니다.
+
+    Args:
+        chunks (list): 관련도 순서의 Chunk 리스트
+
+    Returns:
+        list: 관련도 순서의 Chunk 리스트 (합친 조각의 row는 첫 조각의 번호)
+    """
+    runs = [(rank, [chunk]) for rank, chunk in enumerate(chunks) if chunk.row is None]
+    ordered = sorted((c.file_id, c.page, c.row, rank) for rank, c in enumerate(chunks) if c.row is not None)
+    previous = None
+    for file_id, page, row, rank in ordered:
+        if previous is not None and previous[:2] == (file_id, page) and row == previous[2] + 1:
+            runs[-1] = (min(runs[-1][0], rank), runs[-1][1] + [chunks[rank]])
+        else:
+            runs.append((rank, [chunks[rank]]))
+        previous = (file_id, page, row)
+
+    passages = []
+    for _, members in sorted(runs, key=lambda run: run[0]):
+        text = members[0].text
+        for chunk in members[1:]:
+            text = _join(text, chunk.text)
+        passages.append(members[0]._replace(text=text))
+    return passages
+
+def trim_to_tokens(chunk, budget):
+    """
+    레퍼런스를 포함해 budget 토큰 안에 들어가도록 본문 뒤쪽 단어를 잘라낸 조각을 반환합니다. 들어가지 않으면 None.
+    """
+    words = chunk.text.split(" ")
+    low, high = 0, len(words)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if passage_tokens(chunk._replace(text=" ".join(words[:middle]) + " …")) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    return chunk._replace(text=" ".join(words[:low]) + " …") if low else None
+
+def build_context(chunks, budget=CONTEXT_TOKEN_BUDGET, dedup_threshold=CONTEXT_DEDUP_THRESHOLD,
+                  min_trim_tokens=CONTEXT_MIN_TRIM_TOKENS):
+    """
+    관련도 순서의 검색 결과로 토큰 예산 안에 들어가는 프롬프트용 조각 목록을 만듭니다.
+
+    1. 이미 고른 조각과 단어 3-gram 자카드 유사도가 dedup_threshold 이상인 조각(중복 업로드, 겹치는 조각)은 건너뜀
+    2. 같은 페이지에서 이어지는 조각은 merge_adjacent로 합친 뒤의 토큰 수로 예산을 계산
+    3. 다음 조각이 예산을 넘으면, 남은 예산이 min_trim_tokens 이상일 때만 잘라서 넣고 멈춤
+
+    Args:
+        chunks (list): 관련도 순서의 Chunk 리스트
+        budget (int): 검색 결과 부분에 쓸 최대 토큰 수 (레퍼런스 포함)
+
+    Returns:
+        list: 프롬프트에 넣을 Chunk 리스트 (관련도 순서)
+    """
+    selected, seen = [], []
+    used = 0
+    costs = {}  # 합친 조각을 매번 다시 세지 않도록 (본문, 파일, 페이지)별 토큰 수를 기억
+
+    def cost(passage):
+        key = (passage.text, passage.file_id, passage.page)
+        if key not in costs:
+            costs[key] = passage_tokens(passage)
+        return costs[key]
+
+    for chunk in chunks:
+        shingles = _shingles(chunk.text)
+        if any(_jaccard(shingles, other) >= dedup_threshold for other in seen):
+            continue
+        passages = merge_adjacent(selected + [chunk])
+        tokens = sum(cost(p) for p in passages)
+        if tokens <= budget:
+            selected.append(chunk)
+            seen.append(shingles)
+            used = tokens
+            continue
+        if budget - used >= min_trim_tokens:
+            trimmed = trim_to_tokens(chunk._replace(row=None), budget - used)
+            if trimmed is not None:
+                selected.append(trimmed)
+        break
+    return merge_adjacent(selected)
@@ -0,0 +1,218 @@
+import hashlib
+import logging
+import os
+import queue
+import threading
+
+import numpy as np
+
+from config.settings import EMBED_BATCH_SIZE, EMBED_PREFETCH_BATCHES, CHUNK_WORD_LENGTH, CHUNK_OVERLAP, CHUNK_TOKEN_LENGTH
+from models.semantic_search import SemanticSearch
+from utils.metrics import timed_iter
+from utils.pdf_processing import iter_pdf_pages
+from utils.text_processing import iter_chunks
+
+logger = logging.getLogger(__name__)
+
+def file_sha256(path, block_size=1 << 20):
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+def _fingerprint(path, indexed_files, upload_hashes=None):
+    """
+    파일의 내용 해시를 반환합니다. 크기와 수정 시각이 인덱싱(또는 업로드) 당시와 같으면 다시 해시하지 않습니다.
+    """
+    stat = os.stat(path)
+    for records in (indexed_files, upload_hashes or {}):
+        info = records.get(path)
+        if info and info["size"] == stat.st_size and info["mtime_ns"] == stat.st_mtime_ns:
+            return {"sha256": info["sha256"], "size": info["size"], "mtime_ns": info["mtime_ns"]}
+    return {"sha256": file_sha256(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+def _count_pages(pages, progress):
+    for page in pages:
+        progress(pages_parsed=1)
+        yield page
+
+def _next_file_id(indexed_files):
+    return max((info["id"] for info in indexed_files.values()), default=0) + 1
+
+_DONE = object()
+
+def embed_stream(chunks, embed, batch_size=EMBED_BATCH_SIZE, prefetch=EMBED_PREFETCH_BATCHES):
+    """
+    조각 이터레이터를 batch_size 단위로 묶어 embed에 보내고 (조각 배치, 임베딩) 을 yield합니다.
+
+    PDF 파싱과 청킹은 별도 스레드에서 진행되어 임베딩과 겹쳐 실행되며, 미리 준비되는 배치는
+    prefetch개로 제한되므로 문서 크기와 관계없이 메모리 사용량이 일정합니다.
+
+    Args:
+        chunks (iterable): 텍스트 조각 이터레이터 (예: iter_chunks)
+        embed (callable): 텍스트 리스트를 받아 임베딩 행렬을 반환하는 함수
+        batch_size (int): 한 번에 임베딩할 조각 수
+        prefetch (int): 임베딩을 기다리며 대기열에 쌓아 둘 최대 배치 수
+    """
+    batches = queue.Queue(maxsize=max(1, prefetch))
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            batch = []
+            for chunk in chunks:
+                batch.append(chunk)
+                if len(batch) == batch_size:
+                    if not put(batch):
+                        return
+                    batch = []
+            if batch:
+                put(batch)
+            put(_DONE)
+        except Exception as e:
+            put(e)
+
+    producer = threading.Thread(target=produce, name="chunk-producer", daemon=True)
+    producer.start()
+    try:
+        while True:
+            batch = batches.get()
+            if batch is _DONE:
+                break
+            if isinstance(batch, Exception):
+                raise batch
+            yield batch, embed(batch)
+    finally:
+        # 소비하는 쪽이 중간에 멈추면 생산 스레드도 종료
+        stop.set()
+        producer.join()
+
+def sync_index(collection, model, progress=None):
+    """
+    컬렉션의 업로드된 파일과 인덱스를 동기화합니다.
+
+    새로 업로드된 파일만 파싱/임베딩하여 기존 인덱스 뒤에 추가하고, 삭제되었거나 내용이 바뀐 파일의
+    조각은 인덱스에서 제거합니다. 요청한 모델의 인덱스가 아직 없을 때만 기존 조각까지 임베딩합니다.
+    인덱스는 새 인스턴스로 교체되므로 동시에 실행 중인 검색은 이전 인덱스를 그대로 사용합니다.
+
+    Args:
+        collection (Collection): 동기화할 컬렉션
+        model (EmbeddingModel): 인덱스를 갱신할 임베딩 모델
+        progress (callable): 진행 상황 콜백. progress(files_total=..., pages_parsed=..., chunks_embedded=...) 형태로 호출
+
+    Returns:
+        dict: 추가/제거된 파일 목록, 전체 조각 수, 디스크에 다시 저장해야 하는 모델 목록
+    """
+    progress = progress or (lambda **kwargs: None)
+    with collection.ingest_lock:
+        return _sync_index(collection, model, progress)
+
+def _sync_index(collection, model, progress):
+    chunk_table, indexed_files, indexes = collection.chunk_table, collection.indexed_files, collection.indexes
+    # 업로드 목록과 업로드 해시가 서로 맞도록 한 번의 잠금 안에서 함께 복사
+    with collection.lock:
+        snapshot = list(collection.uploaded_files)
+        upload_hashes = dict(collection.upload_hashes)
+    current = {path: _fingerprint(path, indexed_files, upload_hashes) for path in snapshot if os.path.exists(path)}
+    with collection.lock:
+        # 삭제된 파일과 중복 경로 정리 (해시하는 동안 새로 업로드된 파일은 다음 동기화 때 처리)
+        collection.uploaded_files[:] = [path for path in dict.fromkeys(collection.uploaded_files)
+                                        if path in current or path not in snapshot]
+        uploaded = set(collection.uploaded_files)
+        for path in [path for path in collection.upload_hashes if path not in uploaded]:
+            del collection.upload_hashes[path]
+    removed = [path for path, info in indexed_files.items()
+               if path not in current or current[path]["sha256"] != info["sha256"]]
+    removed_ids = [indexed_files.pop(path)["id"] for path in removed]
+    added = [path for path in current if path not in indexed_files]
+    progress(files_total=len(added))
+
+    if removed:
+        keep = ~chunk_table.mask(removed_ids)
+        chunk_table.select(keep)
+        for other, index in list(indexes.items()):
+            if index.fitted:
+                indexes[other] = index.remove(keep, chunk_table)
+        logger.info(f"Removed {int((~keep).sum())} chunks of {len(removed)} deleted or replaced files")
+
+    recommender = indexes.get(model)
+    if recommender is None or not recommender.fitted:
+        recommender = SemanticSearch(model=model)
+
+    def embed(batch):
+        return recommender.get_text_embedding([text for _, text in batch])
+
+    # 새 파일의 indexed_files 항목은 조각이 chunk_table과 인덱스에 들어간 뒤에 한꺼번에 등록
+    # (중간에 실패해도 조각 없이 인덱싱된 것으로 표시된 파일이 남지 않고 다음 동기화 때 다시 시도됨)
+    new_files = {}
+    new_texts, new_file_ids, new_pages, new_embeddings = [], [], [], []
+    failed = []
+    for file_path in added:
+        file_id = _next_file_id({**indexed_files, **new_files})  # 파일별 고유 ID (레퍼런스 번호로 사용)
+        texts, pages_of_chunks, embeddings = [], [], []
+        try:
+            # 페이지 추출 -> 청킹 -> 임베딩을 배치 단위 스트리밍으로 처리 (단계별 시간은 파일마다 한 번씩 기록)
+            pages = _count_pages(timed_iter("pdf_to_text", iter_pdf_pages(file_path)), progress)
+            chunks = timed_iter("text_to_chunks", iter_chunks(pages, word_length=CHUNK_WORD_LENGTH,
+                                                              overlap=CHUNK_OVERLAP, token_length=CHUNK_TOKEN_LENGTH))
+            for batch, batch_embeddings in embed_stream(chunks, embed):
+                embeddings.append(batch_embeddings)
+                texts.extend(text for _, text in batch)
+                pages_of_chunks.extend(page for page, _ in batch)
+                progress(chunks_embedded=len(batch))
+        except Exception as e:
+            # 파싱/임베딩에 실패한 파일은 인덱싱하지 않고 나머지 파일은 계속 처리
+            logger.error(f"Failed to index {file_path}: {str(e)}")
+            failed.append(file_path)
+            progress(files_done=1)
+            continue
+        new_files[file_path] = dict(current[file_path], id=file_id)
+        new_embeddings.extend(embeddings)
+        new_texts.extend(texts)
+        new_pages.extend(pages_of_chunks)
+        new_file_ids.extend([file_id] * len(texts))
+        progress(files_done=1)
+    if failed and not new_files and not removed:
+        # 바뀐 것이 없고 새 파일이 모두 실패했으면 (예: 임베딩 API 장애) 오류로 알림
+        raise RuntimeError(f"Failed to index {len(failed)} files: {', '.join(os.path.basename(path) for path in failed)}")
+
+    existing = len(chunk_table)
+    if existing and not recommender.fitted:
+        # 이 모델의 인덱스가 아직 없으면 기존 조각도 임베딩 (임베딩 캐시에 있으면 재사용)
+        new_embeddings.insert(0, recommender.get_text_embedding(chunk_table.texts(range(existing))))
+        progress(chunks_embedded=existing)
+
+    # 새 조각을 붙인 테이블과 인덱스를 먼저 만들고, 모두 성공한 뒤 컬렉션 상태(테이블, 인덱스, indexed_files)를 함께 교체
+    table = chunk_table.snapshot()
+    table.extend(new_texts, new_file_ids, new_pages)
+    fitted = recommender.fitted
+    index = recommender.add(table, np.vstack(new_embeddings)) if new_embeddings else recommender
+
+    chunk_table.assign(table)
+    if new_texts:
+        # 다른 모델의 인덱스에는 새 조각의 임베딩이 없으므로 무효화
+        for other in [m for m in indexes if m != model]:
+            indexes.pop(other)
+    indexes[model] = index
+    indexed_files.update(new_files)
+    added = list(new_files)
+    updated_models = list(indexes) if (added or removed or not fitted) else []
+
+    logger.info(f"Index of collection '{collection.name}' synced: {len(added)} files added, {len(removed)} removed, {len(chunk_table)} chunks in total")
+    return {
+        "added": added,
+        "removed": removed,
+        "failed": failed,
+        "total_chunks": len(chunk_table),
+        "updated_models": updated_models,
+    }
@@ -0,0 +1,113 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from config.settings import INGEST_WORKERS, MAX_PENDING_JOBS
+
+logger = logging.getLogger(__name__)
+
+# 완료된 작업 상태를 보관할 최대 개수
+JOB_HISTORY = 200
+
+class JobQueueFull(Exception):
+    pass
+
+class Job:
+    """
+    백그라운드 인제스트 작업 하나의 상태와 진행 상황.
+    """
+
+    def __init__(self, kind, params):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.status = "queued"
+        self.progress = {"files_total": 0, "files_done": 0, "pages_parsed": 0, "chunks_embedded": 0}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self._lock = threading.Lock()
+
+    def report(self, files_total=None, **increments):
+        with self._lock:
+            if files_total is not None:
+                self.progress["files_total"] = files_total
+            for key, value in increments.items():
+                self.progress[key] = self.progress.get(key, 0) + value
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "kind": self.kind,
+                "params": self.params,
+                "status": self.status,
+                "progress": dict(self.progress),
+                "result": self.result,
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+class JobManager:
+    """
+    인제스트 작업을 제한된 크기의 스레드 풀에서 실행합니다.
+    PDF 파싱, 모델 추론, OpenAI 호출이 이벤트 루프를 막지 않도록 요청 핸들러는 작업만 제출합니다.
+    """
+
+    def __init__(self, max_workers=INGEST_WORKERS, max_pending=MAX_PENDING_JOBS):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        self.max_pending = max_pending
+        self.jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind, fn, params=None):
+        """
+        fn(job)을 백그라운드에서 실행하는 작업을 등록하고 Job을 반환합니다.
+        대기 중인 작업이 너무 많으면 JobQueueFull을 발생시킵니다.
+        """
+        with self._lock:
+            pending = sum(1 for job in self.jobs.values() if job.status in ("queued", "running"))
+            if pending >= self.max_pending:
+                raise JobQueueFull(f"Too many pending jobs ({pending})")
+            job = Job(kind, params or {})
+            self.jobs[job.id] = job
+            self._trim()
+        job.future = self.executor.submit(self._run, job, fn)
+        logger.info(f"Submitted {kind} job {job.id}")
+        return job
+
+    def _run(self, job, fn):
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            job.result = fn(job)
+            job.status = "completed"
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {str(e)}")
+            job.error = str(e)
+            job.status = "failed"
+            raise
+        finally:
+            job.finished_at = time.time()
+        return job.result
+
+    def _trim(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in ("completed", "failed")]
+        for job_id in finished[: max(0, len(self.jobs) - JOB_HISTORY)]:
+            self.jobs.pop(job_id)
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def list(self):
+        return [job.to_dict() for job in list(self.jobs.values())]
+
+job_manager = JobManager()
@@ -0,0 +1,220 @@
+import bisect
+import contextvars
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# 지연 시간 히스토그램 구간(초): 1ms 검색부터 수십 초 걸리는 LLM 호출까지
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render_sample(name, value, labels=()):
+    """
+    Prometheus 텍스트 형식의 샘플 한 줄을 반환합니다. labels는 (이름, 값) 쌍의 시퀀스입니다.
+    """
+    return f"{name}{_format_labels(labels)} {_format_value(value)}"
+
+class Counter:
+    """
+    단조 증가하는 카운터. 레이블 값 조합마다 따로 셉니다.
+    """
+
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield render_sample(self.name, value, zip(self.labelnames, key))
+
+class Histogram:
+    """
+    누적 구간(le) 히스토그램. 구간별 개수와 합계, 전체 개수를 레이블 값 조합마다 따로 셉니다.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # 레이블 값 -> [구간별 개수(마지막은 +Inf), 합계]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self):
+        with self._lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+        for key, (counts, total) in sorted(series.items()):
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield render_sample(f"{self.name}_bucket", cumulative, labels + [("le", _format_value(float(bound)))])
+            yield render_sample(f"{self.name}_sum", total, labels)
+            yield render_sample(f"{self.name}_count", cumulative, labels)
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+stage_seconds = registry.register(Histogram(
+    "pdfgpt_stage_seconds",
+    "Time spent in each processing stage, excluding nested stages",
+    ["stage"]))
+request_seconds = registry.register(Histogram(
+    "pdfgpt_request_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"]))
+embedding_batch_size = registry.register(Histogram(
+    "pdfgpt_embedding_batch_size",
+    "Number of texts sent to the encoder per batch",
+    ["model"], buckets=SIZE_BUCKETS))
+embedded_texts = registry.register(Counter(
+    "pdfgpt_embedded_texts_total",
+    "Texts encoded by an embedding model (embedding cache misses)",
+    ["model"]))
+embedding_microbatch_size = registry.register(Histogram(
+    "pdfgpt_embedding_microbatch_size",
+    "Concurrent embedding requests merged into one encoder call by the micro-batcher",
+    ["model"], buckets=SIZE_BUCKETS))
+
+# 요청 하나의 단계별 누적 시간 (미들웨어가 요청마다 새 dict를 넣음). 스레드풀로 넘어간 작업도 같은 dict에 기록됨
+_trace = contextvars.ContextVar("pdfgpt_trace", default=None)
+# 실행 중인 단계 타이머 스택. 바깥 단계가 안쪽 단계 시간을 빼고 기록할 수 있도록 함 (태스크/스레드마다 독립)
+_stack = contextvars.ContextVar("pdfgpt_stage_stack", default=())
+
+class _Timer:
+    __slots__ = ("name", "total", "nested")
+
+    def __init__(self, name):
+        self.name = name
+        self.total = 0.0
+        self.nested = 0.0
+
+@contextmanager
+def _running(timer):
+    token = _stack.set(_stack.get() + (timer,))
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        _stack.reset(token)
+        timer.total += elapsed
+        parents = _stack.get()
+        if parents:
+            parents[-1].nested += elapsed
+
+def record(name, seconds):
+    """
+    단계 하나의 소요 시간을 히스토그램과 현재 요청의 타이밍 기록에 더합니다.
+    """
+    stage_seconds.observe(seconds, stage=name)
+    trace = _trace.get()
+    if trace is not None:
+        trace[name] = trace.get(name, 0.0) + seconds
+
+@contextmanager
+def stage(name):
+    """
+    with 블록의 실행 시간을 name 단계로 기록합니다. 안에서 실행된 다른 단계의 시간은 빼므로
+    단계별 시간을 더하면 전체 시간이 됩니다.
+
+        with stage("search"):
+            ...
+    """
+    timer = _Timer(name)
+    try:
+        with _running(timer):
+            yield
+    finally:
+        record(name, timer.total - timer.nested)
+
+def timed_iter(name, iterable):
+    """
+    iterable에서 항목을 꺼내는 데 걸린 시간을 합쳐, 다 읽었을 때(또는 중간에 닫혔을 때) name 단계로 한 번 기록합니다.
+    스트리밍 파이프라인의 페이지 추출/청킹처럼 생성기로 이어진 단계에 사용합니다.
+    """
+    timer = _Timer(name)
+    iterator = iter(iterable)
+    try:
+        while True:
+            with _running(timer):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+    finally:
+        record(name, timer.total - timer.nested)
+
+def start_trace():
+    """
+    현재 컨텍스트(요청)에 새 타이밍 기록을 시작하고, 단계 이름 -> 누적 초 dict를 반환합니다.
+    """
+    trace = {}
+    _trace.set(trace)
+    return trace
+
+def server_timing(trace, total=None):
+    """
+    타이밍 기록을 Server-Timing 헤더 값으로 만듭니다 (예: "embed;dur=12.3, search;dur=1.2, total;dur=15.0").
+    """
+    parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in trace.items()]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
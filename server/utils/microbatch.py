@@ -0,0 +1,89 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from config.settings import EMBED_MICROBATCH_SIZE, EMBED_MICROBATCH_WAIT_MS
+from utils.metrics import embedding_microbatch_size
+
+logger = logging.getLogger(__name__)
+
+class MicroBatcher:
+    """
+    여러 스레드에서 동시에 들어온 작은 임베딩 요청을 모아 encode 한 번으로 처리합니다.
+
+    워커 스레드가 첫 요청을 꺼낸 뒤, 지금 결과를 기다리고 있는 다른 호출이 모두 들어오거나
+    max_batch개의 텍스트가 모이거나 max_wait_ms가 지날 때까지 요청을 더 모읍니다.
+    기다리는 호출이 하나뿐이면 바로 인코딩하므로 동시 요청이 없을 때는 지연이 늘지 않습니다.
+
+        batcher = MicroBatcher(model.encode, max_batch=32, max_wait_ms=5)
+        vectors = batcher(["질문"])  # 호출한 스레드는 결과가 나올 때까지 기다림
+    """
+
+    def __init__(self, encode, max_batch=EMBED_MICROBATCH_SIZE, max_wait_ms=EMBED_MICROBATCH_WAIT_MS, name="embed"):
+        self.encode = encode
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+        self._queue = queue.Queue()
+        self._waiting = 0  # 결과를 기다리고 있는 호출 수 (아직 꺼내지 않은 요청 포함)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def __call__(self, texts):
+        """
+        texts의 임베딩 행렬을 반환합니다. encode에서 난 예외는 호출한 스레드에서 다시 발생합니다.
+        """
+        future = Future()
+        with self._lock:
+            self._waiting += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"{self.name}-microbatch", daemon=True)
+                self._thread.start()
+        self._queue.put((list(texts), future))
+        try:
+            return future.result()
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    def _collect(self):
+        pending = [self._queue.get()]
+        count = len(pending[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while count < self.max_batch:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    others = self._waiting > len(pending)
+                remaining = deadline - time.perf_counter()
+                if not others or remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            pending.append(item)
+            count += len(item[0])
+        return pending
+
+    def _run(self):
+        while True:
+            pending = self._collect()
+            texts = [text for batch, _ in pending for text in batch]
+            embedding_microbatch_size.observe(len(pending), model=self.name)
+            try:
+                vectors = np.asarray(self.encode(texts), dtype=np.float32)
+            except Exception as e:
+                logger.error(f"Micro-batched encode of {len(texts)} texts failed: {str(e)}")
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+            offset = 0
+            for batch, future in pending:
+                future.set_result(vectors[offset : offset + len(batch)])
+                offset += len(batch)
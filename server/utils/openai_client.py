@@ -0,0 +1,331 @@
+import asyncio
+import logging
+import random
+import re
+import threading
+import time
+
+import httpx
+import numpy as np
+import openai
+from openai import AsyncOpenAI
+
+from config.settings import (
+    OPENAI_API_KEY, OPENAI_BASE_URL, OPENAI_MAX_CONCURRENCY, OPENAI_MAX_RETRIES, OPENAI_TIMEOUT,
+    OPENAI_EMBED_BATCH_TOKENS, OPENAI_EMBED_BATCH_SIZE,
+)
+from utils.text_processing import BYTES_PER_TOKEN
+
+logger = logging.getLogger(__name__)
+
+# 재시도할 HTTP 상태 코드 (요청 시간 초과, 충돌, 속도 제한, 서버 오류)
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+def estimate_tokens(text):
+    """
+    UTF-8 바이트 수로 근사한 토큰 수.
+    """
+    return max(1, -(-len(text.encode("utf-8")) // BYTES_PER_TOKEN))
+
+def pack_batches(texts, max_tokens=OPENAI_EMBED_BATCH_TOKENS, max_items=OPENAI_EMBED_BATCH_SIZE):
+    """
+    텍스트를 순서대로 묶되, 한 요청의 근사 토큰 수가 max_tokens, 텍스트 수가 max_items를 넘지 않게 나눕니다.
+
+    Returns:
+        list: (시작 인덱스, 텍스트 리스트, 근사 토큰 수) 튜플 리스트
+    """
+    batches = []
+    start, tokens = 0, 0
+    for i, text in enumerate(texts):
+        cost = estimate_tokens(text)
+        if i > start and (tokens + cost > max_tokens or i - start >= max_items):
+            batches.append((start, texts[start:i], tokens))
+            start, tokens = i, 0
+        tokens += cost
+    if start < len(texts):
+        batches.append((start, texts[start:], tokens))
+    return batches
+
+def parse_duration(value):
+    """
+    "1s", "6m0s", "20ms" 형식의 x-ratelimit-reset-* 값을 초 단위로 바꿉니다.
+    """
+    if not value:
+        return 0.0
+    try:
+        return float(value)
+    except ValueError:
+        return sum(float(amount) * _UNITS[unit] for amount, unit in _DURATION.findall(value))
+
+def retry_after(headers):
+    """
+    retry-after-ms / retry-after 헤더가 있으면 기다릴 시간(초)을, 없으면 None을 반환합니다.
+    """
+    if headers is None:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+class _Bucket:
+    """
+    x-ratelimit-{limit,remaining,reset}-* 헤더로 맞춰지는 토큰 버킷.
+    남은 양은 초기화 시점까지 한도만큼 일정한 속도로 다시 찬다고 가정합니다.
+    """
+
+    def __init__(self):
+        self.limit = None
+        self.remaining = None
+        self.rate = None
+        self.reset_at = 0.0
+        self.updated_at = 0.0
+
+    def _refill(self, now):
+        if self.remaining is None:
+            return
+        if self.rate:
+            self.remaining = min(self.limit, self.remaining + self.rate * (now - self.updated_at))
+        elif now >= self.reset_at:
+            # 다시 차는 속도를 모르면 초기화 시점에 한도 전체가 돌아온다고 봄
+            self.remaining = self.limit
+        self.updated_at = now
+
+    def wait_time(self, amount, now):
+        self._refill(now)
+        if self.remaining is None:
+            return 0.0
+        amount = min(amount, self.limit)
+        if self.remaining >= amount:
+            return 0.0
+        if self.rate:
+            return (amount - self.remaining) / self.rate
+        return self.reset_at - now
+
+    def consume(self, amount):
+        if self.remaining is not None:
+            self.remaining -= min(amount, self.limit)
+
+    def sync(self, limit, remaining, reset, now):
+        self.limit = limit if limit is not None else max(remaining, self.limit or 0)
+        self.remaining = remaining
+        self.reset_at = now + reset
+        self.updated_at = now
+        if reset > 0 and remaining < self.limit:
+            self.rate = (self.limit - remaining) / reset
+
+class RateLimiter:
+    """
+    응답의 x-ratelimit-* 헤더로 남은 요청/토큰 수를 추적하고, 한도에 닿으면 다시 찰 때까지 새 요청을 미룹니다.
+    동시에 나가는 요청이 한도를 한꺼번에 넘지 않도록 보내기 전에 남은 양을 미리 차감합니다.
+    """
+
+    def __init__(self):
+        self.requests = _Bucket()
+        self.tokens = _Bucket()
+        self.blocked_until = 0.0
+
+    async def acquire(self, tokens):
+        while True:
+            now = time.monotonic()
+            wait = max(self.blocked_until - now, self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+        self.requests.consume(1)
+        self.tokens.consume(tokens)
+
+    def update(self, headers):
+        now = time.monotonic()
+        try:
+            for kind, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+                remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                if remaining is None:
+                    continue
+                limit = headers.get(f"x-ratelimit-limit-{kind}")
+                bucket.sync(int(limit) if limit is not None else None, int(remaining),
+                            parse_duration(headers.get(f"x-ratelimit-reset-{kind}")), now)
+        except ValueError:
+            logger.warning("Ignoring malformed rate-limit headers")
+
+    def pause(self, seconds):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+class OpenAIClient:
+    """
+    임베딩과 답변 생성이 함께 쓰는 비동기 OpenAI 클라이언트.
+
+    전용 이벤트 루프 스레드에서 AsyncOpenAI 하나와 httpx 연결 풀을 공유합니다.
+    인제스트 워커 스레드는 embed()로, 요청 핸들러는 await로 같은 풀을 사용하므로
+    동시 요청 수 제한, 속도 제한 추적, 재시도가 프로세스 전체에 한 번만 적용됩니다.
+    """
+
+    def __init__(self, api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL, max_concurrency=OPENAI_MAX_CONCURRENCY,
+                 max_retries=OPENAI_MAX_RETRIES, timeout=OPENAI_TIMEOUT):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.limiter = RateLimiter()
+        self.stats = {"requests": 0, "retries": 0, "rate_limited": 0, "errors": 0}
+        self._loop = None
+        self._client = None
+        self._semaphore = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="openai-client", daemon=True).start()
+                self._loop = loop
+        return self._loop
+
+    def _submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def _get_client(self):
+        # 전용 루프 안에서만 호출되므로 잠금 없이 한 번만 만들어짐
+        if self._client is None:
+            self._client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                max_retries=0,  # 재시도는 속도 제한 추적과 함께 직접 처리
+                timeout=self.timeout,
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(max_connections=self.max_concurrency,
+                                        max_keepalive_connections=self.max_concurrency),
+                    timeout=self.timeout,
+                ),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def _request(self, call, tokens):
+        """
+        call(client)로 원시 응답을 받아 파싱합니다. 재시도 가능한 오류는 지수 백오프로 다시 시도하고,
+        retry-after와 x-ratelimit-* 헤더를 반영합니다.
+        """
+        client = self._get_client()
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire(tokens)
+            rate_limited = False
+            async with self._semaphore:
+                self.stats["requests"] += 1
+                try:
+                    raw = await call(client)
+                except openai.APIStatusError as e:
+                    self.limiter.update(e.response.headers)
+                    if e.status_code not in RETRY_STATUS or attempt == self.max_retries:
+                        self.stats["errors"] += 1
+                        raise
+                    delay = retry_after(e.response.headers)
+                    if e.status_code == 429:
+                        rate_limited = True
+                        self.stats["rate_limited"] += 1
+                except openai.APIConnectionError:
+                    if attempt == self.max_retries:
+                        self.stats["errors"] += 1
+                        raise
+                    delay = None
+                else:
+                    self.limiter.update(raw.headers)
+                    return raw.parse()
+
+            backoff = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * (0.5 + random.random() / 2)
+            delay = backoff if delay is None else max(delay, 0.0)
+            if rate_limited:
+                # 속도 제한에 걸렸으면 다른 요청도 같은 시간 동안 멈춤
+                self.limiter.pause(delay)
+            self.stats["retries"] += 1
+            logger.warning(f"OpenAI request failed (attempt {attempt + 1}), retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    async def _embed(self, texts, model):
+        texts = list(texts)
+
+        async def embed_batch(batch, tokens):
+            response = await self._request(
+                lambda client: client.embeddings.with_raw_response.create(input=batch, model=model), tokens)
+            return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+        batches = pack_batches(texts)
+        embeddings = await asyncio.gather(*(embed_batch(batch, tokens) for _, batch, tokens in batches))
+        logger.info(f"Embedded {len(texts)} texts in {len(batches)} requests")
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.asarray([row for rows in embeddings for row in rows], dtype=np.float32)
+
+    def embed(self, texts, model):
+        """
+        텍스트를 토큰 예산 단위 요청으로 나누어 동시에 임베딩하고, 입력 순서대로 행렬을 반환합니다.
+        이벤트 루프 밖(워커 스레드)에서 호출하는 블로킹 함수입니다.
+        """
+        return self._submit(self._embed(texts, model)).result()
+
+    async def aembed(self, texts, model):
+        return await asyncio.wrap_future(self._submit(self._embed(texts, model)))
+
+    @staticmethod
+    def _chat_tokens(kwargs):
+        tokens = sum(estimate_tokens(message.get("content") or "") for message in kwargs.get("messages", []))
+        return tokens + (kwargs.get("max_tokens") or 0)
+
+    async def create_chat_completion(self, **kwargs):
+        """
+        chat.completions.create와 같은 인자를 받아 응답을 반환합니다. 어느 이벤트 루프에서든 await할 수 있습니다.
+        """
+        coro = self._request(lambda client: client.chat.completions.with_raw_response.create(**kwargs),
+                             self._chat_tokens(kwargs))
+        return await asyncio.wrap_future(self._submit(coro))
+
+    async def stream_chat_completion(self, **kwargs):
+        """
+        stream=True로 답변을 요청하고 생성되는 내용 조각(str)을 바로 yield합니다.
+        재시도는 첫 응답을 받기 전까지만 하며, 소비하는 쪽이 중간에 멈추면 OpenAI 스트림도 닫습니다.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        done = object()
+
+        def put(item):
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+
+        async def pump():
+            try:
+                stream = await self._request(
+                    lambda client: client.chat.completions.with_raw_response.create(stream=True, **kwargs),
+                    self._chat_tokens(kwargs))
+                try:
+                    async for chunk in stream:
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            put(chunk.choices[0].delta.content)
+                finally:
+                    await stream.close()
+                put(done)
+            except Exception as e:
+                put(e)
+
+        future = self._submit(pump())
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            future.cancel()
+
+openai_client = OpenAIClient()
@@ -1,28 +1,122 @@
 import fitz
+import httpx
 import logging
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from config.settings import PDF_WORKERS, PDF_PARALLEL_MIN_PAGES, PDF_SHARD_PAGES, UPLOAD_CHUNK_BYTES, DOWNLOAD_TIMEOUT
+from utils.metrics import timed_iter
 
 logger = logging.getLogger(__name__)
 
-def pdf_to_text(path, start_page=1, end_page=None):
-    logger.info(f"Converting PDF to text: {path}")
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool(workers):
+    """
+    페이지 추출용 프로세스 풀을 한 번만 만들어 재사용합니다.
+    TensorFlow 스레드가 있는 프로세스를 fork하지 않도록 spawn 방식을 사용합니다.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def _extract_pages(path, first, last):
+    """
+    [first, last) 범위(0부터 시작)의 페이지 텍스트를 추출합니다. 워커마다 자신의 fitz 문서를 엽니다.
+    """
+    doc = fitz.open(path)
+    try:
+        return [doc.load_page(i).get_text("text").strip() for i in range(first, last)]
+    finally:
+        doc.close()
+
+def _shard(first, last, shard_size):
+    return [(a, min(a + shard_size, last)) for a in range(first, last, shard_size)]
+
+def iter_pdf_pages(path, start_page=1, end_page=None, workers=None):
+    """
+    PDF의 start_page부터 end_page까지(1부터 시작, 양 끝 포함) 페이지 텍스트를 순서대로 하나씩 yield합니다.
+
+    페이지 수가 PDF_PARALLEL_MIN_PAGES 이상이고 workers가 2 이상이면 페이지 범위를 최대 PDF_SHARD_PAGES
+    페이지씩 나누어 여러 프로세스에서 동시에 추출합니다. 동시에 처리 중인 범위는 workers * 2개로 제한되므로
+    문서 전체가 메모리에 올라오지 않습니다.
+
+    Args:
+        path (str): PDF 파일 경로
+        start_page (int): 시작 페이지
+        end_page (int): 마지막 페이지 (None이면 문서 끝까지)
+        workers (int): 추출 프로세스 수 (None이면 PDF_WORKERS 설정값)
+    """
     doc = fitz.open(path)
     total_pages = doc.page_count
 
     if end_page is None:
         end_page = total_pages
+    workers = PDF_WORKERS if workers is None else workers
+
+    first, last = start_page - 1, end_page
+    page_count = last - first
+    if workers > 1 and page_count >= PDF_PARALLEL_MIN_PAGES:
+        doc.close()
+        shard_size = max(1, min(PDF_SHARD_PAGES, -(-page_count // workers)))
+        pool = _get_pool(max(PDF_WORKERS, workers))
+        pending = deque()
+        for a, b in _shard(first, last, shard_size):
+            pending.append(pool.submit(_extract_pages, path, a, b))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    else:
+        try:
+            for i in range(first, last):
+                yield doc.load_page(i).get_text("text").strip()
+        finally:
+            doc.close()
 
-    text_list = []
+def pdf_to_text(path, start_page=1, end_page=None, workers=None):
+    """
+    PDF의 start_page부터 end_page까지(1부터 시작, 양 끝 포함) 페이지별 텍스트를 리스트로 반환합니다.
+    큰 문서는 iter_pdf_pages로 페이지를 하나씩 처리하는 것이 메모리에 유리합니다.
 
-    for i in range(start_page - 1, end_page):
-        text = doc.load_page(i).get_text("text")
-        text_list.append(text.strip())
+    Args:
+        path (str): PDF 파일 경로
+        start_page (int): 시작 페이지
+        end_page (int): 마지막 페이지 (None이면 문서 끝까지)
+        workers (int): 추출 프로세스 수 (None이면 PDF_WORKERS 설정값)
 
-    doc.close()
-    logger.info(f"PDF converted to text successfully. Total pages processed: {end_page - start_page + 1}")
+    Returns:
+        list: 페이지별 텍스트 리스트
+    """
+    logger.info(f"Converting PDF to text: {path}")
+    text_list = list(timed_iter("pdf_to_text", iter_pdf_pages(path, start_page, end_page, workers)))
+    logger.info(f"PDF converted to text successfully. Total pages processed: {len(text_list)}")
     return text_list
 
-def download_pdf(url, output_path):
+class FileTooLarge(ValueError):
+    pass
+
+async def iter_download(url, max_bytes=None, chunk_size=UPLOAD_CHUNK_BYTES, timeout=DOWNLOAD_TIMEOUT):
+    """
+    URL의 내용을 chunk_size 바이트 단위로 내려받으며 yield합니다. 파일 전체를 메모리에 올리지 않습니다.
+
+    Content-Length가 max_bytes를 넘으면 받기 전에, 헤더 없이 받은 양이 넘으면 그 시점에 FileTooLarge를 발생시킵니다.
+    timeout은 연결과 청크 하나를 읽는 데 걸리는 시간 제한이므로 큰 파일도 끝까지 받을 수 있습니다.
+    """
     logger.info(f"Downloading PDF from URL: {url}")
-    import urllib.request
-    urllib.request.urlretrieve(url, output_path)
-    logger.info(f"PDF downloaded and saved to: {output_path}")
+    async with httpx.AsyncClient(follow_redirects=True, timeout=timeout) as client:
+        async with client.stream("GET", url) as response:
+            response.raise_for_status()
+            length = response.headers.get("content-length")
+            if max_bytes is not None and length and length.isdigit() and int(length) > max_bytes:
+                raise FileTooLarge(f"File is larger than {max_bytes} bytes")
+            received = 0
+            async for chunk in response.aiter_bytes(chunk_size):
+                received += len(chunk)
+                if max_bytes is not None and received > max_bytes:
+                    raise FileTooLarge(f"File is larger than {max_bytes} bytes")
+                yield chunk
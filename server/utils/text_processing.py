@@ -1,14 +1,21 @@
 import re
 import logging
+from bisect import bisect_left, bisect_right
+import numpy as np
+from utils.metrics import timed_iter
 
 logger = logging.getLogger(__name__)
 
+_WHITESPACE = re.compile(r'\s+')
+
+# 토큰 수를 근사할 때 사용하는 토큰당 UTF-8 바이트 수 (영어 약 4자, 한글 약 1.3자)
+BYTES_PER_TOKEN = 4
+
 def preprocess(text):
-    text = text.replace('\n', ' ')
-    text = re.sub(r'\s+', ' ', text)
-    return text
+    # \s는 줄바꿈도 포함하므로 한 번의 치환으로 충분
+    return _WHITESPACE.sub(' ', text)
 
-def text_to_chunks(texts, file_ref, word_length=150, start_page=1):
+def text_to_chunks(texts, file_ref, word_length=150, start_page=1, overlap=0, token_length=None):
     """
     텍스트를 지정된 단어 길이로 나누고, 파일별 참조 번호와 페이지 번호를 포함한 레퍼런스를 생성합니다.
 
@@ -17,24 +24,103 @@ def text_to_chunks(texts, file_ref, word_length=150, start_page=1):
         file_ref (str): 파일별 고유 참조 번호 (예: "Ref1")
         word_length (int): 하나의 텍스트 조각에 포함될 단어 수
         start_page (int): 텍스트 조각 생성 시 시작 페이지 번호
+        overlap (int): 연속된 조각이 겹치는 단어 수 (token_length를 쓰면 토큰 수)
+        token_length (int): 지정하면 단어 수 대신 근사 토큰 수로 조각 크기를 정함
 
     Returns:
         list: 텍스트 조각 리스트, 각 조각은 파일 참조 번호와 페이지 번호를 포함
     """
     logger.info("Splitting text into chunks")
-    text_toks = [t.split(' ') for t in texts]
-    chunks = []
-
-    for idx, words in enumerate(text_toks):
-        for i in range(0, len(words), word_length):
-            chunk = words[i : i + word_length]
-            if (i + word_length) > len(words) and (len(chunk) < word_length) and (len(text_toks) != (idx + 1)):
-                text_toks[idx + 1] = chunk + text_toks[idx + 1]
-                continue
-            chunk = ' '.join(chunk).strip()
-            # 파일별 참조 번호와 페이지 번호를 포함한 레퍼런스 생성
-            chunk = f'"{chunk}" Ref: {file_ref}, P: {idx+start_page}]'
-            chunks.append(chunk)
-    
+    chunks = [format_reference(chunk, file_ref, page)
+              for page, chunk in timed_iter("text_to_chunks", iter_chunks(texts, word_length, start_page, overlap, token_length))]
     logger.info(f"Text split into {len(chunks)} chunks")
     return chunks
+
+def format_reference(chunk, file_ref, page):
+    # 파일별 참조 번호와 페이지 번호를 포함한 레퍼런스 생성
+    return f'"{chunk}" Ref: {file_ref}, P: {page}]'
+
+def _word_offsets(text):
+    """
+    페이지 텍스트를 UTF-8로 인코딩하고, ASCII 공백(' ', \\t, \\n, \\v, \\f, \\r. 연속된 공백은 하나로 봄)으로 구분된
+    단어들의 시작/끝 바이트 오프셋을 반환합니다. fitz 페이지 텍스트는 줄바꿈으로도 단어가 나뉘므로 bytes.split()과 같게 나눕니다.
+    ASCII 공백은 멀티바이트 문자의 일부가 될 수 없으므로 이 오프셋으로 잘라도 항상 올바르게 디코딩됩니다.
+    """
+    buf = text.encode('utf-8')
+    codes = np.frombuffer(buf, dtype=np.uint8)
+    # 앞뒤를 공백으로 채운 공백 여부 (uint8 뺄셈은 9보다 작은 바이트에서 넘쳐 커지므로 \\t~\\r만 4 이하)
+    space = np.empty(len(codes) + 2, dtype=bool)
+    space[0] = space[-1] = True
+    np.less_equal(codes - 9, 4, out=space[1:-1])
+    space[1:-1] |= codes == 32
+    # 공백 -> 글자(단어 시작), 글자 -> 공백(단어 끝)으로 바뀌는 위치가 번갈아 나옴
+    edges = np.flatnonzero(space[1:] != space[:-1])
+    return buf, edges[0::2], edges[1::2]
+
+def iter_chunks(texts, word_length=150, start_page=1, overlap=0, token_length=None):
+    """
+    text_to_chunks와 같은 조각을 만들되, 페이지 이터레이터에서 페이지를 하나씩 읽어 (페이지 번호, 조각 본문)을
+    바로 yield합니다. 본문에는 레퍼런스가 붙지 않으므로 임베딩에는 내용만 사용됩니다.
+
+    단어 리스트를 복사하지 않고 페이지 버퍼의 바이트 오프셋으로 조각 경계를 계산하므로 문서 길이에 선형입니다.
+    페이지 끝에 남은 짧은 조각은 다음 페이지의 첫 조각에 이어 붙이며, 마지막 페이지인지 알 수 있도록
+    한 페이지만 보류합니다.
+
+    Args:
+        texts (iterable): 페이지별 텍스트 이터레이터 (예: iter_pdf_pages)
+        word_length (int): 하나의 텍스트 조각에 포함될 단어 수
+        start_page (int): 텍스트 조각 생성 시 시작 페이지 번호
+        overlap (int): 연속된 조각이 겹치는 단어 수 (token_length를 쓰면 토큰 수)
+        token_length (int): 지정하면 단어 수 대신 근사 토큰 수(UTF-8 바이트 / BYTES_PER_TOKEN)로 조각 크기를 정함
+    """
+    size = token_length or word_length
+    if not 0 <= overlap < size:
+        raise ValueError("overlap must be smaller than the chunk length")
+
+    def make_chunk(parts, idx):
+        return idx + start_page, b' '.join(parts).decode('utf-8').strip()
+
+    def page_chunks(idx, text, carry, carry_cost, last):
+        buf, starts, ends = _word_offsets(text)
+        n = len(starts)
+        if token_length:
+            costs = np.maximum(1, -(-(ends - starts) // BYTES_PER_TOKEN))
+            cum = [0] + np.cumsum(costs).tolist()  # cum[k] = 앞의 k개 단어의 크기
+        else:
+            cum = range(n + 1)  # 단어 수 기준이면 크기가 곧 단어 수
+        starts, ends = starts.tolist(), ends.tolist()
+        total = cum[n]
+
+        i, prev_end = 0, None
+        if carry:
+            budget = size - carry_cost
+            if total < budget and not last:
+                # 이전 페이지 꼬리와 이 페이지를 합쳐도 한 조각이 안 되면 다음 페이지로 계속 넘김
+                return carry + [buf], carry_cost + total
+            j = min(n, bisect_right(cum, budget) - 1)
+            yield make_chunk(carry + [buf[:ends[j - 1]]] if j > 0 else carry, idx)
+            prev_end = j
+            i = j if not overlap else max(0, bisect_left(cum, cum[j] - overlap))
+
+        while i < n:
+            if prev_end is not None and prev_end >= n:
+                break  # 남은 단어는 모두 직전 조각에 포함됨
+            if total - cum[i] < size and not last:
+                return [buf[starts[i]:]], total - cum[i]
+            j = max(i + 1, bisect_right(cum, cum[i] + size) - 1)
+            if prev_end is not None and j <= prev_end:
+                i = prev_end  # 겹치는 부분만으로 이루어진 조각은 만들지 않음
+                continue
+            yield make_chunk([buf[starts[i]:ends[j - 1]]], idx)
+            prev_end = j
+            i = j if not overlap else max(i + 1, bisect_left(cum, cum[j] - overlap))
+        return [], 0
+
+    carry, carry_cost = [], 0
+    pending = None
+    for idx, text in enumerate(texts):
+        if pending is not None:
+            carry, carry_cost = yield from page_chunks(*pending, carry, carry_cost, last=False)
+        pending = (idx, text)
+    if pending is not None:
+        yield from page_chunks(*pending, carry, carry_cost, last=True)